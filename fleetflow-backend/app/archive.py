@@ -0,0 +1,456 @@
+# app/archive.py
+# Tiered storage for trip and expense history.
+#
+# Trips closed more than FLEETFLOW_ARCHIVE_HORIZON_DAYS ago, with their expense
+# logs, are moved out of the database into segment files under
+# FLEETFLOW_ARCHIVE_DIR (default: "<database file>-archive"). Each segment holds
+# up to SEGMENT_ROWS trips, or the expense logs of those trips, stored column
+# by column:
+#
+#   b"FFSEG1\n" | u32 header length | JSON header | zlib-compressed column blocks
+#
+# Integers, floats, dates (as ordinals), UTC datetimes (as microseconds since
+# the epoch) and status codes are packed machine arrays; strings are a
+# dictionary plus an array of codes. The header records every column's block
+# and its min/max. Expense segments also carry the trip's vehicle_id and
+# driver_id, so they can be filtered without the trips table.
+#
+# Every segment is registered in archive_segments with its id, date, vehicle
+# and driver ranges. That row is written in the same transaction that deletes
+# the archived rows, so a crash leaves either the rows in the database or a
+# registered segment, never both or neither (an unregistered file is only
+# garbage). Readers pick segments by those ranges with one indexed query and
+# never open the ones that cannot match.
+#
+# rows() and arrays() are the read side: report exports, rollup backfills and
+# driver score recomputes read the hot tables and the archive together. List
+# endpoints and search only see the hot tables.
+#
+#     python -m app.archive [--horizon-days 365] [--vacuum]
+import array
+import heapq
+import json
+import os
+import struct
+import sys
+import uuid
+import zlib
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy import and_, delete, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from . import models
+from .database import SQLALCHEMY_DATABASE_URL, is_sqlite
+
+try:
+    import numpy as np
+except ImportError:  # segments are filtered in pure Python
+    np = None
+
+HORIZON_DAYS = int(os.getenv("FLEETFLOW_ARCHIVE_HORIZON_DAYS", "365"))
+SEGMENT_ROWS = int(os.getenv("FLEETFLOW_ARCHIVE_SEGMENT_ROWS", "50000"))  # trips per segment
+COMPRESSION_LEVEL = 6
+MAGIC = b"FFSEG1\n"
+CLOSED_STATUSES = ("Completed", "Cancelled")
+
+INT_NULL = -(2 ** 63)
+EPOCH = datetime(1970, 1, 1)
+_TYPECODES = {"int": "q", "float": "d", "date": "i", "datetime": "q", "status": "b", "str": "i"}
+
+
+def _default_directory() -> str:
+    path = os.getenv("FLEETFLOW_ARCHIVE_DIR")
+    if path:
+        return path
+    if is_sqlite(SQLALCHEMY_DATABASE_URL):
+        database = make_url(SQLALCHEMY_DATABASE_URL).database
+        if database and database != ":memory:":
+            return os.path.abspath(database) + "-archive"
+    return os.path.abspath("fleetflow-archive")
+
+
+DIRECTORY = _default_directory()
+
+
+# --- columns ---
+def _kind(column) -> str:
+    if isinstance(column.type, models.StatusCode):
+        return "status"
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return "datetime"
+    if python_type is date:
+        return "date"
+    return {int: "int", float: "float"}.get(python_type, "str")
+
+
+def _columns(table, extra=()):
+    """[(name, kind, status labels or None)] for every column of table, then `extra`."""
+    columns = [(c.name, _kind(c), getattr(c.type, "labels", None)) for c in table.columns]
+    return columns + [(name, kind, None) for name, kind in extra]
+
+
+# name -> (columns, column the date range and horizon apply to)
+DATASETS = {
+    "trips": (_columns(models.Trip.__table__), "closed_at"),
+    "expense_logs": (_columns(models.ExpenseLog.__table__, [("vehicle_id", "int"), ("driver_id", "int")]), "date"),
+}
+
+
+def _micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _encode(kind: str, values, labels=None):
+    """(packed array, extra header fields) for one column."""
+    if kind == "str":
+        dictionary = {}
+        codes = array.array("i", (-1 if v is None else dictionary.setdefault(v, len(dictionary)) for v in values))
+        return codes, {"values": list(dictionary)}
+    if kind == "float":
+        packed = ((float("nan") if v is None else v) for v in values)
+    elif kind == "date":
+        packed = ((0 if v is None else v.toordinal()) for v in values)
+    elif kind == "datetime":
+        packed = ((INT_NULL if v is None else _micros(v)) for v in values)
+    elif kind == "status":
+        codes = {label: code for code, label in enumerate(labels, start=1)}
+        packed = ((0 if v is None else codes[v]) for v in values)
+    else:
+        packed = ((INT_NULL if v is None else v) for v in values)
+    return array.array(_TYPECODES[kind], packed), {}
+
+
+def _decoder(kind: str, meta: dict):
+    """Raw stored value -> Python value."""
+    if kind == "str":
+        values = meta["values"]
+        return lambda code: None if code < 0 else values[code]
+    if kind == "float":
+        return lambda v: None if v != v else v
+    if kind == "date":
+        return lambda v: date.fromordinal(v) if v else None
+    if kind == "datetime":
+        return lambda v: None if v == INT_NULL else EPOCH + timedelta(microseconds=v)
+    if kind == "status":
+        labels = meta["labels"]
+        return lambda v: labels[v - 1] if v else None
+    return lambda v: None if v == INT_NULL else v
+
+
+def _bounds(values):
+    present = [v for v in values if v is not None]
+    if not present:
+        return None, None
+    low, high = min(present), max(present)
+    if isinstance(low, (date, datetime)):
+        return low.isoformat(), high.isoformat()
+    return low, high
+
+
+# --- segment files ---
+def write_segment(path: str, dataset: str, rows: list) -> int:
+    """Write rows (tuples in DATASETS[dataset] column order) to path atomically. Returns its size."""
+    header = {"dataset": dataset, "rows": len(rows), "columns": []}
+    blocks, offset = [], 0
+    for position, (name, kind, labels) in enumerate(DATASETS[dataset][0]):
+        values = [row[position] for row in rows]
+        packed, meta = _encode(kind, values, labels)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        block = zlib.compress(packed.tobytes(), COMPRESSION_LEVEL)
+        low, high = _bounds(values) if kind != "str" else (None, None)
+        column = {"name": name, "kind": kind, "offset": offset, "length": len(block), "min": low, "max": high}
+        if labels:
+            meta["labels"] = list(labels)
+        column.update(meta)
+        header["columns"].append(column)
+        blocks.append(block)
+        offset += len(block)
+
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as out:
+        out.write(MAGIC)
+        out.write(struct.pack("<I", len(encoded)))
+        out.write(encoded)
+        for block in blocks:
+            out.write(block)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+class Segment:
+    """One segment file, read into memory; columns are decompressed on first use."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not an archive segment")
+        (length,) = struct.unpack_from("<I", data, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(data[start:start + length])
+        self.rows = self.header["rows"]
+        self.columns = {c["name"]: c for c in self.header["columns"]}
+        self._data = memoryview(data)[start + length:]
+        self._raw = {}
+
+    def raw(self, name: str):
+        """The stored array of a column, or None if this segment predates the column."""
+        if name not in self._raw:
+            column = self.columns.get(name)
+            if column is None:
+                return None
+            packed = array.array(_TYPECODES[column["kind"]])
+            block = self._data[column["offset"]:column["offset"] + column["length"]]
+            packed.frombytes(zlib.decompress(block))
+            if sys.byteorder == "big":
+                packed.byteswap()
+            self._raw[name] = packed
+        return self._raw[name]
+
+    def values(self, name: str, indexes=None) -> list:
+        """A column decoded to Python values, for every row or just `indexes`."""
+        raw = self.raw(name)
+        if raw is None:
+            return [None] * (self.rows if indexes is None else len(indexes))
+        column = self.columns[name]
+        decode = _decoder(column["kind"], column)
+        if indexes is None:
+            return [decode(v) for v in raw]
+        return [decode(raw[i]) for i in indexes]
+
+
+# --- reading ---
+def _ranges(dataset: str, start: date = None, end: date = None, vehicle_id: int = None, driver_id: int = None):
+    """[(column, low, high)] in stored units for the filters that are set (bounds inclusive)."""
+    columns, date_column = DATASETS[dataset]
+    date_kind = next(kind for name, kind, _ in columns if name == date_column)
+    ranges = []
+    if start or end:
+        if date_kind == "datetime":
+            low = _micros(datetime.combine(start, time.min)) if start else INT_NULL + 1
+            high = _micros(datetime.combine(end + timedelta(days=1), time.min)) - 1 if end else 2 ** 63 - 1
+        else:
+            low = start.toordinal() if start else 1
+            high = end.toordinal() if end else date.max.toordinal()
+        ranges.append((date_column, low, high))
+    for name, value in (("vehicle_id", vehicle_id), ("driver_id", driver_id)):
+        if value is not None:
+            ranges.append((name, value, value))
+    return ranges
+
+
+def segments(db: Session, dataset: str, start: date = None, end: date = None,
+             vehicle_id: int = None, driver_id: int = None) -> list:
+    """The registered segments of dataset whose ranges can hold a matching row, oldest ids first."""
+    s = models.ArchiveSegment
+    stmt = select(s).where(s.dataset == dataset)
+    if start:
+        stmt = stmt.where(s.max_date >= start)
+    if end:
+        stmt = stmt.where(s.min_date <= end)
+    if vehicle_id is not None:
+        stmt = stmt.where(s.min_vehicle_id <= vehicle_id, s.max_vehicle_id >= vehicle_id)
+    if driver_id is not None:
+        stmt = stmt.where(s.min_driver_id <= driver_id, s.max_driver_id >= driver_id)
+    return list(db.scalars(stmt.order_by(s.min_id)))
+
+
+def _matches(segment: Segment, ranges) -> list:
+    """Indexes of the rows of segment inside every range."""
+    if np is not None:
+        mask = np.ones(segment.rows, dtype=bool)
+        for name, low, high in ranges:
+            raw = segment.raw(name)
+            if raw is None:
+                return []
+            values = np.frombuffer(raw, dtype=raw.typecode)
+            mask &= (values >= low) & (values <= high)
+        return np.flatnonzero(mask).tolist()
+    indexes = range(segment.rows)
+    for name, low, high in ranges:
+        raw = segment.raw(name)
+        if raw is None:
+            return []
+        indexes = [i for i in indexes if low <= raw[i] <= high]
+    return list(indexes)
+
+
+def _segment_rows(directory: str, record, names, ranges):
+    segment = Segment(os.path.join(directory, record.path))
+    indexes = _matches(segment, ranges) if ranges else None
+    if indexes == []:
+        return
+    yield from zip(*(segment.values(name, indexes) for name in names))
+
+
+def rows(db: Session, dataset: str, names, start: date = None, end: date = None, vehicle_id: int = None,
+         driver_id: int = None, ordered: bool = True, directory: str = None):
+    """Archived rows of dataset as tuples of `names` that pass the filters.
+
+    With ordered=True the segments are merged lazily into ascending id order
+    ("id" must then come first in names); a segment is only opened once the
+    merge reaches its first id.
+    """
+    directory = directory or DIRECTORY
+    ranges = _ranges(dataset, start, end, vehicle_id, driver_id)
+    records = segments(db, dataset, start, end, vehicle_id, driver_id)
+    if not ordered:
+        for record in records:
+            yield from _segment_rows(directory, record, names, ranges)
+        return
+    if names[0] != "id":
+        raise ValueError("ordered archive reads need 'id' as the first column")
+
+    pending = iter(records)
+    upcoming = next(pending, None)
+    heap = []  # (id, tiebreak, row, rest of that segment)
+    while heap or upcoming is not None:
+        while upcoming is not None and (not heap or upcoming.min_id <= heap[0][0]):
+            source = _segment_rows(directory, upcoming, names, ranges)
+            first = next(source, None)
+            if first is not None:
+                heapq.heappush(heap, (first[0], upcoming.id, first, source))
+            upcoming = next(pending, None)
+        if not heap:
+            continue
+        _, tiebreak, row, source = heapq.heappop(heap)
+        yield row
+        following = next(source, None)
+        if following is not None:
+            heapq.heappush(heap, (following[0], tiebreak, following, source))
+
+
+def arrays(db: Session, dataset: str, names, directory: str = None):
+    """Yield {name: stored array} per segment of dataset, for bulk aggregation (status as codes)."""
+    directory = directory or DIRECTORY
+    for record in segments(db, dataset):
+        segment = Segment(os.path.join(directory, record.path))
+        yield {name: segment.raw(name) for name in names}
+
+
+# --- archiving ---
+def _closed_before(trips, cutoff: datetime):
+    return and_(trips.c.status.in_(CLOSED_STATUSES), trips.c.closed_at < cutoff)
+
+
+def _register(db: Session, dataset: str, path: str, size: int, rows: list):
+    columns = [name for name, _, _ in DATASETS[dataset][0]]
+    pick = lambda name: [row[columns.index(name)] for row in rows]  # noqa: E731
+    day = lambda v: v.date() if isinstance(v, datetime) else v  # noqa: E731
+    dates = [day(v) for v in pick(DATASETS[dataset][1]) if v is not None]
+    vehicles = [v for v in pick("vehicle_id") if v is not None]
+    drivers = [v for v in pick("driver_id") if v is not None]
+    ids = pick("id")
+    db.add(models.ArchiveSegment(
+        dataset=dataset, path=os.path.basename(path), rows=len(rows), size_bytes=size,
+        min_id=min(ids), max_id=max(ids),
+        min_date=min(dates, default=None), max_date=max(dates, default=None),
+        min_vehicle_id=min(vehicles, default=None), max_vehicle_id=max(vehicles, default=None),
+        min_driver_id=min(drivers, default=None), max_driver_id=max(drivers, default=None),
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    ))
+
+
+def archive(db: Session, before: datetime, segment_rows: int = SEGMENT_ROWS, directory: str = None) -> dict:
+    """Move trips closed before `before` (UTC), and their expense logs, into segment files.
+
+    Works through the trips in id order, SEGMENT_ROWS at a time, committing
+    once per segment. If a trip or expense is added or removed between the read
+    and the delete, that chunk is rolled back, its files removed and the chunk
+    read again. Returns {"trips", "expense_logs", "segments", "bytes"}.
+    """
+    directory = directory or DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    trips, expenses = models.Trip.__table__, models.ExpenseLog.__table__
+    archivable = _closed_before(trips, before)
+    expense_columns = [*expenses.columns, trips.c.vehicle_id, trips.c.driver_id]
+    totals = {"trips": 0, "expense_logs": 0, "segments": 0, "bytes": 0}
+    last_id, retries = 0, 0
+    while True:
+        chunk = db.execute(
+            select(*trips.columns).where(archivable, trips.c.id > last_id).order_by(trips.c.id).limit(segment_rows)
+        ).all()
+        if not chunk:
+            db.rollback()
+            return totals
+        low, high = chunk[0].id, chunk[-1].id
+        in_chunk = and_(trips.c.id.between(low, high), archivable)
+        logs = db.execute(
+            select(*expense_columns).join(trips, trips.c.id == expenses.c.trip_id)
+            .where(in_chunk).order_by(expenses.c.id)
+        ).all()
+
+        written = []
+        try:
+            for dataset, data in (("trips", chunk), ("expense_logs", logs)):
+                if not data:
+                    continue
+                path = os.path.join(directory, f"{dataset}-{low:010d}-{high:010d}-{uuid.uuid4().hex[:8]}.seg")
+                size = write_segment(path, dataset, data)
+                written.append((path, size))
+                _register(db, dataset, path, size, data)
+            deleted_logs = db.execute(
+                delete(expenses).where(expenses.c.trip_id.in_(select(trips.c.id).where(in_chunk)))
+            ).rowcount
+            deleted_trips = db.execute(delete(trips).where(in_chunk)).rowcount
+            consistent = (deleted_trips, deleted_logs) == (len(chunk), len(logs))
+            if consistent:
+                db.commit()
+        except BaseException:
+            db.rollback()
+            for path, _ in written:
+                os.remove(path)
+            raise
+        if not consistent:
+            # Rows changed under us; nothing was deleted, so read the chunk again
+            db.rollback()
+            for path, _ in written:
+                os.remove(path)
+            retries += 1
+            if retries > 3:
+                raise RuntimeError(f"Trips {low}-{high} kept changing while being archived")
+            continue
+
+        retries, last_id = 0, high
+        totals["trips"] += len(chunk)
+        totals["expense_logs"] += len(logs)
+        totals["segments"] += len(written)
+        totals["bytes"] += sum(size for _, size in written)
+
+
+def cutoff(horizon_days: int = HORIZON_DAYS) -> datetime:
+    """Start of the UTC day horizon_days ago: trips closed before it are archived."""
+    today = datetime.now(timezone.utc).date()
+    return datetime.combine(today - timedelta(days=horizon_days), time.min)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time as clock
+    from .database import SessionLocal, engine
+    from . import cache, migrations
+
+    parser = argparse.ArgumentParser(description="Move closed trips and their expenses into archive segments.")
+    parser.add_argument("--horizon-days", type=int, default=HORIZON_DAYS)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to give the space back (SQLite)")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    started = clock.perf_counter()
+    with SessionLocal() as db:
+        moved = archive(db, cutoff(args.horizon_days))
+    cache.versions.bump("trips", "expense_logs")
+    print(f"Archived {moved['trips']} trips and {moved['expense_logs']} expense logs into {moved['segments']} "
+          f"segments ({moved['bytes'] / 1e6:.1f} MB) under {DIRECTORY} in {clock.perf_counter() - started:.1f}s.")
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+        print(f"Vacuumed in {clock.perf_counter() - started:.1f}s total.")
@@ -0,0 +1,77 @@
+# app/assignment.py
+# Capacity-aware assignment engine behind POST /trips/dispatch/batch.
+#
+# Available vehicles are kept in a list sorted by capacity_kg. Cargo is placed
+# heaviest first, and each load takes the smallest truck that can carry it
+# (best fit, found by binary search), so big trucks stay free for the loads
+# that actually need them. Drivers carry no capacity, so eligible drivers are
+# handed out in order.
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Assignment(NamedTuple):
+    request_index: int
+    vehicle_id: int
+    driver_id: int
+
+
+class Unassigned(NamedTuple):
+    request_index: int
+    reason: str
+
+
+class CapacityIndex:
+    """Available vehicles sorted by capacity, with best-fit take()."""
+
+    def __init__(self, vehicles: Sequence[Tuple[int, int]]):
+        # (capacity_kg, vehicle_id) pairs; the id breaks ties deterministically
+        ordered = sorted((capacity or 0, vehicle_id) for vehicle_id, capacity in vehicles)
+        self._capacities = [capacity for capacity, _ in ordered]
+        self._ids = [vehicle_id for _, vehicle_id in ordered]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def take(self, weight: int) -> Optional[int]:
+        """Remove and return the smallest vehicle that can carry `weight`, or None."""
+        i = bisect_left(self._capacities, weight)
+        if i == len(self._capacities):
+            return None
+        del self._capacities[i]
+        return self._ids.pop(i)
+
+
+def best_fit_assign(
+    weights: Sequence[int],
+    vehicles: Sequence[Tuple[int, int]],
+    driver_ids: Sequence[int],
+) -> Tuple[List[Assignment], List[Unassigned]]:
+    """Assign each cargo weight to a (vehicle, driver) pair.
+
+    `vehicles` is (vehicle_id, capacity_kg) for every available vehicle and
+    `driver_ids` lists every eligible driver. Returns the assignments (in request
+    order) and the requests that could not be placed, with the reason.
+    """
+    index = CapacityIndex(vehicles)
+    next_driver = 0
+    assigned, unassigned = [], []
+
+    # Best-fit decreasing: place the heaviest loads while the choice is widest
+    for i in sorted(range(len(weights)), key=lambda i: weights[i], reverse=True):
+        if next_driver == len(driver_ids):
+            unassigned.append(Unassigned(i, "No eligible driver."))
+            continue
+        if not len(index):
+            unassigned.append(Unassigned(i, "No available vehicle."))
+            continue
+        vehicle_id = index.take(weights[i])
+        if vehicle_id is None:
+            unassigned.append(Unassigned(i, "No available vehicle can carry this weight."))
+            continue
+        assigned.append(Assignment(i, vehicle_id, driver_ids[next_driver]))
+        next_driver += 1
+
+    assigned.sort(key=lambda a: a.request_index)
+    unassigned.sort(key=lambda u: u.request_index)
+    return assigned, unassigned
@@ -0,0 +1,202 @@
+# app/availability.py
+# Process-local index of what the dispatcher form can pick from: vehicles that
+# are "Available" and drivers that are "On Duty". /trips/available-resources
+# answers its dropdowns from here instead of querying both tables per load.
+#
+# Drivers are bucketed by license expiry date, with the dates kept sorted. The
+# "license not expired" rule is then just a cut at today's date: buckets before
+# the cut are skipped (and dropped once the day has passed) without looking at
+# every driver. The same drivers are also kept in a list sorted by score, so
+# the dropdown can be ranked (and cut at a minimum score) without sorting.
+#
+# The routers update the index after each commit that changes availability.
+# Writes made by other processes (another uvicorn worker, a script) are not
+# seen here, so the whole index is rebuilt from the database every
+# FLEETFLOW_AVAILABILITY_REBUILD_S seconds to bound any drift. Writes that
+# land while a rebuild is reading are replayed onto its result (see rebuild).
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from sqlalchemy.orm import Session
+from . import models, schemas
+
+REBUILD_INTERVAL_S = float(os.getenv("FLEETFLOW_AVAILABILITY_REBUILD_S", "60"))
+
+
+class AvailabilityIndex:
+    def __init__(self, rebuild_interval_s: float = REBUILD_INTERVAL_S):
+        self.rebuild_interval_s = rebuild_interval_s
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._vehicles = {}         # vehicle id -> VehicleResponse
+        self._driver_buckets = {}   # expiry date -> {driver id: DriverResponse}
+        self._expiry_dates = []     # sorted keys of _driver_buckets
+        self._driver_expiry = {}    # driver id -> expiry date (to find its bucket)
+        self._by_score = []         # sorted (-score, driver id), best first
+        self._generation = 0        # number of writes applied so far
+        self._rebuilds = 0          # rebuilds between their read and their swap
+        self._journal = []          # writes made while a rebuild was running
+        self._journal_start = 0     # generation of the first journal entry
+
+    # --- reads ---
+    def snapshot(self, db: Session, today: date = None, by_score: bool = False, min_score: float = None):
+        """(available vehicles, eligible drivers); rebuilds first if the index is stale.
+
+        Drivers come in license expiry order, or best score first with by_score;
+        min_score leaves out drivers rated below it.
+        """
+        today = today or date.today()
+        if self._built_at is None or time.monotonic() - self._built_at > self.rebuild_interval_s:
+            self.rebuild(db)
+
+        with self._lock:
+            self._drop_expired(today)
+            if by_score:
+                ranked = self._by_score
+                if min_score is not None:
+                    ranked = ranked[:bisect_right(ranked, (-min_score, math.inf))]
+                drivers = [self._driver_buckets[self._driver_expiry[driver_id]][driver_id] for _, driver_id in ranked]
+            else:
+                drivers = [d for expiry in self._expiry_dates for d in self._driver_buckets[expiry].values()
+                           if min_score is None or d.score >= min_score]
+            return list(self._vehicles.values()), drivers
+
+    # --- full rebuild ---
+    def rebuild(self, db: Session):
+        # The snapshot is read outside the lock, so writes can land between the
+        # read and the swap. Each write moves the generation on and, while a
+        # rebuild is running, is kept in the journal; the swap replays the
+        # writes made since its read started so none of them is lost.
+        with self._lock:
+            if not self._rebuilds:
+                self._journal, self._journal_start = [], self._generation
+            start = self._generation
+            self._rebuilds += 1
+        try:
+            vehicles = db.query(models.Vehicle).filter(
+                models.Vehicle.status == "Available"
+            ).order_by(models.Vehicle.id).all()
+            drivers = db.query(models.Driver).filter(
+                models.Driver.status == "On Duty",
+                models.Driver.expiry_date >= date.today()
+            ).order_by(models.Driver.id).all()
+            vehicles = {v.id: schemas.VehicleResponse.model_validate(v) for v in vehicles}
+            drivers = [schemas.DriverResponse.model_validate(d) for d in drivers]
+        except BaseException:
+            with self._lock:
+                self._end_rebuild()
+            raise
+
+        with self._lock:
+            self._vehicles = vehicles
+            self._driver_buckets, self._expiry_dates, self._driver_expiry, self._by_score = {}, [], {}, []
+            for driver in drivers:
+                self._add_driver(driver, keep_sorted=False)
+            self._by_score.sort()
+            self._built_at = time.monotonic()
+            for write in self._journal[start - self._journal_start:]:
+                self._apply(*write)
+            self._end_rebuild()
+
+    # --- write paths (call after the change is committed) ---
+    def vehicle_changed(self, vehicle: models.Vehicle):
+        response = schemas.VehicleResponse.model_validate(vehicle) if vehicle.status == "Available" else None
+        with self._lock:
+            self._write("vehicle", vehicle.id, response)
+
+    def driver_changed(self, driver: models.Driver):
+        eligible = driver.status == "On Duty" and driver.expiry_date is not None
+        response = schemas.DriverResponse.model_validate(driver) if eligible else None
+        with self._lock:
+            self._write("driver", driver.id, response)
+
+    def remove_vehicles(self, vehicle_ids):
+        with self._lock:
+            for vehicle_id in vehicle_ids:
+                self._write("vehicle", vehicle_id, None)
+
+    def remove_drivers(self, driver_ids):
+        with self._lock:
+            for driver_id in driver_ids:
+                self._write("driver", driver_id, None)
+
+    def odometers_changed(self, odometers: dict):
+        """Advance cached odometers to new readings ({vehicle id: odometer}), never backwards."""
+        with self._lock:
+            self._write("odometers", odometers)
+
+    def invalidate(self):
+        """Force a full rebuild on the next read."""
+        with self._lock:
+            self._write("invalidate")
+
+    # --- internals (caller holds the lock) ---
+    def _write(self, *write):
+        self._apply(*write)
+        self._generation += 1
+        if self._rebuilds:
+            self._journal.append(write)
+
+    def _apply(self, kind, *args):
+        if kind == "vehicle":
+            vehicle_id, response = args
+            if response is None:
+                self._vehicles.pop(vehicle_id, None)
+            else:
+                self._vehicles[vehicle_id] = response
+        elif kind == "driver":
+            driver_id, response = args
+            self._remove_driver(driver_id)
+            if response is not None:
+                self._add_driver(response)
+        elif kind == "odometers":
+            for vehicle_id, odometer in args[0].items():
+                vehicle = self._vehicles.get(vehicle_id)
+                if vehicle is not None and vehicle.odometer < odometer:
+                    self._vehicles[vehicle_id] = vehicle.model_copy(update={"odometer": odometer})
+        elif kind == "invalidate":
+            self._built_at = None
+
+    def _end_rebuild(self):
+        self._rebuilds -= 1
+        if not self._rebuilds:
+            self._journal = []
+
+    def _add_driver(self, driver: schemas.DriverResponse, keep_sorted: bool = True):
+        bucket = self._driver_buckets.get(driver.expiry_date)
+        if bucket is None:
+            bucket = self._driver_buckets[driver.expiry_date] = {}
+            insort(self._expiry_dates, driver.expiry_date)
+        bucket[driver.id] = driver
+        self._driver_expiry[driver.id] = driver.expiry_date
+        if keep_sorted:
+            insort(self._by_score, (-driver.score, driver.id))
+        else:
+            self._by_score.append((-driver.score, driver.id))
+
+    def _remove_driver(self, driver_id: int):
+        expiry = self._driver_expiry.pop(driver_id, None)
+        if expiry is None:
+            return
+        bucket = self._driver_buckets[expiry]
+        driver = bucket.pop(driver_id)
+        del self._by_score[bisect_left(self._by_score, (-driver.score, driver_id))]
+        if not bucket:
+            del self._driver_buckets[expiry]
+            del self._expiry_dates[bisect_left(self._expiry_dates, expiry)]
+
+    def _drop_expired(self, today: date):
+        cut = bisect_left(self._expiry_dates, today)
+        if not cut:
+            return
+        for expiry in self._expiry_dates[:cut]:
+            for driver_id in self._driver_buckets.pop(expiry):
+                self._driver_expiry.pop(driver_id, None)
+        del self._expiry_dates[:cut]
+        self._by_score = [entry for entry in self._by_score if entry[1] in self._driver_expiry]
+
+
+index = AvailabilityIndex()
@@ -0,0 +1,178 @@
+# app/bulk.py
+# Bulk ingest for vehicles, drivers and expense logs, from a JSON batch or an
+# uploaded CSV file (the CSV endpoints need python-multipart, as any FastAPI
+# file upload does).
+#
+# Rows are processed CHUNK_SIZE at a time:
+#   1. each row is validated against the same schema as the single-row endpoint;
+#   2. unique keys / foreign keys for the whole chunk are checked with one
+#      "... WHERE key IN (...)" query;
+#   3. the valid rows go in with one executemany INSERT, the counters and
+#      rollups are updated once per chunk, and the chunk is committed.
+# Invalid rows are skipped and reported with their row number, so one bad line
+# does not sink a 50k-row upload. Memory is bounded by the chunk size.
+#
+# The CSV header uses the JSON field names (licensePlate, maxPayload, ...).
+import csv
+import io
+import os
+from datetime import date
+from itertools import islice
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models, schemas, counters, rollups
+
+CHUNK_SIZE = int(os.getenv("FLEETFLOW_IMPORT_CHUNK_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 1000
+
+
+# --- one prepare step per resource: (db, [(row, validated item)]) -> (records, rejects) ---
+def _prepare_vehicles(db: Session, items):
+    plates = {v.licensePlate for _, v in items}
+    taken = {plate for (plate,) in db.query(models.Vehicle.plate).filter(models.Vehicle.plate.in_(plates))}
+    records, rejects = [], []
+    for row, v in items:
+        if v.licensePlate in taken:
+            rejects.append((row, f"License plate {v.licensePlate} already exists"))
+            continue
+        taken.add(v.licensePlate)
+        records.append({
+            "plate": v.licensePlate,
+            "model": v.model,
+            "type": v.type,
+            "capacity_kg": v.maxPayload * 1000, # tons -> kg, as in create_vehicle
+            "odometer": v.initialOdometer,
+            "status": "Available",
+        })
+    counters.record_vehicle_added(db, "Available", count=len(records))
+    return records, rejects
+
+
+def _prepare_drivers(db: Session, items):
+    numbers = {d.license_number for _, d in items}
+    taken = {n for (n,) in db.query(models.Driver.license_number).filter(models.Driver.license_number.in_(numbers))}
+    records, rejects = [], []
+    for row, d in items:
+        if d.license_number in taken:
+            rejects.append((row, f"License number {d.license_number} already exists"))
+            continue
+        taken.add(d.license_number)
+        records.append({
+            "name": d.name,
+            "license_number": d.license_number,
+            "expiry_date": d.expiry_date,
+            "completion_rate": 100.0,
+            "safety_score": 100.0,
+            "complaints": 0,
+            "status": "On Duty",
+        })
+    return records, rejects
+
+
+def _prepare_expenses(db: Session, items):
+    # Trip -> (vehicle, driver name) for the whole chunk in one joined query
+    trip_ids = {e.tripId for _, e in items}
+    trips = {
+        trip_id: (vehicle_id, driver_name)
+        for trip_id, vehicle_id, driver_name in db.query(
+            models.Trip.id, models.Trip.vehicle_id, models.Driver.name
+        ).outerjoin(models.Driver, models.Driver.id == models.Trip.driver_id).filter(models.Trip.id.in_(trip_ids))
+    }
+    # Trips that already have an expense are not counted again in the rollups
+    counted = {trip_id for (trip_id,) in db.query(models.ExpenseLog.trip_id).filter(
+        models.ExpenseLog.trip_id.in_(trip_ids)).distinct()}
+    today = date.today()
+    records, rejects, rollup_entries = [], [], []
+    for row, e in items:
+        trip = trips.get(e.tripId)
+        if trip is None:
+            rejects.append((row, f"Trip {e.tripId} not found"))
+            continue
+        vehicle_id, driver_name = trip
+        day = e.date or today
+        records.append({
+            "trip_id": e.tripId,
+            "driver_name": e.driverName or driver_name or "Unknown",
+            "distance_km": e.distance,
+            "fuel_cost": e.fuelCost,
+            "misc_expense": e.miscExpense,
+            "status": "Done",
+            "date": day,
+        })
+        rollup_entries.append((vehicle_id, day, e.fuelCost, e.miscExpense, e.distance, e.tripId not in counted))
+        counted.add(e.tripId)
+    rollups.record_expenses(db, rollup_entries)
+    return records, rejects
+
+
+IMPORTERS = {
+    "vehicles": (schemas.VehicleCreate, models.Vehicle, _prepare_vehicles),
+    "drivers": (schemas.DriverCreate, models.Driver, _prepare_drivers),
+    "expenses": (schemas.ExpenseCreate, models.ExpenseLog, _prepare_expenses),
+}
+
+
+# --- row sources: iterables of (row number, raw dict) ---
+def json_rows(rows):
+    return enumerate(rows)
+
+
+def csv_rows(binary_file):
+    """Rows of an uploaded CSV, numbered by their line in the file. Empty cells are omitted."""
+    reader = csv.DictReader(io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline=""))
+    for raw in reader:
+        yield reader.line_num, {k: v for k, v in raw.items() if k and v not in (None, "")}
+
+
+# --- driver ---
+def _error_text(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+
+
+def import_rows(db: Session, kind: str, rows) -> dict:
+    """Validate and insert `rows` chunk by chunk; returns an ImportReport dict.
+
+    Each chunk is committed on its own, so rows from earlier chunks stay in even
+    if a later chunk fails.
+    """
+    schema, model, prepare = IMPORTERS[kind]
+    report = {"received": 0, "inserted": 0, "failed": 0, "errors": []}
+
+    def reject(row, message):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row, "error": message})
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            report["errors"].sort(key=lambda err: err["row"])
+            return report
+        report["received"] += len(chunk)
+
+        items = []
+        for row, raw in chunk:
+            try:
+                items.append((row, schema.model_validate(raw)))
+            except ValidationError as exc:
+                reject(row, _error_text(exc))
+
+        # A concurrent writer can take a plate/license between the lookup and the
+        # insert; the chunk is then rolled back and prepared again, once.
+        for attempt in range(2):
+            try:
+                records, rejects = prepare(db, items)
+                if records:
+                    db.execute(insert(model), records)
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt:
+                    raise
+        for row, message in rejects:
+            reject(row, message)
+        report["inserted"] += len(records)
@@ -0,0 +1,150 @@
+# app/cache.py
+# Versioned response cache for the polled read endpoints (dashboard, analytics).
+#
+# Every table has a write version. The mutating routers bump the versions of
+# the tables they touched right after they commit. A cached response is keyed
+# by the request plus the current versions of the tables it reads, and that
+# key is also its ETag. So:
+#   * If-None-Match equal to the current ETag -> 304, without touching the DB;
+#   * an unchanged table set -> the stored body is served from memory;
+#   * any write to one of the tables -> new versions, new key, fresh response.
+#
+# The versions live in a small memory-mapped file next to the SQLite database,
+# so every uvicorn worker process sees the bumps made by the others. (For a
+# server database, point FLEETFLOW_CACHE_VERSIONS_PATH at a path shared by the
+# workers of one host.) Responses themselves are cached per process in an LRU
+# bounded by FLEETFLOW_CACHE_MAX_BYTES.
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.engine import make_url
+from .database import SQLALCHEMY_DATABASE_URL, is_sqlite
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+# Slot order is the on-disk layout of the versions file. Append only.
+TABLES = ("vehicles", "drivers", "trips", "maintenance_logs", "expense_logs", "revoked_tokens")
+
+MAX_BYTES = int(os.getenv("FLEETFLOW_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+def _default_versions_path() -> str:
+    path = os.getenv("FLEETFLOW_CACHE_VERSIONS_PATH")
+    if path:
+        return path
+    if is_sqlite(SQLALCHEMY_DATABASE_URL):
+        database = make_url(SQLALCHEMY_DATABASE_URL).database
+        if database and database != ":memory:":
+            return os.path.abspath(database) + "-versions"
+    return os.path.join(tempfile.gettempdir(), "fleetflow-cache-versions")
+
+
+class TableVersions:
+    """Per-table write counters shared between processes through an mmap'd file."""
+
+    def __init__(self, path: str, tables=TABLES):
+        self.slots = {name: i for i, name in enumerate(tables)}
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        size = 8 * len(tables)
+        if os.path.getsize(path) < size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def read(self, tables) -> tuple:
+        return tuple(struct.unpack_from("<q", self._map, 8 * self.slots[t])[0] for t in tables)
+
+    def bump(self, *tables):
+        """Call after the commit that changed `tables`."""
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                for t in tables:
+                    offset = 8 * self.slots[t]
+                    (current,) = struct.unpack_from("<q", self._map, offset)
+                    struct.pack_into("<q", self._map, offset, current + 1)
+            finally:
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def bump_all(self):
+        self.bump(*self.slots)
+
+
+class ResponseCache:
+    """LRU of serialized response bodies, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+versions = TableVersions(_default_versions_path())
+responses = ResponseCache()
+
+_adapters = {}
+
+
+def _etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def cached_response(request: Request, tables, response_model, compute) -> Response:
+    """Serve `await compute()` (validated against response_model) through the cache.
+
+    The versions are read before computing, so a write that commits meanwhile
+    can only leave its result under an already outdated key.
+    """
+    current = versions.read(tables)
+    # today is part of the key because date-relative defaults (e.g. "last 12 months") move with it
+    raw_key = f"{request.url.path}?{request.url.query}|{current}|{date.today()}"
+    etag = '"' + hashlib.blake2b(raw_key.encode(), digest_size=12).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = responses.get(etag)
+    if body is None:
+        adapter = _adapters.get(response_model)
+        if adapter is None:
+            adapter = _adapters[response_model] = TypeAdapter(response_model)
+        body = adapter.dump_json(adapter.validate_python(await compute(), from_attributes=True))
+        responses.put(etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
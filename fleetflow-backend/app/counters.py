@@ -0,0 +1,127 @@
+# app/counters.py
+# Incrementally maintained fleet KPIs. The routers call the record_* helpers
+# before they commit, so the counter row changes in the same transaction as
+# the status change it describes. The dashboard then reads one row instead of
+# running a COUNT over the vehicles and trips tables on every poll.
+#
+# Rebuild the counters from the base tables (and report any drift) with:
+#     python -m app.counters
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models
+
+COUNTER_ID = 1
+
+# Vehicle.status value -> FleetCounters column
+VEHICLE_STATUS_COLUMNS = {
+    "Available": "available",
+    "On Trip": "on_trip",
+    "In Shop": "in_shop",
+    "Out of Service": "out_of_service",
+}
+
+COUNTER_FIELDS = ["total_vehicles", *VEHICLE_STATUS_COLUMNS.values(), "dispatched_trips"]
+
+
+def _bump(db: Session, deltas: dict):
+    # UPDATE ... SET col = col + delta, so concurrent writers never lose an increment
+    deltas = {k: v for k, v in deltas.items() if k and v}
+    if not deltas:
+        return
+    get_counters(db)  # make sure the row exists before the first update
+    db.query(models.FleetCounters).filter(models.FleetCounters.id == COUNTER_ID).update(
+        {getattr(models.FleetCounters, col): getattr(models.FleetCounters, col) + delta
+         for col, delta in deltas.items()},
+        synchronize_session=False,
+    )
+
+
+def record_vehicle_added(db: Session, status: str = "Available", count: int = 1):
+    _bump(db, {"total_vehicles": count, VEHICLE_STATUS_COLUMNS.get(status): count})
+
+
+def record_vehicle_status_change(db: Session, old_status: str, new_status: str, count: int = 1):
+    if old_status == new_status:
+        return
+    deltas = {}
+    old_col = VEHICLE_STATUS_COLUMNS.get(old_status)
+    new_col = VEHICLE_STATUS_COLUMNS.get(new_status)
+    if old_col:
+        deltas[old_col] = -count
+    if new_col:
+        deltas[new_col] = deltas.get(new_col, 0) + count
+    _bump(db, deltas)
+
+
+def record_trip_status_change(db: Session, old_status, new_status: str, count: int = 1):
+    """old_status is None for newly created trips."""
+    if old_status == new_status:
+        return
+    delta = (new_status == "Dispatched") - (old_status == "Dispatched")
+    _bump(db, {"dispatched_trips": delta * count})
+
+
+def count_from_base_tables(db: Session) -> dict:
+    """Recount every counter from vehicles/trips (two grouped queries)."""
+    counts = dict.fromkeys(COUNTER_FIELDS, 0)
+    rows = db.query(models.Vehicle.status, func.count(models.Vehicle.id)).group_by(models.Vehicle.status).all()
+    for status, n in rows:
+        counts["total_vehicles"] += n
+        col = VEHICLE_STATUS_COLUMNS.get(status)
+        if col:
+            counts[col] = n
+    counts["dispatched_trips"] = db.query(func.count(models.Trip.id)).filter(
+        models.Trip.status == "Dispatched"
+    ).scalar() or 0
+    return counts
+
+
+def get_counters(db: Session) -> models.FleetCounters:
+    """The counter row, seeded from the base tables the first time it is needed."""
+    row = db.get(models.FleetCounters, COUNTER_ID)
+    if row is None:
+        row = models.FleetCounters(id=COUNTER_ID, **count_from_base_tables(db))
+        db.add(row)
+        db.flush()
+    return row
+
+
+def reconcile(db: Session) -> dict:
+    """Rebuild the counters from the base tables.
+
+    Returns {field: (stored, actual)} for every counter that had drifted.
+    The caller commits.
+    """
+    actual = count_from_base_tables(db)
+    row = db.get(models.FleetCounters, COUNTER_ID)
+    if row is None:
+        db.add(models.FleetCounters(id=COUNTER_ID, **actual))
+        return {field: (None, value) for field, value in actual.items()}
+
+    drift = {}
+    for field, value in actual.items():
+        stored = getattr(row, field)
+        if stored != value:
+            drift[field] = (stored, value)
+            setattr(row, field, value)
+    return drift
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        drift = reconcile(db)
+        db.commit()
+    finally:
+        db.close()
+
+    if drift:
+        from . import cache
+        cache.versions.bump("vehicles", "trips")
+    else:
+        print("Fleet counters are in sync.")
+    for field, (stored, actual) in drift.items():
+        print(f"{field}: stored={stored} actual={actual}")
@@ -1,15 +1,77 @@
 # app/database.py
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from . import metrics
 
-# We use SQLite for development. 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./fleetflow.db"
+# We use SQLite for development. Any SQLAlchemy URL can be set through the
+# environment, e.g. FLEETFLOW_DATABASE_URL=postgresql+psycopg://user:pw@host/fleetflow
+SQLALCHEMY_DATABASE_URL = os.getenv("FLEETFLOW_DATABASE_URL", "sqlite:///./fleetflow.db")
 
-# connect_args={"check_same_thread": False} is strictly needed for SQLite in FastAPI
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# --- SQLite profile ---
+# "tuned" (default) switches the file to WAL so readers never wait behind the
+# dispatch writer, and relaxes fsyncs to once per checkpoint (synchronous=NORMAL,
+# still crash-safe in WAL mode). "default" leaves SQLite's own settings alone.
+SQLITE_PROFILE = os.getenv("FLEETFLOW_SQLITE_PROFILE", "tuned")
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("FLEETFLOW_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("FLEETFLOW_SQLITE_CACHE_KB", "65536")),  # negative = KiB
+    "mmap_size": int(os.getenv("FLEETFLOW_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+# --- Pool settings for client-server databases (ignored for SQLite) ---
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("FLEETFLOW_DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("FLEETFLOW_DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": int(os.getenv("FLEETFLOW_DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("FLEETFLOW_DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("FLEETFLOW_DB_POOL_PRE_PING", "1") == "1",
+}
+
+def is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def is_busy(exc) -> bool:
+    """True if a DBAPI error (or SQLAlchemy's wrapper of one) is SQLite's BUSY or LOCKED."""
+    orig = getattr(exc, "orig", exc)
+    code = getattr(orig, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (5, 6)  # SQLITE_BUSY, SQLITE_LOCKED and their extended codes
+    # Drivers that do not expose the code (e.g. through aiosqlite's adapter)
+    message = str(orig).lower()
+    return "database is locked" in message or "database table is locked" in message or "database is busy" in message
+
+def apply_sqlite_pragmas(sync_engine, pragmas=SQLITE_PRAGMAS):
+    """Run the PRAGMAs on every new DBAPI connection the engine opens."""
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def engine_options(url) -> dict:
+    if is_sqlite(url):
+        # connect_args={"check_same_thread": False} is strictly needed for SQLite in FastAPI
+        return {"connect_args": {"check_same_thread": False}}
+    return dict(POOL_SETTINGS)
+
+def build_engine(url=SQLALCHEMY_DATABASE_URL, sqlite_profile=SQLITE_PROFILE):
+    new_engine = create_engine(url, **engine_options(url))
+    if is_sqlite(url) and sqlite_profile == "tuned":
+        apply_sqlite_pragmas(new_engine)
+    return new_engine
+
+engine = build_engine()
+if metrics.ENABLED:
+    # Statement counts and DB time per request (see app/metrics.py)
+    metrics.instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,4 +83,72 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Async database path ---
+# FLEETFLOW_DB_MODE=async serves requests from an AsyncSession (aiosqlite locally;
+# point FLEETFLOW_ASYNC_DATABASE_URL at e.g. postgresql+asyncpg://... for a server DB),
+# so waiting on the database no longer ties up a threadpool worker.
+# The default "sync" mode keeps the original blocking engine. Scripts and the
+# NDJSON streams always use the sync engine above.
+DB_MODE = os.getenv("FLEETFLOW_DB_MODE", "sync")
+ASYNC_DATABASE_URL = os.getenv("FLEETFLOW_ASYNC_DATABASE_URL") or (
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if is_sqlite(SQLALCHEMY_DATABASE_URL) else None
+)
+
+if DB_MODE not in ("sync", "async"):
+    raise RuntimeError(f"FLEETFLOW_DB_MODE must be 'sync' or 'async', got {DB_MODE!r}")
+
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    if not ASYNC_DATABASE_URL:
+        raise RuntimeError("Set FLEETFLOW_ASYNC_DATABASE_URL (e.g. postgresql+asyncpg://...) for async mode")
+    # aiosqlite runs each connection on its own thread, so it needs no connect_args
+    async_options = {} if is_sqlite(ASYNC_DATABASE_URL) else dict(POOL_SETTINGS)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_options)
+    if is_sqlite(ASYNC_DATABASE_URL) and SQLITE_PROFILE == "tuned":
+        apply_sqlite_pragmas(async_engine.sync_engine)
+    if metrics.ENABLED:
+        metrics.instrument_engine(async_engine.sync_engine)
+    # Rows are serialized after the handler returns, outside the session's
+    # greenlet, so they must not be expired (and lazily re-fetched) on commit.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    AsyncSession = None
+    async_engine = None
+    AsyncSessionLocal = None
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# The dependency the routers use: an AsyncSession or a Session depending on DB_MODE
+get_session = get_async_db if DB_MODE == "async" else get_db
+
+async def run(db, fn, *args, **kwargs):
+    """Run fn(session, *args, **kwargs) against the session handed out by get_session.
+
+    Router logic is written once against the ORM Session API. In async mode it
+    runs through AsyncSession.run_sync, so database I/O is awaited on the event
+    loop; in sync mode it runs on the threadpool, exactly like a plain def route.
+    """
+    if AsyncSession is not None and isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def _run_in_session(fn, *args, **kwargs):
+    with SessionLocal() as db:
+        return fn(db, *args, **kwargs)
+
+async def run_detached(fn, *args, **kwargs):
+    """run() against a session of its own, for work that may outlive the request.
+
+    The request's session is closed by its dependency when the request ends
+    (or is cancelled), even if work started on it is still running elsewhere.
+    """
+    if DB_MODE == "async":
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(_run_in_session, fn, *args, **kwargs)
@@ -0,0 +1,115 @@
+# app/events.py
+# In-process event bus behind GET /events/stream (server-sent events).
+#
+# The routers publish a compact delta right after each commit that changes
+# what the dashboard or the trip board shows (a dispatch, a vehicle going
+# "In Shop", a retired truck, a driver status change). Screens apply the
+# deltas instead of re-polling the full lists.
+#
+# Events live in one shared ring buffer of the last FLEETFLOW_EVENTS_BUFFER
+# events. A subscriber holds nothing but the id of the last event it sent;
+# publish() wakes every waiting subscriber at once, and each one copies what
+# it has not seen yet from the buffer. Memory per idle connection is therefore
+# constant, however many events are published.
+#
+# Ids are increasing integers, sent as the SSE "id:" field, so a reconnecting
+# browser resumes with Last-Event-ID. If the events it missed have already
+# left the buffer (or the id belongs to a previous server process) it gets a
+# single "reset" event and should reload its lists.
+#
+# The bus is per process: with several uvicorn workers, a subscriber only
+# sees the writes handled by its own worker.
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+
+BUFFER_SIZE = int(os.getenv("FLEETFLOW_EVENTS_BUFFER", "1000"))
+MAX_SUBSCRIBERS = int(os.getenv("FLEETFLOW_EVENTS_MAX_SUBSCRIBERS", "10000"))
+KEEPALIVE_S = float(os.getenv("FLEETFLOW_EVENTS_KEEPALIVE_S", "15"))
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class EventBus:
+    def __init__(self, buffer_size: int = BUFFER_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self._buffer = deque(maxlen=buffer_size)  # (id, encoded SSE frame)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    # --- write side (call after the change is committed; safe from any thread) ---
+    def publish(self, event_type: str, data: dict):
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        with self._lock:
+            self._last_id += 1
+            self._buffer.append((self._last_id, f"id: {self._last_id}\nevent: {event_type}\ndata: {payload}\n\n"))
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        # One Event per "generation": everybody waiting on it is released together
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    # --- read side ---
+    def since(self, last_id: int):
+        """Frames after `last_id`, or None if some of them are no longer buffered."""
+        with self._lock:
+            if last_id > self._last_id:
+                return None  # an id from a previous process
+            if not self._buffer or last_id >= self._buffer[-1][0]:
+                return []
+            if last_id < self._buffer[0][0] - 1:
+                return None
+            start = last_id - self._buffer[0][0] + 1
+            return [self._buffer[i][1] for i in range(start, len(self._buffer))]
+
+    async def stream(self, last_id: int = None):
+        """Async generator of SSE frames for one subscriber."""
+        if self.subscribers >= self.max_subscribers:
+            raise TooManySubscribers()
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+
+        self.subscribers += 1
+        try:
+            if last_id is None:
+                last_id = self._last_id
+                yield f"retry: 3000\nid: {last_id}\nevent: hello\ndata: {{}}\n\n"
+            while True:
+                frames = self.since(last_id)
+                if frames is None:
+                    last_id = self._last_id
+                    yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+                elif frames:
+                    last_id += len(frames)
+                    yield "".join(frames)
+                else:
+                    wakeup = self._wakeup
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), KEEPALIVE_S)
+                    except asyncio.TimeoutError:
+                        # A comment line; lets proxies and the server notice dead connections
+                        yield ": keepalive\n\n"
+        finally:
+            self.subscribers -= 1
+
+
+bus = EventBus()
+
+
+def publish(event_type: str, data: dict):
+    bus.publish(event_type, data)
@@ -0,0 +1,235 @@
+# app/fuel.py
+# Fuel cost estimates for a trip from the expense history.
+#
+# The expense logs of past trips are summed per (origin, destination, vehicle
+# type) cell: trips, kilometres and fuel cost. An estimate is
+#
+#   distance    mean kilometres per trip on the route, over every vehicle type
+#               (the reverse direction stands in for a route never driven)
+#   cost per km fuel cost / kilometres of the cell once it has MIN_SAMPLES
+#               trips, else of the vehicle type, else of the whole fleet
+#   fuel cost   distance * cost per km
+#
+# Only expense logs with a distance are samples (SAMPLE_ROWS): a 0 km log says
+# nothing about the route and would drag its mean distance down. A trip counts
+# once, in its first sample. Place names are matched case- and
+# whitespace-insensitively. The sums live in
+# a process-local matrix, like app/availability.py: logging an expense adds to
+# its cell after the commit, and each answer is memoized until the next change,
+# so estimates never touch the database. Writes by other processes (other
+# workers, bulk imports, the archive job) are picked up by a full rebuild every
+# FLEETFLOW_FUEL_REBUILD_S seconds; after the first build that rebuild runs on a
+# background thread while the current matrix keeps answering.
+#
+# Re-estimate every open trip (e.g. after a fuel price change) with:
+#     python -m app.fuel
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models, queries
+
+try:
+    import numpy as np
+except ImportError:  # reestimate_open_trips() falls back to a plain loop
+    np = None
+
+REBUILD_INTERVAL_S = float(os.getenv("FLEETFLOW_FUEL_REBUILD_S", "600"))
+MIN_SAMPLES = int(os.getenv("FLEETFLOW_FUEL_MIN_SAMPLES", "3"))
+
+# The expense logs the matrix is built from; the write paths use the same rule
+SAMPLE_ROWS = models.ExpenseLog.distance_km > 0
+
+
+class Estimate(NamedTuple):
+    distance_km: float
+    cost_per_km: float
+    fuel_cost: float
+    samples: int  # trips behind the route distance
+    basis: str    # where cost_per_km came from: "route", "vehicle type" or "fleet"
+
+
+def place(name: str) -> str:
+    return " ".join(name.split()).casefold() if name else ""
+
+
+class FuelMatrix:
+    def __init__(self, rebuild_interval_s: float = REBUILD_INTERVAL_S, min_samples: int = MIN_SAMPLES):
+        self.rebuild_interval_s = rebuild_interval_s
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._refreshing = False
+        self._routes = {}      # (origin, destination) -> [trips, km]
+        self._cells = {}       # (origin, destination, vehicle type) -> [trips, km, cost]
+        self._types = {}       # vehicle type -> [km, cost]
+        self._fleet = [0.0, 0.0]
+        self._memo = {}        # (origin, destination, vehicle type) -> Estimate or None
+
+    # --- reads ---
+    def estimate(self, db: Session, origin: str, destination: str, vehicle_type: str = None) -> Optional[Estimate]:
+        """The estimate for one trip, or None without any history for the route."""
+        self._ensure_fresh(db)
+        return self._lookup((place(origin), place(destination), vehicle_type))
+
+    def estimate_many(self, db: Session, requests) -> list:
+        """estimate() for every (origin, destination, vehicle type) in requests."""
+        self._ensure_fresh(db)
+        return [self._lookup((place(o), place(d), t)) for o, d, t in requests]
+
+    def _lookup(self, key) -> Optional[Estimate]:
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._lock:
+            result = self._memo[key] = self._compute(*key)
+        return result
+
+    def _ensure_fresh(self, db: Session):
+        if self._built_at is None:
+            self.rebuild(db)
+        elif time.monotonic() - self._built_at > self.rebuild_interval_s and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh, name="fuel-matrix-rebuild", daemon=True).start()
+
+    def _refresh(self):
+        from .database import SessionLocal
+        try:
+            with SessionLocal() as db:
+                self.rebuild(db)
+        finally:
+            self._refreshing = False
+
+    # --- full rebuild ---
+    def rebuild(self, db: Session):
+        e, t, v = models.ExpenseLog, models.Trip, models.Vehicle
+        rows = (
+            db.query(t.origin, t.destination, v.type, func.count(func.distinct(e.trip_id)),
+                     func.sum(e.distance_km), func.sum(e.fuel_cost))
+            .select_from(e)
+            .join(t, t.id == e.trip_id)
+            .outerjoin(v, v.id == t.vehicle_id)
+            .filter(SAMPLE_ROWS)
+            .group_by(t.origin, t.destination, v.type)
+            .all()
+        )
+        routes, cells, types, fleet = {}, {}, {}, [0.0, 0.0]
+        for origin, destination, vehicle_type, trips, km, cost in rows:
+            self._add((place(origin), place(destination), vehicle_type), trips, km or 0, cost or 0.0,
+                      routes, cells, types, fleet)
+        with self._lock:
+            self._routes, self._cells, self._types, self._fleet = routes, cells, types, fleet
+            self._memo = {}
+            self._built_at = time.monotonic()
+
+    # --- write paths (call after the change is committed) ---
+    def expense_logged(self, origin: str, destination: str, vehicle_type: str, distance_km, fuel_cost,
+                       new_trip: bool):
+        """Add one expense; new_trip when it is the first sample (see SAMPLE_ROWS) of its trip."""
+        if self._built_at is None or not distance_km:
+            return  # the first read builds from the database, this expense included; 0 km is no sample
+        with self._lock:
+            self._add((place(origin), place(destination), vehicle_type), int(new_trip), distance_km or 0,
+                      fuel_cost or 0.0, self._routes, self._cells, self._types, self._fleet)
+            self._memo = {}
+
+    def invalidate(self):
+        """Rebuild on the next read (in the background once built)."""
+        if self._built_at is not None:
+            self._built_at = -float("inf")
+
+    # --- internals ---
+    @staticmethod
+    def _add(key, trips, km, cost, routes, cells, types, fleet):
+        route = routes.setdefault(key[:2], [0, 0.0])
+        route[0] += trips
+        route[1] += km
+        cell = cells.setdefault(key, [0, 0.0, 0.0])
+        cell[0] += trips
+        cell[1] += km
+        cell[2] += cost
+        by_type = types.setdefault(key[2], [0.0, 0.0])
+        by_type[0] += km
+        by_type[1] += cost
+        fleet[0] += km
+        fleet[1] += cost
+
+    def _compute(self, origin, destination, vehicle_type) -> Optional[Estimate]:
+        route = self._routes.get((origin, destination))
+        if not route or not route[0] or not route[1]:
+            route = self._routes.get((destination, origin))
+        if not route or not route[0] or not route[1]:
+            return None
+        cell = self._cells.get((origin, destination, vehicle_type))
+        by_type = self._types.get(vehicle_type)
+        if cell and cell[0] >= self.min_samples and cell[1] > 0:
+            basis, (km, cost) = "route", cell[1:]
+        elif by_type and by_type[0] > 0:
+            basis, (km, cost) = "vehicle type", by_type
+        elif self._fleet[0] > 0:
+            basis, (km, cost) = "fleet", self._fleet
+        else:
+            return None
+        distance = route[1] / route[0]
+        rate = cost / km
+        return Estimate(round(distance, 1), round(rate, 4), round(distance * rate, 2), route[0], basis)
+
+
+matrix = FuelMatrix()
+
+
+def reestimate_open_trips(db: Session) -> dict:
+    """Set estimated_fuel_cost of every active trip from the matrix. The caller commits.
+
+    Trips are grouped by (origin, destination, vehicle type) so each distinct
+    key is estimated once; the per-trip costs are then gathered from that
+    table and compared with the stored ones in NumPy (a plain loop without it).
+    Only changed estimates are written, in one executemany straight through the
+    driver. Trips without any history for their route keep their estimate.
+    """
+    t, v = models.Trip, models.Vehicle
+    trips = db.execute(
+        select(t.id, t.origin, t.destination, v.type, t.estimated_fuel_cost)
+        .outerjoin(v, v.id == t.vehicle_id)
+        .where(t.status.in_(queries.ACTIVE_TRIP_STATUSES))
+    ).all()
+    keys, codes = {}, []
+    for _, origin, destination, vehicle_type, _ in trips:
+        codes.append(keys.setdefault((origin, destination, vehicle_type), len(keys)))
+    estimates = matrix.estimate_many(db, keys)
+    costs = [e.fuel_cost if e is not None else float("nan") for e in estimates]
+
+    if np is not None:
+        per_trip = np.asarray(costs, dtype=np.float64)[np.asarray(codes, dtype=np.int64)]
+        current = np.asarray([row[4] for row in trips], dtype=np.float64)  # None -> nan
+        known = ~np.isnan(per_trip)
+        changed = known & (per_trip != current)
+        ids = np.asarray([row[0] for row in trips], dtype=np.int64)
+        changes = list(zip(per_trip[changed].tolist(), ids[changed].tolist()))
+        unestimated = len(trips) - int(known.sum())
+    else:
+        per_trip = [costs[code] for code in codes]
+        changes = [(cost, row[0]) for row, cost in zip(trips, per_trip) if cost == cost and cost != row[4]]
+        unestimated = sum(cost != cost for cost in per_trip)
+
+    if changes:
+        mark = "?" if db.get_bind().dialect.paramstyle == "qmark" else "%s"
+        db.connection().exec_driver_sql(f"UPDATE trips SET estimated_fuel_cost = {mark} WHERE id = {mark}", changes)
+    return {"open_trips": len(trips), "updated": len(changes), "unestimated": unestimated}
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, engine
+    from . import cache
+
+    models.Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        result = reestimate_open_trips(db)
+        db.commit()
+    cache.versions.bump("trips")
+    print(f"Re-estimated {result['updated']} of {result['open_trips']} open trips "
+          f"({result['unestimated']} without route history) in {time.perf_counter() - started:.2f}s.")
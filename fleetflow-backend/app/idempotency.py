@@ -0,0 +1,194 @@
+# app/idempotency.py
+# Idempotency-Key support for the create endpoints clients retry on flaky
+# networks: POST /trips/dispatch, POST /expenses/ and POST /maintenance/.
+#
+# The first request carrying a key runs normally and its outcome (status code
+# and body) is kept under (method, path, user, key) for
+# FLEETFLOW_IDEMPOTENCY_TTL_S seconds; the user is the subject of the bearer
+# token, if any, so two users cannot replay each other's responses. Then:
+#   * a retry with the same key and body gets the stored response back, with
+#     "Idempotent-Replayed: true", without running the handler, so it never
+#     touches the business tables;
+#   * a retry that arrives while the first request is still running waits for
+#     it (up to FLEETFLOW_IDEMPOTENCY_WAIT_S, then 409) instead of running twice;
+#   * the same key with a different body is a 422.
+#
+# Only outcomes the handler decided on are stored: 2xx and its 4xx errors. A 5xx
+# (e.g. 503 when dispatch stayed contended) or an unexpected error releases the
+# key, so the next retry runs again. The handler runs in its own task and
+# database session, so a client that disconnects mid-request still leaves its
+# outcome behind.
+#
+# Like the response cache in app/cache.py, the store is per process: an LRU of
+# at most FLEETFLOW_IDEMPOTENCY_MAX_KEYS keys in arrival order, expired from the
+# oldest end. Keys in flight are never evicted. With several uvicorn workers a
+# retry is only deduplicated by the worker that saw the original.
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from . import database, tokens
+
+TTL_S = float(os.getenv("FLEETFLOW_IDEMPOTENCY_TTL_S", str(24 * 3600)))
+MAX_KEYS = int(os.getenv("FLEETFLOW_IDEMPOTENCY_MAX_KEYS", "10000"))
+WAIT_S = float(os.getenv("FLEETFLOW_IDEMPOTENCY_WAIT_S", "30"))
+MAX_KEY_LENGTH = 255
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "created", "done", "status_code", "body", "headers")
+
+    def __init__(self, fingerprint: str, created: float):
+        self.fingerprint = fingerprint
+        self.created = created
+        self.done = asyncio.Event()
+        self.status_code = None
+        self.body = None  # None until the first request stored an outcome
+        self.headers = None
+
+
+class IdempotencyStore:
+    """Bounded, expiring map of idempotency scope -> in-flight or finished request."""
+
+    def __init__(self, max_keys: int = MAX_KEYS, ttl_s: float = TTL_S):
+        self.max_keys = max_keys
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, scope, fingerprint: str):
+        """(entry, True) if the caller now owns the scope, else (existing entry, False)."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(scope)
+            if entry is not None:
+                return entry, False
+            entry = self._entries[scope] = _Entry(fingerprint, now)
+            if len(self._entries) > self.max_keys:
+                self._evict()
+            return entry, True
+
+    def finish(self, entry: _Entry, status_code: int, body: bytes, headers=None):
+        entry.status_code, entry.body, entry.headers = status_code, body, headers
+        entry.done.set()
+
+    def release(self, scope, entry: _Entry):
+        """Forget a request that ended without an outcome; its waiters retry the claim."""
+        with self._lock:
+            if self._entries.get(scope) is entry:
+                del self._entries[scope]
+        entry.done.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now: float):
+        while self._entries:
+            scope, entry = next(iter(self._entries.items()))
+            if now - entry.created < self.ttl_s or not entry.done.is_set():
+                break
+            del self._entries[scope]
+
+    def _evict(self):
+        # One entry was just added, so dropping the oldest finished one is enough
+        for scope, entry in self._entries.items():
+            if entry.done.is_set():
+                del self._entries[scope]
+                return
+
+
+store = IdempotencyStore()
+
+_adapters = {}
+
+
+def _replay(entry: _Entry) -> Response:
+    headers = dict(entry.headers or {})
+    headers["Idempotent-Replayed"] = "true"
+    return Response(content=entry.body, status_code=entry.status_code, media_type="application/json",
+                    headers=headers)
+
+
+def _adapter(response_model) -> TypeAdapter:
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter
+
+
+def _run_and_dump(db, response_model, fn, *args) -> bytes:
+    # Serialized inside the session, while the returned rows are still attached to it
+    adapter = _adapter(response_model)
+    return adapter.dump_json(adapter.validate_python(fn(db, *args), from_attributes=True))
+
+
+async def _once(run, fn, *args):
+    return await run(fn, *args)
+
+
+async def _complete(scope, entry: _Entry, response_model, status_code: int, retry, fn, args) -> Response:
+    try:
+        body = await retry(partial(database.run_detached, _run_and_dump, response_model), fn, *args)
+    except HTTPException as exc:
+        if exc.status_code >= 500:
+            store.release(scope, entry)
+        else:
+            store.finish(entry, exc.status_code, JSONResponse({"detail": exc.detail}).body, exc.headers)
+        raise
+    except BaseException:
+        store.release(scope, entry)
+        raise
+    store.finish(entry, status_code, body)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+async def _user(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return (await tokens.decode(token)).get("sub")
+    except tokens.InvalidToken:
+        return None
+
+
+async def idempotent(request: Request, key: Optional[str], response_model, status_code: int, db, fn, *args,
+                     retry=_once):
+    """Run fn(session, *args) at most once per Idempotency-Key (see the module docstring).
+
+    Without a key this is database.run(db, fn, *args) on the request's session.
+    With one, fn runs on a session of its own and the response is serialized
+    against response_model here, the way FastAPI would. retry(run, fn, *args)
+    makes the run(fn, *args) call(s); it may try again after a contended attempt.
+    """
+    if key is None:
+        return await retry(partial(database.run, db), fn, *args)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    scope = (request.method, request.url.path, await _user(request), key)
+    fingerprint = hashlib.blake2b(await request.body(), digest_size=16).hexdigest()
+    while True:
+        entry, owner = store.claim(scope, fingerprint)
+        if owner:
+            break
+        if entry.fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        try:
+            await asyncio.wait_for(entry.done.wait(), WAIT_S)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        if entry.body is not None:
+            return _replay(entry)
+        # The first request ended without an outcome; claim the key and run it here
+
+    task = asyncio.ensure_future(_complete(scope, entry, response_model, status_code, retry, fn, args))
+    return await asyncio.shield(task)  # the outcome is stored even if this client goes away
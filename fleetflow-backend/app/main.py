@@ -1,17 +1,35 @@
 # app/main.py
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
-from .database import engine
+from . import models, counters, migrations, cache, metrics, tokens
+from .telemetry import buffer as telemetry_buffer
+from .database import engine, SessionLocal
 # Import ALL our completed routers
-from .routers import auth, vehicles, drivers, trips, maintenance, expenses, dashboard, analytics 
+from .routers import auth, vehicles, drivers, trips, maintenance, expenses, dashboard, analytics, events, reports, telemetry, monitoring, search
 
 models.Base.metadata.create_all(bind=engine)
+if migrations.upgrade(engine):
+    cache.versions.bump_all()
+
+# Seed the fleet counter row for databases created before it existed
+with SessionLocal() as db:
+    counters.get_counters(db)
+    db.commit()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background flusher for the telemetry write-behind buffer; flush what is left on shutdown
+    telemetry_buffer.start()
+    yield
+    await telemetry_buffer.stop()
 
 app = FastAPI(
     title="FleetFlow API",
     description="Backend for the Modular Fleet & Logistics Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = ["http://localhost:5173", "http://localhost:3000"]
@@ -22,17 +40,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Disposition", "Server-Timing", "Idempotent-Replayed"],
 )
 
+# Outermost, so the timings include CORS handling and every router
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# FLEETFLOW_REQUIRE_AUTH=1 requires a bearer access token (see app/tokens.py) on
+# every router but /auth: the fleet endpoints, vehicle telemetry and /metrics.
+# The SSE stream also takes it as ?access_token=, since EventSource cannot send
+# headers.
+REQUIRE_AUTH = os.getenv("FLEETFLOW_REQUIRE_AUTH", "0") == "1"
+protected = [Depends(tokens.require_user)] if REQUIRE_AUTH else []
+stream_protected = [Depends(tokens.require_stream_user)] if REQUIRE_AUTH else []
+
 # Mount all the endpoints
 app.include_router(auth.router)
-app.include_router(vehicles.router)
-app.include_router(drivers.router)
-app.include_router(trips.router)
-app.include_router(maintenance.router)
-app.include_router(expenses.router)
-app.include_router(dashboard.router)
-app.include_router(analytics.router)
+app.include_router(vehicles.router, dependencies=protected)
+app.include_router(drivers.router, dependencies=protected)
+app.include_router(trips.router, dependencies=protected)
+app.include_router(maintenance.router, dependencies=protected)
+app.include_router(expenses.router, dependencies=protected)
+app.include_router(dashboard.router, dependencies=protected)
+app.include_router(analytics.router, dependencies=protected)
+app.include_router(events.router, dependencies=stream_protected)
+app.include_router(reports.router, dependencies=protected)
+app.include_router(search.router, dependencies=protected)
+app.include_router(telemetry.router, dependencies=protected)
+app.include_router(monitoring.router, dependencies=protected)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,204 @@
+# app/metrics.py
+# Request and SQL instrumentation, exposed at /metrics in the Prometheus text
+# format.
+#
+#   * MetricsMiddleware (a plain ASGI middleware, registered in main.py) times
+#     every request and files it under its route template ("/vehicles/{vehicle_id}/retire",
+#     not the raw path), so the label set stays small.
+#   * before/after_cursor_execute listeners on the engines (attached in
+#     database.py) count the statements and the time spent in the database,
+#     charged to the request running them through a ContextVar. Statements
+#     slower than FLEETFLOW_SLOW_QUERY_MS are kept in a small ring buffer
+#     served at /metrics/slow-queries: the SQL text only, never the bound
+#     values (password hashes, token ids).
+#   * FLEETFLOW_SERVER_TIMING=1 adds a Server-Timing header (db time, query
+#     count, total) to each response, for the browser's network panel.
+#
+# Everything is aggregated in memory per process; FLEETFLOW_METRICS=0 turns it off.
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+ENABLED = os.getenv("FLEETFLOW_METRICS", "1") == "1"
+SERVER_TIMING = os.getenv("FLEETFLOW_SERVER_TIMING", "0") == "1"
+SLOW_QUERY_S = float(os.getenv("FLEETFLOW_SLOW_QUERY_MS", "100")) / 1000
+SLOW_QUERY_SAMPLES = 50
+
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_current = ContextVar("fleetflow_request_stats", default=None)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}        # (method, route) -> Histogram of seconds
+        self.query_counts = {}   # (method, route) -> Histogram of statements per request
+        self.db_seconds = {}     # (method, route) -> total seconds in the database
+        self.responses = {}      # (method, route, status) -> count
+        self.queries_total = 0   # every statement, including those run outside a request
+        self.query_seconds_total = 0.0
+        self.slow_queries_total = 0
+        self.slow_queries = deque(maxlen=SLOW_QUERY_SAMPLES)
+
+    def record_request(self, method, route, status, seconds, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(LATENCY_BUCKETS_S)
+                self.query_counts[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.db_seconds[key] = 0.0
+            histogram.observe(seconds)
+            self.query_counts[key].observe(stats.queries)
+            self.db_seconds[key] += stats.db_time
+            status_key = (method, route, status)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def record_query(self, statement, seconds):
+        with self._lock:
+            self.queries_total += 1
+            self.query_seconds_total += seconds
+            if seconds >= SLOW_QUERY_S:
+                self.slow_queries_total += 1
+                self.slow_queries.append({
+                    "ms": round(seconds * 1000, 2),
+                    "statement": statement,
+                    "at": time.time(),
+                })
+
+
+registry = Registry()
+
+
+# --- SQL hooks (see database.py) ---
+# The start time rides on the statement's execution context rather than a
+# per-connection stack, so a statement that raises (and never reaches
+# after_cursor_execute) leaves nothing behind to skew the next timing.
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.fleetflow_query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.fleetflow_query_start
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    registry.record_query(statement, elapsed)
+
+
+def instrument_engine(sync_engine):
+    from sqlalchemy import event
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+# --- middleware ---
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    total_ms = (time.perf_counter() - started) * 1000
+                    header = (f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                              f'app;dur={total_ms:.1f}')
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            registry.record_request(
+                scope["method"], getattr(route, "path", "<unmatched>"), status,
+                time.perf_counter() - started, stats,
+            )
+
+
+# --- exposition ---
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name, histograms, buckets, fmt=repr):
+    lines = [f"# TYPE {name} histogram"]
+    for (method, route), h in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip([*buckets, "+Inf"], h.counts):
+            cumulative += n
+            le = bound if bound == "+Inf" else fmt(bound)
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {h.sum}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {h.count}")
+    return lines
+
+
+def render() -> str:
+    r = registry
+    with r._lock:
+        lines = _histogram_lines("fleetflow_http_request_duration_seconds", r.latency, LATENCY_BUCKETS_S)
+        lines += _histogram_lines("fleetflow_http_request_db_queries", r.query_counts, QUERY_COUNT_BUCKETS, str)
+        lines.append("# TYPE fleetflow_http_request_db_seconds_total counter")
+        for (method, route), seconds in sorted(r.db_seconds.items()):
+            lines.append(f"fleetflow_http_request_db_seconds_total{_labels(method=method, route=route)} {seconds}")
+        lines.append("# TYPE fleetflow_http_responses_total counter")
+        for (method, route, status), n in sorted(r.responses.items()):
+            lines.append(f"fleetflow_http_responses_total{_labels(method=method, route=route, status=status)} {n}")
+        lines += [
+            "# TYPE fleetflow_db_queries_total counter",
+            f"fleetflow_db_queries_total {r.queries_total}",
+            "# TYPE fleetflow_db_query_seconds_total counter",
+            f"fleetflow_db_query_seconds_total {r.query_seconds_total}",
+            "# TYPE fleetflow_db_slow_queries_total counter",
+            f"fleetflow_db_slow_queries_total {r.slow_queries_total}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def slow_queries() -> list:
+    with registry._lock:
+        return list(reversed(registry.slow_queries))
@@ -0,0 +1,192 @@
+# app/migrations.py
+# Schema upgrades for existing SQLite files. create_all() only creates tables
+# that are missing, so changes to tables that already exist are applied here,
+# in order, and the last one applied is recorded in PRAGMA user_version.
+#
+# Runs automatically at startup; to upgrade a file by hand:
+#     python -m app.migrations
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+from . import models, rollups, scoring, search
+from .database import is_sqlite
+
+
+def _rebuild_table(conn, table, select_exprs):
+    """Recreate `table` from the current model and copy the old rows across.
+
+    SQLite cannot change a column's type or add a CHECK constraint in place, so
+    this follows its documented rebuild: create the new table under a temporary
+    name, copy, drop the old one, rename, then recreate the indexes.
+    `select_exprs` maps a column name to the SQL expression that fills it.
+    """
+    old_columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    temp_name = f"_{table.name}_rebuild"
+    ddl = str(CreateTable(table).compile(conn)).strip()
+    conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {temp_name} ", 1))
+
+    columns = [c.name for c in table.columns if c.name in old_columns]
+    exprs = [select_exprs.get(name, name) for name in columns]
+    conn.exec_driver_sql(
+        f"INSERT INTO {temp_name} ({', '.join(columns)}) SELECT {', '.join(exprs)} FROM {table.name}"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {table.name}")
+    conn.exec_driver_sql(f"ALTER TABLE {temp_name} RENAME TO {table.name}")
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _encode_status_columns(conn):
+    """v1: free-text status -> SMALLINT codes with a CHECK constraint, plus the status indexes.
+
+    Labels are matched ignoring case and surrounding spaces. Anything else
+    (a hand-edited "Retired", a missing status) becomes the table's safe label,
+    never a dispatchable one, and the affected rows are listed.
+    """
+    for table, labels, safe in [
+        (models.Vehicle.__table__, models.VEHICLE_STATUSES, "Out of Service"),
+        (models.Driver.__table__, models.DRIVER_STATUSES, "Suspended"),
+        (models.Trip.__table__, models.TRIP_STATUSES, "Cancelled"),
+    ]:
+        already_coded = conn.exec_driver_sql(
+            f"SELECT type FROM pragma_table_info('{table.name}') WHERE name = 'status'"
+        ).scalar()
+        if already_coded == "SMALLINT":
+            continue  # created by create_all() from the current models
+
+        known = ", ".join(f"'{label.lower()}'" for label in labels)
+        unknown = conn.exec_driver_sql(
+            f"SELECT id, status FROM {table.name} WHERE status IS NULL OR lower(trim(status)) NOT IN ({known})"
+        ).all()
+        if unknown:
+            listed = ", ".join(f"{row_id} ({status!r})" for row_id, status in unknown[:20])
+            more = f" and {len(unknown) - 20} more" if len(unknown) > 20 else ""
+            print(f"{table.name}: unknown status on rows {listed}{more}; set to {safe!r}")
+
+        cases = " ".join(f"WHEN '{label.lower()}' THEN {code}" for code, label in enumerate(labels, start=1))
+        fallback = labels.index(safe) + 1
+        _rebuild_table(conn, table, {"status": f"CASE lower(trim(status)) {cases} ELSE {fallback} END"})
+
+
+def _add_column(conn, table, column):
+    """ALTER TABLE ... ADD COLUMN, skipped when a rebuild or create_all() already added it."""
+    existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    if column.name in existing:
+        return False
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}")
+    return True
+
+
+def _date_expense_logs(conn):
+    """v2: expense_logs.date and the monthly rollups built from it.
+
+    Older rows have no date; they are dated to the day of the upgrade so their
+    costs still show up in the monthly rollups.
+    """
+    table = models.ExpenseLog.__table__
+    _add_column(conn, table, table.c.date)
+    conn.exec_driver_sql("UPDATE expense_logs SET date = date('now') WHERE date IS NULL")
+
+    # The rollup table is new in this version; fill it from the existing logs
+    with Session(bind=conn) as db:
+        rollups.backfill(db)
+        db.flush()
+
+
+def _score_drivers(conn):
+    """v3: running score aggregates on drivers, filled from the existing trip history.
+
+    recompute() derives the complaint counts from driver_incidents, which is
+    new in this version, so each complaint already counted on a driver is
+    first recorded there as an incident of its own.
+    """
+    table = models.Driver.__table__
+    for column, default in [("trips_completed", 0), ("trips_cancelled", 0), ("incident_points", 0.0),
+                            ("score", 100.0)]:
+        if _add_column(conn, table, table.c[column]):
+            conn.exec_driver_sql(f"UPDATE drivers SET {column} = {default}")
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    legacy = conn.exec_driver_sql(
+        "SELECT id, complaints FROM drivers WHERE complaints > 0 "
+        "AND NOT EXISTS (SELECT 1 FROM driver_incidents WHERE driver_id = drivers.id)"
+    ).all()
+    rows = [{"driver_id": driver_id, "kind": "complaint", "points": scoring.INCIDENT_POINTS["complaint"],
+             "note": "Recorded before incident tracking", "created_at": now}
+            for driver_id, complaints in legacy for _ in range(complaints)]
+    if rows:
+        conn.execute(insert(models.DriverIncident.__table__), rows)
+
+    with Session(bind=conn) as db:
+        scoring.recompute(db)
+        db.flush()
+
+
+def _search_index(conn):
+    """v4: the FTS5 search index (see app/search.py) and its sync triggers, filled from the existing rows."""
+    search.install(conn)
+
+
+def _close_trips(conn):
+    """v5: trips.closed_at, which app/archive.py ages trips by, and the expense_logs.trip_id index.
+
+    Trips closed before this version have no close time recorded; the date of
+    their last expense stands in for it. Closed trips without any expense keep
+    a NULL closed_at, so they are never archived.
+    """
+    trips = models.Trip.__table__
+    if _add_column(conn, trips, trips.c.closed_at):
+        closed = ",".join(str(models.TRIP_STATUSES.index(s) + 1) for s in ("Completed", "Cancelled"))
+        conn.exec_driver_sql(
+            "UPDATE trips SET closed_at = (SELECT max(date) || ' 00:00:00.000000' FROM expense_logs "
+            f"WHERE expense_logs.trip_id = trips.id) WHERE status IN ({closed})"
+        )
+    for index in models.ExpenseLog.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _count_rollup_trips(conn):
+    """v6: rebuild the monthly rollups, whose trip_count used to count every expense log as a trip."""
+    with Session(bind=conn) as db:
+        rollups.backfill(db)
+        db.flush()
+
+
+# Position in this list + 1 is the user_version the step upgrades to. Append only.
+MIGRATIONS = [
+    _encode_status_columns,
+    _date_expense_logs,
+    _score_drivers,
+    _search_index,
+    _close_trips,
+    _count_rollup_trips,
+]
+
+
+def upgrade(engine):
+    """Apply every migration newer than the file's user_version. Returns the versions applied."""
+    if not is_sqlite(engine.url):
+        return []  # server databases are created fresh from the models
+    applied = []
+    with engine.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+            applied.append(target)
+    return applied
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    applied = upgrade(engine)
+    if applied:
+        from . import cache
+        cache.versions.bump_all()
+    print(f"Applied migrations: {applied}" if applied else "Database is up to date.")
@@ -1,7 +1,45 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey
+import datetime
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, Float, ForeignKey, Index, CheckConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from .database import Base
 
+# --- STATUS ENUMS ---
+# Each status is stored as a 1-based SMALLINT code (its position in the tuple below)
+# instead of free text, so status columns and their indexes stay small. The ORM
+# still reads and writes the labels. Only ever append to these tuples: the
+# position is what is on disk.
+VEHICLE_STATUSES = ("Available", "On Trip", "In Shop", "Out of Service")
+DRIVER_STATUSES = ("On Duty", "Off Duty", "Suspended", "On Trip")
+TRIP_STATUSES = ("Dispatched", "On Trip", "Completed", "Cancelled")
+
+class StatusCode(TypeDecorator):
+    """A status label stored as a small integer code; unknown labels are rejected."""
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, labels):
+        super().__init__()
+        self.labels = tuple(labels)
+        self.codes = {label: code for code, label in enumerate(self.labels, start=1)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self.codes[value]
+        except KeyError:
+            raise ValueError(f"Invalid status {value!r}. Must be one of {list(self.labels)}") from None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.labels[value - 1]
+
+def status_check(labels, name):
+    return CheckConstraint(f"status BETWEEN 1 AND {len(labels)}", name=name)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -9,6 +47,12 @@ class User(Base):
     hashed_password = Column(String)
     role = Column(String, default="Dispatcher")
 
+class RevokedToken(Base):
+    # Token ids (jti) revoked by logout or refresh rotation; rows past expires_at can be dropped
+    __tablename__ = "revoked_tokens"
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
     id = Column(Integer, primary_key=True, index=True)
@@ -17,7 +61,12 @@ class Vehicle(Base):
     type = Column(String) 
     capacity_kg = Column(Integer) 
     odometer = Column(Integer)
-    status = Column(String, default="Available") 
+    status = Column(StatusCode(VEHICLE_STATUSES), default="Available", nullable=False)
+
+    __table_args__ = (
+        Index("ix_vehicles_status", "status"),
+        status_check(VEHICLE_STATUSES, "ck_vehicles_status"),
+    )
 
 class Driver(Base):
     __tablename__ = "drivers"
@@ -28,7 +77,19 @@ class Driver(Base):
     completion_rate = Column(Float, default=100.0) 
     safety_score = Column(Float, default=100.0) 
     complaints = Column(Integer, default=0)
-    status = Column(String, default="On Duty") 
+    status = Column(StatusCode(DRIVER_STATUSES), default="On Duty", nullable=False)
+    # Running aggregates behind the scores above, kept by app/scoring.py
+    trips_completed = Column(Integer, default=0, server_default="0", nullable=False)
+    trips_cancelled = Column(Integer, default=0, server_default="0", nullable=False)
+    incident_points = Column(Float, default=0.0, server_default="0", nullable=False)
+    score = Column(Float, default=100.0, server_default="100", nullable=False) # Overall rating the lists sort and filter on
+
+    __table_args__ = (
+        # Matches the dispatcher's "On Duty AND expiry_date >= today" filter
+        Index("ix_drivers_status_expiry", "status", "expiry_date"),
+        Index("ix_drivers_score", "score"),
+        status_check(DRIVER_STATUSES, "ck_drivers_status"),
+    )
 
 class Trip(Base):
     __tablename__ = "trips"
@@ -39,7 +100,17 @@ class Trip(Base):
     origin = Column(String)
     destination = Column(String)
     estimated_fuel_cost = Column(Float)
-    status = Column(String, default="Dispatched")
+    status = Column(StatusCode(TRIP_STATUSES), default="Dispatched", nullable=False)
+    closed_at = Column(DateTime, nullable=True) # UTC, set when the trip is completed or cancelled
+
+    # Lazy by default; routers opt into eager loading through app/queries.py
+    vehicle = relationship("Vehicle")
+    driver = relationship("Driver")
+
+    __table_args__ = (
+        Index("ix_trips_status", "status"),
+        status_check(TRIP_STATUSES, "ck_trips_status"),
+    )
 
 # --- NEW TABLES FOR CHAPTER 5 ---
 
@@ -52,6 +123,8 @@ class MaintenanceLog(Base):
     cost = Column(Float, nullable=True) # Can be updated later when service is done
     status = Column(String, default="Pending") # Pending, In Progress, Completed
 
+    vehicle = relationship("Vehicle")
+
 class ExpenseLog(Base):
     __tablename__ = "expense_logs"
     id = Column(Integer, primary_key=True, index=True)
@@ -60,4 +133,85 @@ class ExpenseLog(Base):
     distance_km = Column(Integer)
     fuel_cost = Column(Float)
     misc_expense = Column(Float)
-    status = Column(String, default="Done")
\ No newline at end of file
+    status = Column(String, default="Done")
+    date = Column(Date, default=datetime.date.today) # Month the cost is reported under
+
+    trip = relationship("Trip")
+
+    __table_args__ = (
+        Index("ix_expense_logs_trip_id", "trip_id"),
+    )
+
+class DriverIncident(Base):
+    # Safety incidents and customer complaints, each weighted by app/scoring.INCIDENT_POINTS
+    __tablename__ = "driver_incidents"
+    id = Column(Integer, primary_key=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id"), nullable=True)
+    kind = Column(String, nullable=False) # complaint, violation, accident
+    points = Column(Float, nullable=False)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False) # UTC
+
+class FleetCounters(Base):
+    # Single-row table (id=1) kept in step with every vehicle/trip status change,
+    # so the dashboard reads its KPIs without counting the base tables.
+    __tablename__ = "fleet_counters"
+    id = Column(Integer, primary_key=True)
+    total_vehicles = Column(Integer, default=0, nullable=False)
+    available = Column(Integer, default=0, nullable=False)
+    on_trip = Column(Integer, default=0, nullable=False)
+    in_shop = Column(Integer, default=0, nullable=False)
+    out_of_service = Column(Integer, default=0, nullable=False)
+    dispatched_trips = Column(Integer, default=0, nullable=False)
+
+class MonthlyVehicleRollup(Base):
+    # Per-month, per-vehicle totals maintained alongside every expense and service
+    # log (see app/rollups.py), so analytics reads a few rows per month instead of
+    # summing the raw logs.
+    __tablename__ = "monthly_vehicle_rollups"
+    month = Column(Date, primary_key=True) # First day of the month
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    fuel_cost = Column(Float, default=0.0, nullable=False)
+    misc_cost = Column(Float, default=0.0, nullable=False)
+    distance_km = Column(Integer, default=0, nullable=False)
+    maintenance_cost = Column(Float, default=0.0, nullable=False)
+    trip_count = Column(Integer, default=0, nullable=False) # Trips whose first expense log falls in that month
+
+class ArchiveSegment(Base):
+    # A file of cold rows moved out of trips or expense_logs by app/archive.py,
+    # with the ranges readers check to skip it without opening it
+    __tablename__ = "archive_segments"
+    id = Column(Integer, primary_key=True)
+    dataset = Column(String, nullable=False) # "trips" or "expense_logs"
+    path = Column(String, nullable=False) # Relative to the archive directory
+    rows = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    min_date = Column(Date, nullable=True) # Trip closed_at / expense date
+    max_date = Column(Date, nullable=True)
+    min_vehicle_id = Column(Integer, nullable=True)
+    max_vehicle_id = Column(Integer, nullable=True)
+    min_driver_id = Column(Integer, nullable=True)
+    max_driver_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False) # UTC
+
+    __table_args__ = (
+        Index("ix_archive_segments_dataset_min_id", "dataset", "min_id"),
+    )
+
+class TelemetryPing(Base):
+    # Append-only raw pings from the vehicles, written in batches by app/telemetry.py
+    __tablename__ = "telemetry_pings"
+    id = Column(Integer, primary_key=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
+    recorded_at = Column(DateTime, nullable=False) # UTC, as sent by the vehicle
+    odometer = Column(Integer, nullable=True)
+    fuel_level = Column(Float, nullable=True) # Percent of tank
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_telemetry_pings_vehicle_time", "vehicle_id", "recorded_at"),
+    )
@@ -0,0 +1,140 @@
+# app/pagination.py
+# Keyset (cursor) pagination and NDJSON streaming for the list endpoints.
+#
+# Pages are ordered by id and continue with "WHERE id > :after", so every page
+# costs the same no matter how deep into the table it is. When a page is full
+# the id to pass as ?after= for the next page is sent back in X-Next-Cursor.
+# Paging is opt-in: without ?limit a list comes back whole (after the cursor,
+# if one is given), which is how the frontend reads it.
+#
+# Clients that send "Accept: application/x-ndjson" get every row after the
+# cursor instead, one JSON document per line, read from a server-side cursor
+# in fixed-size batches so memory stays flat whatever the table size.
+#
+# keyset_json / stream_ndjson_rows are the same two operations on the fast
+# serialization path (app/fastjson.py): column tuples instead of ORM objects,
+# encoded without going through the response schema.
+#
+# Lists ranked by a numeric column (`by`, e.g. the driver score) are ordered
+# by (by DESC, id DESC) and continue with "WHERE (by, id) < (:value, :id)".
+# Their cursor is the last row's "<value>:<id>" as it was sent, not looked up
+# again, so rows whose value changes between pages (a score moving after a trip
+# or incident) cannot make the next page skip or repeat the rest. An index on
+# `by` serves every page.
+from typing import Optional
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
+from . import fastjson
+from .database import SessionLocal
+
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def wants_ndjson(accept) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+def ranked_cursor(value, last_id) -> str:
+    """X-Next-Cursor of a list ranked by `by`: the last row's value and id."""
+    return f"{float(value)!r}:{last_id}"
+
+
+def _ordered(statement, id_column, after, by=None):
+    """Keyset order and continuation for a Query or a select(); ValueError for a malformed cursor."""
+    if by is None:
+        if after is not None:
+            statement = statement.where(id_column > int(after))
+        return statement.order_by(id_column)
+    if after is not None:
+        value, _, last_id = str(after).rpartition(":")
+        statement = statement.where(tuple_(by, id_column) < tuple_(float(value), int(last_id)))
+    return statement.order_by(by.desc(), id_column.desc())
+
+
+def _page_ordered(statement, id_column, after, by):
+    try:
+        return _ordered(statement, id_column, after, by)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor {after}")
+
+
+def keyset_page(query, id_column, limit: Optional[int], after, response: Response, by=None):
+    """One page of `query` after the given cursor; sets X-Next-Cursor if more may follow.
+
+    With limit None every row after the cursor is returned and no cursor is set.
+    """
+    query = _page_ordered(query, id_column, after, by)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.all()
+
+    if limit is not None and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = (
+            str(last.id) if by is None else ranked_cursor(getattr(last, by.key), last.id)
+        )
+    return rows
+
+
+def stream_ndjson(build_query, id_column, schema, after=None, by=None) -> StreamingResponse:
+    """Stream every row of build_query(session) after `after` as NDJSON.
+
+    The generator opens its own session because it keeps reading after the
+    endpoint (and its request-scoped session) has returned. A malformed cursor
+    gives an empty stream.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            try:
+                query = _ordered(build_query(db), id_column, after, by)
+            except ValueError:
+                return
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                yield schema.model_validate(row).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def keyset_json(db, shape: fastjson.RowShape, limit: Optional[int], after, where=(),
+                by=None) -> fastjson.FastJSONResponse:
+    """keyset_page on the fast path: the page of shape's columns as an encoded JSON response."""
+    statement = _page_ordered(shape.select().where(*where), shape.id_column, after, by)
+    if limit is not None:
+        statement = statement.limit(limit)
+    rows = db.execute(statement).all()
+
+    # Encoded here, on the worker thread, rather than on the event loop
+    response = fastjson.FastJSONResponse(shape.dicts(rows))
+    if limit is not None and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = (
+            str(last[shape.id_index]) if by is None
+            else ranked_cursor(last[shape.keys.index(by.key)], last[shape.id_index])
+        )
+    return response
+
+
+def stream_ndjson_rows(shape: fastjson.RowShape, after=None, where=(), by=None) -> StreamingResponse:
+    """stream_ndjson on the fast path: each batch of rows is encoded and sent as one chunk."""
+    def generate():
+        db = SessionLocal()
+        try:
+            try:
+                statement = _ordered(shape.select().where(*where), shape.id_column, after, by)
+            except ValueError:
+                return
+            result = db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+            for rows in result.partitions():
+                yield b"".join(fastjson.dumps(row) + b"\n" for row in shape.dicts(rows))
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
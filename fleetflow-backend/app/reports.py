@@ -0,0 +1,175 @@
+# app/reports.py
+# Audit exports behind /reports/export: expense logs, maintenance logs and the
+# monthly financial summary per vehicle.
+#
+# Each report is a single SELECT with the vehicle plate and driver name joined
+# in (no per-row lookups), read through a server-side cursor STREAM_BATCH_SIZE
+# rows at a time and written out as it goes, so memory stays flat whatever the
+# size of the report. XLSX needs openpyxl; its write-only workbook spills rows
+# to a temporary file, which is streamed back once the sheet is complete.
+#
+# The expenses report also reads the archive (app/archive.py): archived rows
+# are merged in by id with the ones still in the database, and their plates and
+# driver names are looked up one batch at a time.
+import csv
+import heapq
+import io
+import tempfile
+from datetime import date
+from itertools import islice
+from operator import itemgetter
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session
+from . import archive, models
+from .pagination import STREAM_BATCH_SIZE
+
+try:
+    import openpyxl
+except ImportError:  # XLSX export is optional
+    openpyxl = None
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class Filters:
+    def __init__(self, start: date = None, end: date = None, vehicle_id: int = None, driver_id: int = None):
+        self.start = start
+        self.end = end
+        self.vehicle_id = vehicle_id
+        self.driver_id = driver_id
+
+
+def _expenses(f: Filters):
+    e, t, v, d = models.ExpenseLog, models.Trip, models.Vehicle, models.Driver
+    stmt = (
+        select(e.id, e.date, e.trip_id, v.plate, d.name, e.driver_name, e.distance_km,
+               e.fuel_cost, e.misc_expense, e.status)
+        .select_from(e)
+        .join(t, t.id == e.trip_id)
+        .outerjoin(v, v.id == t.vehicle_id)
+        .outerjoin(d, d.id == t.driver_id)
+    )
+    if f.start:
+        stmt = stmt.where(e.date >= f.start)
+    if f.end:
+        stmt = stmt.where(e.date <= f.end)
+    if f.vehicle_id is not None:
+        stmt = stmt.where(t.vehicle_id == f.vehicle_id)
+    if f.driver_id is not None:
+        stmt = stmt.where(t.driver_id == f.driver_id)
+    return stmt.order_by(e.id)
+
+
+def _names(db: Session, column, ids, known: dict):
+    """Fill known[id] = column for the ids not looked up yet."""
+    missing = ids - known.keys()
+    if missing:
+        entity = column.class_
+        known.update(dict.fromkeys(missing))
+        known.update(db.execute(select(entity.id, column).where(entity.id.in_(missing))).all())
+
+
+def _archived_expenses(db: Session, f: Filters):
+    names = ["id", "date", "trip_id", "vehicle_id", "driver_id", "driver_name", "distance_km", "fuel_cost",
+             "misc_expense", "status"]
+    archived = archive.rows(db, "expense_logs", names, f.start, f.end, f.vehicle_id, f.driver_id)
+    plates, drivers = {}, {}
+    while batch := list(islice(archived, STREAM_BATCH_SIZE)):
+        _names(db, models.Vehicle.plate, {row[3] for row in batch}, plates)
+        _names(db, models.Driver.name, {row[4] for row in batch}, drivers)
+        for row in batch:
+            yield (*row[:3], plates[row[3]], drivers[row[4]], *row[5:])
+
+
+def _maintenance(f: Filters):
+    m, v = models.MaintenanceLog, models.Vehicle
+    stmt = (
+        select(m.id, m.date, m.vehicle_id, v.plate, v.model, m.issue, m.cost, m.status)
+        .select_from(m)
+        .outerjoin(v, v.id == m.vehicle_id)
+    )
+    if f.start:
+        stmt = stmt.where(m.date >= f.start)
+    if f.end:
+        stmt = stmt.where(m.date <= f.end)
+    if f.vehicle_id is not None:
+        stmt = stmt.where(m.vehicle_id == f.vehicle_id)
+    return stmt.order_by(m.id)
+
+
+def _financial(f: Filters):
+    # Per vehicle and month, from the rollup table maintained by rollups.py
+    r, v = models.MonthlyVehicleRollup, models.Vehicle
+    total = r.fuel_cost + r.misc_cost + r.maintenance_cost
+    stmt = (
+        select(r.month, r.vehicle_id, v.plate, r.fuel_cost, r.misc_cost, r.maintenance_cost,
+               total.label("total_cost"), r.distance_km, r.trip_count,
+               case((r.distance_km > 0, total / r.distance_km), else_=None).label("cost_per_km"))
+        .select_from(r)
+        .outerjoin(v, v.id == r.vehicle_id)
+    )
+    if f.start:
+        stmt = stmt.where(r.month >= f.start.replace(day=1))
+    if f.end:
+        stmt = stmt.where(r.month <= f.end)
+    if f.vehicle_id is not None:
+        stmt = stmt.where(r.vehicle_id == f.vehicle_id)
+    return stmt.order_by(r.month, r.vehicle_id)
+
+
+# name -> (statement builder, header row, supports the driver filter, archived rows in id order or None)
+REPORTS = {
+    "expenses": (_expenses, ["id", "date", "trip_id", "vehicle_plate", "driver", "logged_driver_name",
+                             "distance_km", "fuel_cost", "misc_expense", "status"], True, _archived_expenses),
+    "maintenance": (_maintenance, ["id", "date", "vehicle_id", "vehicle_plate", "vehicle_model", "issue",
+                                   "cost", "status"], False, None),
+    "financial": (_financial, ["month", "vehicle_id", "vehicle_plate", "fuel_cost", "misc_cost",
+                               "maintenance_cost", "total_cost", "distance_km", "trip_count", "cost_per_km"],
+                  False, None),
+}
+
+
+def _stream(db: Session, stmt):
+    result = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+
+def rows(db: Session, report: str, filters: Filters):
+    """The report's rows as tuples, fetched in STREAM_BATCH_SIZE batches from a server-side cursor
+    and merged by id with the archived ones."""
+    build, _, _, archived = REPORTS[report]
+    hot = _stream(db, build(filters))
+    if archived is None:
+        yield from hot
+    else:
+        yield from heapq.merge(hot, archived(db, filters), key=itemgetter(0))
+
+
+def write_csv(db: Session, report: str, filters: Filters):
+    """CSV text, one chunk per database batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORTS[report][1])
+    for n, row in enumerate(rows(db, report, filters), start=1):
+        writer.writerow(row)
+        if n % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_xlsx(db: Session, report: str, filters: Filters):
+    """XLSX bytes; the workbook is built in a temporary file and then read back in chunks."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=report)
+    sheet.append(REPORTS[report][1])
+    for row in rows(db, report, filters):
+        sheet.append(list(row))
+    with tempfile.TemporaryFile() as out:
+        workbook.save(out)
+        out.seek(0)
+        while chunk := out.read(FILE_CHUNK_SIZE):
+            yield chunk
@@ -0,0 +1,193 @@
+# app/rollups.py
+# Monthly per-vehicle totals behind /analytics/data.
+#
+# expenses.log_expense and maintenance.create_service_log add their amounts to
+# the (month, vehicle) row with an upsert in the same transaction as the log
+# itself, so analytics reads the rollup table instead of summing the raw logs.
+# trip_count counts each trip once, in the month of its first expense log.
+#
+# Rebuild the whole table from the raw logs, archived ones included (e.g. after
+# importing history), with:
+#     python -m app.rollups
+from collections import defaultdict
+from itertools import chain
+from datetime import date
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session, aliased
+from . import archive, models
+
+ROLLUP_FIELDS = ["fuel_cost", "misc_cost", "distance_km", "maintenance_cost", "trip_count"]
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _dialect_insert(db: Session):
+    # Both dialects offer INSERT ... ON CONFLICT DO UPDATE with the same API
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _add(db: Session, vehicle_id: int, day: date, deltas: dict):
+    if vehicle_id is None or day is None:
+        return
+    table = models.MonthlyVehicleRollup.__table__
+    row = dict.fromkeys(ROLLUP_FIELDS, 0)
+    row.update(deltas, month=month_start(day), vehicle_id=vehicle_id)
+    stmt = _dialect_insert(db)(table).values(**row)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.month, table.c.vehicle_id],
+        set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+    )
+    db.execute(stmt)
+
+
+def record_expense(db: Session, vehicle_id: int, day: date, fuel_cost, misc_cost, distance_km, new_trip: bool):
+    """new_trip: this is the first expense logged for its trip."""
+    _add(db, vehicle_id, day, {
+        "fuel_cost": fuel_cost or 0.0,
+        "misc_cost": misc_cost or 0.0,
+        "distance_km": distance_km or 0,
+        "trip_count": int(new_trip),
+    })
+
+
+def record_maintenance(db: Session, vehicle_id: int, day: date, cost):
+    _add(db, vehicle_id, day, {"maintenance_cost": cost or 0.0})
+
+
+def record_expenses(db: Session, entries):
+    """record_expense for many (vehicle_id, day, fuel_cost, misc_cost, distance_km, new_trip) at once.
+
+    Entries are summed per (month, vehicle) first, so a bulk import issues one
+    upsert per touched rollup row rather than one per expense.
+    """
+    totals = defaultdict(lambda: {"fuel_cost": 0.0, "misc_cost": 0.0, "distance_km": 0, "trip_count": 0})
+    for vehicle_id, day, fuel_cost, misc_cost, distance_km, new_trip in entries:
+        if vehicle_id is None or day is None:
+            continue
+        row = totals[(month_start(day), vehicle_id)]
+        row["fuel_cost"] += fuel_cost or 0.0
+        row["misc_cost"] += misc_cost or 0.0
+        row["distance_km"] += distance_km or 0
+        row["trip_count"] += int(new_trip)
+    if not totals:
+        return
+    # One executemany upsert; every row carries all the fields, so one statement fits all
+    table = models.MonthlyVehicleRollup.__table__
+    stmt = _dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.month, table.c.vehicle_id],
+        set_={name: table.c[name] + stmt.excluded[name] for name in ROLLUP_FIELDS},
+    )
+    db.execute(stmt, [
+        dict(deltas, maintenance_cost=0.0, month=month, vehicle_id=vehicle_id)
+        for (month, vehicle_id), deltas in totals.items()
+    ])
+
+
+# --- reads ---
+def monthly_totals(db: Session, first_month: date, last_month: date):
+    """Fleet-wide totals per month in [first_month, last_month], oldest first."""
+    r = models.MonthlyVehicleRollup
+    return db.query(
+        r.month,
+        func.sum(r.fuel_cost).label("fuel_cost"),
+        func.sum(r.misc_cost).label("misc_cost"),
+        func.sum(r.distance_km).label("distance_km"),
+        func.sum(r.maintenance_cost).label("maintenance_cost"),
+        func.sum(r.trip_count).label("trip_count"),
+    ).filter(r.month.between(first_month, last_month)).group_by(r.month).order_by(r.month).all()
+
+
+def costliest_vehicles(db: Session, first_month: date, last_month: date, limit: int = 5):
+    """(plate, total maintenance cost) for the vehicles with the highest spend in the range."""
+    r = models.MonthlyVehicleRollup
+    total = func.sum(r.maintenance_cost).label("total")
+    return (
+        db.query(models.Vehicle.plate, total)
+        .select_from(r)
+        .join(models.Vehicle, models.Vehicle.id == r.vehicle_id)
+        .filter(r.month.between(first_month, last_month), r.maintenance_cost > 0)
+        .group_by(r.vehicle_id, models.Vehicle.plate)
+        .order_by(total.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+# --- backfill ---
+def _archived_expenses(db: Session):
+    """Archived expense logs as backfill rows, in id order so a trip's first log comes first.
+
+    A trip is archived together with all of its logs, so none of them is still
+    in the hot table.
+    """
+    seen = set()
+    for _, trip_id, vehicle_id, day, fuel_cost, misc_cost, distance_km in archive.rows(
+            db, "expense_logs", ["id", "trip_id", "vehicle_id", "date", "fuel_cost", "misc_expense", "distance_km"]):
+        new_trip = trip_id not in seen
+        seen.add(trip_id)
+        yield vehicle_id, day, fuel_cost, misc_cost, distance_km, new_trip
+
+
+def backfill(db: Session, batch_size: int = 5000) -> int:
+    """Recompute every rollup row from the raw and archived logs. Returns the number of rows written.
+
+    The logs are streamed, so memory is bounded by months x vehicles (plus the
+    ids of the archived trips) rather than by the number of log rows. The
+    caller commits.
+    """
+    totals = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    # A trip is counted at its first (lowest id) expense log; the probe uses ix_expense_logs_trip_id
+    e, earlier = models.ExpenseLog, aliased(models.ExpenseLog)
+    first = ~exists().where(earlier.trip_id == e.trip_id, earlier.id < e.id)
+    expenses = db.query(
+        models.Trip.vehicle_id, e.date, e.fuel_cost, e.misc_expense, e.distance_km, first,
+    ).join(models.Trip, models.Trip.id == e.trip_id).yield_per(batch_size)
+    for vehicle_id, day, fuel_cost, misc_cost, distance_km, new_trip in chain(expenses, _archived_expenses(db)):
+        if vehicle_id is None or day is None:
+            continue
+        row = totals[(month_start(day), vehicle_id)]
+        row["fuel_cost"] += fuel_cost or 0.0
+        row["misc_cost"] += misc_cost or 0.0
+        row["distance_km"] += distance_km or 0
+        row["trip_count"] += int(new_trip)
+
+    logs = db.query(
+        models.MaintenanceLog.vehicle_id, models.MaintenanceLog.date, models.MaintenanceLog.cost,
+    ).yield_per(batch_size)
+    for vehicle_id, day, cost in logs:
+        if vehicle_id is None or day is None:
+            continue
+        totals[(month_start(day), vehicle_id)]["maintenance_cost"] += cost or 0.0
+
+    db.query(models.MonthlyVehicleRollup).delete(synchronize_session=False)
+    rows = [dict(values, month=month, vehicle_id=vehicle_id) for (month, vehicle_id), values in totals.items()]
+    for i in range(0, len(rows), batch_size):
+        db.execute(models.MonthlyVehicleRollup.__table__.insert(), rows[i:i + batch_size])
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, engine
+    from . import migrations
+
+    models.Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        written = backfill(db)
+        db.commit()
+    from . import cache
+    cache.versions.bump("expense_logs", "maintenance_logs")
+    print(f"Rebuilt {written} monthly rollup rows.")
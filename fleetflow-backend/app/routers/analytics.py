@@ -1,52 +1,86 @@
 # app/routers/analytics.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import models, schemas, database
+from datetime import date
+from typing import Optional
+from .. import schemas, database, counters, rollups, cache
 
 router = APIRouter(
     prefix="/analytics",
     tags=["Analytics & Reports"]
 )
 
+DEFAULT_RANGE_MONTHS = 12
+
 @router.get("/data", response_model=schemas.AnalyticsResponse)
-def get_analytics_data(db: Session = Depends(database.get_db)):
-    # 1. Calculate KPIs
-    total_fuel_cost = db.query(func.sum(models.ExpenseLog.fuel_cost)).scalar() or 0.0 # 
-    total_maintenance = db.query(func.sum(models.MaintenanceLog.cost)).scalar() or 0.0
+async def get_analytics_data(
+    request: Request,
+    start: Optional[date] = Query(None, description="First day of the range (default: 12 months back)"),
+    end: Optional[date] = Query(None, description="Last day of the range (default: today)"),
+    db=Depends(database.get_session),
+):
+    """KPIs, trends and the financial summary for the months between start and end."""
+    last_month = rollups.month_start(end or date.today())
+    first_month = rollups.month_start(start) if start else rollups.add_months(last_month, 1 - DEFAULT_RANGE_MONTHS)
+    if first_month > last_month:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return await cache.cached_response(
+        request, ("vehicles", "trips", "maintenance_logs", "expense_logs"), schemas.AnalyticsResponse,
+        lambda: database.run(db, _get_analytics_data, first_month, last_month)
+    )
+
+def _get_analytics_data(db: Session, first_month: date, last_month: date):
+    # 1. Monthly totals for the range, read from the rollup table
+    months = rollups.monthly_totals(db, first_month, last_month)
+    total_fuel_cost = sum(m.fuel_cost for m in months)
     
     # Calculate Utilization [cite: 153]
-    total_fleet = db.query(models.Vehicle).count()
-    active_fleet = db.query(models.Vehicle).filter(models.Vehicle.status == "On Trip").count()
+    fleet = counters.get_counters(db)
+    total_fleet = fleet.total_vehicles
+    active_fleet = fleet.on_trip
     utilization = int((active_fleet / total_fleet) * 100) if total_fleet > 0 else 0
 
-    # 2. Find Top 5 Costliest Vehicles 
-    # We aggregate maintenance costs per vehicle
-    logs = db.query(models.MaintenanceLog.vehicle_id, func.sum(models.MaintenanceLog.cost).label("total")).group_by(models.MaintenanceLog.vehicle_id).order_by(func.sum(models.MaintenanceLog.cost).desc()).limit(5).all()
-    
-    costliest = []
-    for log in logs:
-        v = db.query(models.Vehicle).filter(models.Vehicle.id == log.vehicle_id).first()
-        if v:
-            costliest.append({"name": v.plate, "cost": log.total})
+    # 2. Find Top 5 Costliest Vehicles (maintenance spend in the range)
+    costliest = [
+        {"name": row.plate, "cost": row.total}
+        for row in rollups.costliest_vehicles(db, first_month, last_month, limit=5)
+    ]
+
+    # 3. Fuel efficiency (km per unit of fuel spend) per month, against the range average
+    total_distance = sum(m.distance_km for m in months)
+    target = round(total_distance / total_fuel_cost, 2) if total_fuel_cost else 0
+    fuel_trend = [ # [cite: 154]
+        {
+            "month": m.month.strftime("%b %Y"),
+            "currentYear": round(m.distance_km / m.fuel_cost, 2) if m.fuel_cost else 0,
+            "target": target
+        }
+        for m in months
+    ]
+
+    # 4. Financial summary per month. Revenue is not recorded anywhere yet,
+    #    so revenue and net profit are reported as unavailable.
+    summary = [ # [cite: 164]
+        {
+            "id": i,
+            "month": m.month.strftime("%b %Y"),
+            "revenue": "N/A",
+            "fuelCost": f"Rs. {round(m.fuel_cost, 2)}k",
+            "maintenance": f"Rs. {round(m.maintenance_cost, 2)}k",
+            "netProfit": "N/A"
+        }
+        for i, m in enumerate(months, start=1)
+    ]
 
     # To ensure the React charts render even on a brand-new database, 
     # we provide safe defaults for the time-series arrays if no historical data exists.
     return {
         "kpis": {
-            "totalFuelCost": f"Rs. {total_fuel_cost}k",
+            "totalFuelCost": f"Rs. {round(total_fuel_cost, 2)}k",
             "fleetROI": "+ 12.5%", # Hardcoded placeholder for complex historical ROI [cite: 150]
             "utilizationRate": f"{utilization}%"
         },
-        "fuelEfficiencyTrend": [ # [cite: 154]
-            {"month": "Jan", "currentYear": 12, "target": 15},
-            {"month": "Mar", "currentYear": 14, "target": 15},
-            {"month": "Jun", "currentYear": 18, "target": 16},
-            {"month": "Sep", "currentYear": 20, "target": 18},
-            {"month": "Dec", "currentYear": 22, "target": 20}
-        ],
+        "fuelEfficiencyTrend": fuel_trend or [{"month": last_month.strftime("%b %Y"), "currentYear": 0, "target": 0}],
         "costliestVehicles": costliest if costliest else [{"name": "No Data", "cost": 0}],
-        "financialSummary": [ # [cite: 164]
-            {"id": 1, "month": "Jan", "revenue": "Rs. 17 L", "fuelCost": f"Rs. {total_fuel_cost}k", "maintenance": f"Rs. {total_maintenance}k", "netProfit": "Rs. 9 L"}
-        ]
+        "financialSummary": summary
     }
\ No newline at end of file
@@ -1,14 +1,31 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import math
+import os
+import time
 import bcrypt  # <-- We use pure bcrypt now, avoiding the broken passlib
-from .. import models, schemas, database
+from .. import models, schemas, database, tokens, cache
 
 router = APIRouter(
     prefix="/auth",
     tags=["Authentication"]
 )
 
+# bcrypt gets its own small pool, so a burst of logins queues here instead of
+# occupying the threadpool every other endpoint runs on. A login holds a slot
+# from its first line, so beyond BCRYPT_MAX_PENDING logins in progress new ones
+# are turned away with a 503 before they touch the database. bcrypt saturates a
+# core per worker, so by default half the cores are left to serve everything else.
+BCRYPT_WORKERS = int(os.getenv("FLEETFLOW_BCRYPT_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+BCRYPT_MAX_PENDING = int(os.getenv("FLEETFLOW_BCRYPT_MAX_PENDING", "64"))
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_pending = 0
+_bcrypt_seconds = 0.25  # moving average of one hash, for Retry-After
+
 # --- Pure Bcrypt Hashing Functions ---
 def get_password_hash(password: str) -> str:
     # Convert string to bytes, hash it with a salt, and decode back to a string for the database
@@ -20,16 +37,54 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Compare the plain text against the hash
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+async def _bcrypt_slot():
+    # A dependency declared before the session, so a refused login never opens one
+    global _bcrypt_pending
+    if _bcrypt_pending >= BCRYPT_MAX_PENDING:
+        # Ask clients to come back once the current backlog has drained
+        retry_after = max(1, math.ceil(_bcrypt_pending * _bcrypt_seconds / BCRYPT_WORKERS))
+        raise HTTPException(status_code=503, detail="Too many logins in progress, please retry.",
+                            headers={"Retry-After": str(retry_after)})
+    _bcrypt_pending += 1  # only touched on the event loop thread
+    try:
+        yield
+    finally:
+        _bcrypt_pending -= 1
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+async def _run_bcrypt(fn, *args):
+    global _bcrypt_seconds
+    result, seconds = await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, _timed, fn, *args)
+    _bcrypt_seconds = 0.9 * _bcrypt_seconds + 0.1 * seconds
+    return result
+
 # --- API Routes ---
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register_user(user: schemas.UserCreate, _slot=Depends(_bcrypt_slot), db=Depends(database.get_session)):
     # 1. Check if user already exists
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if db_user:
+    if await database.run(db, _find_user, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # 2. Hash password and save to database
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await _run_bcrypt(get_password_hash, user.password)
+    return await database.run(db, _save_user, user, hashed_pw)
+
+def _find_user(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def _find_login(db: Session, username: str):
+    # Detach the user and end the transaction, so the pooled connection is back
+    # in the pool before the (slow) bcrypt check instead of waiting on it
+    db_user = _find_user(db, username)
+    if db_user is not None:
+        db.expunge(db_user)
+    db.rollback()
+    return db_user
+
+def _save_user(db: Session, user: schemas.UserCreate, hashed_pw: str):
     new_user = models.User(username=user.username, hashed_password=hashed_pw, role=user.role)
     
     db.add(new_user)
@@ -38,13 +93,14 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
     
     return new_user
 
-@router.post("/login")
-def login(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+@router.post("/login", response_model=schemas.LoginResponse)
+async def login(user: schemas.UserCreate, _slot=Depends(_bcrypt_slot), db=Depends(database.get_session)):
+    """Check the password once and issue an access token (Authorization: Bearer) plus a refresh token."""
     # 1. Find user in the database
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+    db_user = await database.run(db, _find_login, user.username)
     
     # 2. Verify user exists AND password is correct
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user or not await _run_bcrypt(verify_password, user.password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     return {
@@ -53,5 +109,56 @@ def login(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
             "id": db_user.id, 
             "username": db_user.username, 
             "role": db_user.role
-        }
-    }
\ No newline at end of file
+        },
+        **tokens.issue_pair(db_user)
+    }
+
+@router.post("/refresh", response_model=schemas.LoginResponse)
+async def refresh(body: schemas.RefreshRequest, db=Depends(database.get_session)):
+    """Trade a refresh token for a new pair; the old refresh token is revoked (rotation)."""
+    try:
+        claims = await tokens.decode(body.refresh_token, expected_type="refresh")
+    except tokens.InvalidToken as exc:
+        raise HTTPException(status_code=401, detail=str(exc))
+    return await database.run(db, _rotate, claims)
+
+def _rotate(db: Session, claims: dict):
+    # Re-read the user so a deleted account or changed role takes effect at refresh
+    db_user = db.get(models.User, int(claims["sub"]))
+    if not db_user:
+        raise HTTPException(status_code=401, detail="User no longer exists")
+    tokens.revoked.revoke(db, [claims])
+    db.commit()
+    cache.versions.bump("revoked_tokens")
+    return {
+        "message": "Token refreshed",
+        "user": {"id": db_user.id, "username": db_user.username, "role": db_user.role},
+        **tokens.issue_pair(db_user)
+    }
+
+@router.post("/logout")
+async def logout(
+    body: schemas.LogoutRequest = schemas.LogoutRequest(),
+    credentials: HTTPAuthorizationCredentials = Depends(tokens.bearer),
+    db=Depends(database.get_session),
+):
+    """Revoke the access token in the Authorization header (and the refresh token, if sent)."""
+    claims = await tokens.require_user(credentials)
+    revoke = [claims]
+    if body.refresh_token:
+        try:
+            revoke.append(await tokens.decode(body.refresh_token, expected_type="refresh"))
+        except tokens.InvalidToken:
+            pass  # already unusable
+    await database.run(db, _revoke, revoke)
+    return {"message": "Logged out"}
+
+def _revoke(db: Session, claims_list):
+    tokens.revoked.revoke(db, claims_list)
+    db.commit()
+    cache.versions.bump("revoked_tokens")
+
+@router.get("/me")
+async def read_current_user(claims: dict = Depends(tokens.require_user)):
+    """The user behind the access token, straight from its claims (no database access)."""
+    return {"id": int(claims["sub"]), "username": claims["name"], "role": claims["role"]}
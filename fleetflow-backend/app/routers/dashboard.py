@@ -1,8 +1,7 @@
 # app/routers/dashboard.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import models, schemas, database
+from .. import schemas, database, queries, counters, cache
 from typing import List
 
 router = APIRouter(
@@ -11,12 +10,19 @@ router = APIRouter(
 )
 
 @router.get("/stats", response_model=schemas.DashboardStatsResponse)
-def get_dashboard_stats(db: Session = Depends(database.get_db)):
-    # Calculate KPIs based on PDF rules
-    total_fleet = db.query(models.Vehicle).count()
-    active_fleet = db.query(models.Vehicle).filter(models.Vehicle.status == "On Trip").count() # [cite: 196]
-    maintenance_alerts = db.query(models.Vehicle).filter(models.Vehicle.status == "In Shop").count() # [cite: 197]
-    pending_cargo = db.query(models.Trip).filter(models.Trip.status == "Dispatched").count() # [cite: 199]
+async def get_dashboard_stats(request: Request, db=Depends(database.get_session)):
+    return await cache.cached_response(
+        request, ("vehicles", "trips"), schemas.DashboardStatsResponse,
+        lambda: database.run(db, _get_dashboard_stats)
+    )
+
+def _get_dashboard_stats(db: Session):
+    # Calculate KPIs based on PDF rules, read from the maintained counter row
+    fleet = counters.get_counters(db)
+    total_fleet = fleet.total_vehicles
+    active_fleet = fleet.on_trip # [cite: 196]
+    maintenance_alerts = fleet.in_shop # [cite: 197]
+    pending_cargo = fleet.dispatched_trips # [cite: 199]
     
     utilization = 0
     if total_fleet > 0:
@@ -31,14 +37,20 @@ def get_dashboard_stats(db: Session = Depends(database.get_db)):
     }
 
 @router.get("/active-trips", response_model=List[schemas.ActiveTripDTO])
-def get_active_trips(db: Session = Depends(database.get_db)):
-    # Join Trip, Vehicle, and Driver for the frontend table
-    trips = db.query(models.Trip).filter(models.Trip.status.in_(["Dispatched", "On Trip"])).all()
+async def get_active_trips(request: Request, db=Depends(database.get_session)):
+    return await cache.cached_response(
+        request, ("trips", "vehicles", "drivers"), List[schemas.ActiveTripDTO],
+        lambda: database.run(db, _get_active_trips)
+    )
+
+def _get_active_trips(db: Session):
+    # Join Trip, Vehicle, and Driver for the frontend table in a single query
+    trips = queries.active_trips_with_resources(db)
     
     result = []
     for trip in trips:
-        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == trip.vehicle_id).first()
-        driver = db.query(models.Driver).filter(models.Driver.id == trip.driver_id).first()
+        vehicle = trip.vehicle
+        driver = trip.driver
         
         result.append({
             "id": trip.id,
@@ -1,20 +1,51 @@
 # app/routers/drivers.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response, File, UploadFile
 from sqlalchemy.orm import Session
-from .. import models, schemas, database
-from typing import List
+from .. import models, schemas, database, pagination, availability, cache, events, bulk, fastjson, scoring
+from datetime import datetime, timezone
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/drivers",
     tags=["Driver Performance"]
 )
 
+# Columns for the fast list path (app/fastjson.py)
+DRIVER_ROWS = fastjson.RowShape(schemas.DriverResponse, models.Driver)
+
 @router.get("/", response_model=List[schemas.DriverResponse])
-def get_drivers(db: Session = Depends(database.get_db)):
-    return db.query(models.Driver).all()
+async def get_drivers(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    sort: str = Query("id", pattern="^(id|score)$", description="score: best rated first"),
+    min_score: Optional[float] = Query(None, description="Only drivers scoring at least this"),
+    accept: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    # Both the ranking and the threshold are served by ix_drivers_score
+    by = models.Driver.score if sort == "score" else None
+    where = [models.Driver.score >= min_score] if min_score is not None else []
+    if pagination.wants_ndjson(accept):
+        if fastjson.ENABLED:
+            return pagination.stream_ndjson_rows(DRIVER_ROWS, after, where, by)
+        return pagination.stream_ndjson(
+            lambda session: session.query(models.Driver).filter(*where), models.Driver.id, schemas.DriverResponse,
+            after, by
+        )
+    if fastjson.ENABLED:
+        return await database.run(db, pagination.keyset_json, DRIVER_ROWS, limit, after, where, by)
+    return await database.run(
+        db, lambda session: pagination.keyset_page(
+            session.query(models.Driver).filter(*where), models.Driver.id, limit, after, response, by
+        )
+    )
 
 @router.post("/", response_model=schemas.DriverResponse, status_code=status.HTTP_201_CREATED)
-def add_driver(driver: schemas.DriverCreate, db: Session = Depends(database.get_db)):
+async def add_driver(driver: schemas.DriverCreate, db=Depends(database.get_session)):
+    return await database.run(db, _add_driver, driver)
+
+def _add_driver(db: Session, driver: schemas.DriverCreate):
     new_driver = models.Driver(
         name=driver.name,
         license_number=driver.license_number,
@@ -24,10 +55,16 @@ def add_driver(driver: schemas.DriverCreate, db: Session = Depends(database.get_
     db.add(new_driver)
     db.commit()
     db.refresh(new_driver)
+    availability.index.driver_changed(new_driver)
+    cache.versions.bump("drivers")
+    events.publish("driver.created", schemas.DriverResponse.model_validate(new_driver).model_dump())
     return new_driver
 
 @router.put("/{driver_id}/status")
-def update_driver_status(driver_id: int, status_update: schemas.DriverUpdateStatus, db: Session = Depends(database.get_db)):
+async def update_driver_status(driver_id: int, status_update: schemas.DriverUpdateStatus, db=Depends(database.get_session)):
+    return await database.run(db, _update_driver_status, driver_id, status_update)
+
+def _update_driver_status(db: Session, driver_id: int, status_update: schemas.DriverUpdateStatus):
     driver = db.query(models.Driver).filter(models.Driver.id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
@@ -40,4 +77,59 @@ def update_driver_status(driver_id: int, status_update: schemas.DriverUpdateStat
     driver.status = status_update.status
     db.commit()
     db.refresh(driver)
-    return driver
\ No newline at end of file
+    availability.index.driver_changed(driver)
+    cache.versions.bump("drivers")
+    events.publish("driver.status", {"id": driver.id, "status": driver.status})
+    return driver
+
+@router.post("/{driver_id}/incidents", response_model=schemas.IncidentResponse, status_code=status.HTTP_201_CREATED)
+async def report_incident(driver_id: int, incident: schemas.IncidentCreate, db=Depends(database.get_session)):
+    """Record a complaint, violation or accident; the driver's safety score and rating update at once."""
+    return await database.run(db, _report_incident, driver_id, incident)
+
+def _report_incident(db: Session, driver_id: int, incident: schemas.IncidentCreate):
+    driver = db.query(models.Driver).filter(models.Driver.id == driver_id).first()
+    if not driver:
+        raise HTTPException(status_code=404, detail="Driver not found")
+    if incident.kind not in scoring.INCIDENT_POINTS:
+        raise HTTPException(status_code=400, detail=f"Invalid kind. Must be one of {list(scoring.INCIDENT_POINTS)}")
+    if incident.tripId is not None and db.get(models.Trip, incident.tripId) is None:
+        raise HTTPException(status_code=404, detail="Trip not found")
+
+    new_incident = models.DriverIncident(
+        driver_id=driver_id,
+        trip_id=incident.tripId,
+        kind=incident.kind,
+        points=scoring.INCIDENT_POINTS[incident.kind],
+        note=incident.note,
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    db.add(new_incident)
+    scoring.record_incident(db, new_incident)
+    db.commit()
+    db.refresh(new_incident)
+    db.refresh(driver)
+    availability.index.driver_changed(driver)
+    cache.versions.bump("drivers")
+    events.publish("driver.incident", {
+        "id": driver.id, "kind": new_incident.kind, "safety_score": driver.safety_score, "score": driver.score,
+    })
+    return new_incident
+
+@router.post("/bulk", response_model=schemas.ImportReport)
+async def bulk_create_drivers(batch: schemas.BulkImportRequest, db=Depends(database.get_session)):
+    """Create many drivers in chunked, set-based inserts; invalid rows are reported, not fatal."""
+    return await database.run(db, _import_drivers, bulk.json_rows(batch.rows))
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_drivers_csv(file: UploadFile = File(...), db=Depends(database.get_session)):
+    """Same as /bulk for an uploaded CSV whose header uses the JSON field names."""
+    return await database.run(db, _import_drivers, bulk.csv_rows(file.file))
+
+def _import_drivers(db: Session, rows):
+    report = bulk.import_rows(db, "drivers", rows)
+    if report["inserted"]:
+        availability.index.invalidate()
+        cache.versions.bump("drivers")
+        events.publish("drivers.imported", {"count": report["inserted"]})
+    return report
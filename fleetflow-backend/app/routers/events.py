@@ -0,0 +1,31 @@
+# app/routers/events.py
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from .. import events
+from typing import Optional
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Live Updates"]
+)
+
+@router.get("/stream")
+async def stream_events(
+    last_event_id: Optional[int] = Header(None),
+    since: Optional[int] = Query(None, description="Resume after this event id (for clients that cannot set Last-Event-ID)"),
+):
+    """Server-sent events with a compact delta per committed change.
+
+    Event types: trip.dispatched, trips.dispatched, trip.completed, trip.cancelled,
+    vehicle.created, vehicle.status, driver.created, driver.status, driver.incident,
+    maintenance.created, vehicles/drivers/expenses.imported (a count only), and "reset" when the
+    missed events are gone and the client should reload its lists.
+    """
+    if events.bus.subscribers >= events.bus.max_subscribers:
+        raise HTTPException(status_code=503, detail="Too many live update subscribers.")
+    resume_from = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        events.bus.stream(resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,20 +1,51 @@
 # app/routers/expenses.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response, File, UploadFile
 from sqlalchemy.orm import Session
-from .. import models, schemas, database
-from typing import List
+from datetime import date
+from .. import models, schemas, database, pagination, rollups, cache, events, bulk, fastjson, fuel, idempotency
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/expenses",
     tags=["Expense Logging"]
 )
 
+# Columns for the fast list path (app/fastjson.py)
+EXPENSE_ROWS = fastjson.RowShape(schemas.ExpenseResponse, models.ExpenseLog)
+
 @router.get("/", response_model=List[schemas.ExpenseResponse])
-def get_expenses(db: Session = Depends(database.get_db)):
-    return db.query(models.ExpenseLog).all()
+async def get_expenses(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    accept: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    if pagination.wants_ndjson(accept):
+        if fastjson.ENABLED:
+            return pagination.stream_ndjson_rows(EXPENSE_ROWS, after)
+        return pagination.stream_ndjson(
+            lambda session: session.query(models.ExpenseLog), models.ExpenseLog.id, schemas.ExpenseResponse, after
+        )
+    if fastjson.ENABLED:
+        return await database.run(db, pagination.keyset_json, EXPENSE_ROWS, limit, after)
+    return await database.run(
+        db, lambda session: pagination.keyset_page(
+            session.query(models.ExpenseLog), models.ExpenseLog.id, limit, after, response
+        )
+    )
 
 @router.post("/", response_model=schemas.ExpenseResponse, status_code=status.HTTP_201_CREATED)
-def log_expense(expense: schemas.ExpenseCreate, db: Session = Depends(database.get_db)):
+async def log_expense(
+    expense: schemas.ExpenseCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    return await idempotency.idempotent(request, idempotency_key, schemas.ExpenseResponse, status.HTTP_201_CREATED,
+                                        db, _log_expense, expense)
+
+def _log_expense(db: Session, expense: schemas.ExpenseCreate):
     # 1. Find the associated trip
     trip = db.query(models.Trip).filter(models.Trip.id == expense.tripId).first()
     if not trip:
@@ -33,10 +64,44 @@ def log_expense(expense: schemas.ExpenseCreate, db: Session = Depends(database.g
         distance_km=expense.distance,
         fuel_cost=expense.fuelCost,
         misc_expense=expense.miscExpense,
-        status="Done"
+        status="Done",
+        date=expense.date or date.today()
     )
 
+    # The rollups and the fuel estimator count a trip once, however many expenses it has; the
+    # estimator counts it in its first expense with a distance (fuel.SAMPLE_ROWS)
+    first_for_trip = db.query(models.ExpenseLog.id).filter(models.ExpenseLog.trip_id == trip.id).first() is None
+    first_sample = expense.distance > 0 and db.query(models.ExpenseLog.id).filter(
+        models.ExpenseLog.trip_id == trip.id, fuel.SAMPLE_ROWS).first() is None
+
+    # 4. Add it to the vehicle's monthly rollup in the same transaction
+    rollups.record_expense(
+        db, trip.vehicle_id, new_expense.date, expense.fuelCost, expense.miscExpense, expense.distance, first_for_trip
+    )
+    vehicle_type = db.query(models.Vehicle.type).filter(models.Vehicle.id == trip.vehicle_id).scalar()
+    route = (trip.origin, trip.destination)
+
     db.add(new_expense)
     db.commit()
+    fuel.matrix.expense_logged(*route, vehicle_type, expense.distance, expense.fuelCost, first_sample)
+    cache.versions.bump("expense_logs")
     db.refresh(new_expense)
-    return new_expense
\ No newline at end of file
+    return new_expense
+
+@router.post("/bulk", response_model=schemas.ImportReport)
+async def bulk_create_expenses(batch: schemas.BulkImportRequest, db=Depends(database.get_session)):
+    """Create many expense logs in chunked, set-based inserts; invalid rows are reported, not fatal."""
+    return await database.run(db, _import_expenses, bulk.json_rows(batch.rows))
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_expenses_csv(file: UploadFile = File(...), db=Depends(database.get_session)):
+    """Same as /bulk for an uploaded CSV whose header uses the JSON field names."""
+    return await database.run(db, _import_expenses, bulk.csv_rows(file.file))
+
+def _import_expenses(db: Session, rows):
+    report = bulk.import_rows(db, "expenses", rows)
+    if report["inserted"]:
+        fuel.matrix.invalidate()
+        cache.versions.bump("expense_logs")
+        events.publish("expenses.imported", {"count": report["inserted"]})
+    return report
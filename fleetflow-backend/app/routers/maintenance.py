@@ -1,25 +1,50 @@
 # app/routers/maintenance.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
+from sqlalchemy import case
 from sqlalchemy.orm import Session
-from .. import models, schemas, database
-from typing import List
+from .. import models, schemas, database, queries, counters, availability, rollups, cache, events, fastjson, idempotency
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/maintenance",
     tags=["Maintenance Logs"]
 )
 
+# Columns for the fast list path (app/fastjson.py), vehicle model joined in as on the ORM path
+MAINTENANCE_ROWS = fastjson.RowShape(
+    schemas.MaintenanceResponse, models.MaintenanceLog,
+    join=(models.Vehicle, models.Vehicle.id == models.MaintenanceLog.vehicle_id),
+    vehicle_name=case((models.Vehicle.id.is_(None), "Unknown"), else_=models.Vehicle.model),
+)
+
 @router.get("/", response_model=List[schemas.MaintenanceResponse])
-def get_maintenance_logs(db: Session = Depends(database.get_db)):
-    logs = db.query(models.MaintenanceLog).all()
-    # Attach vehicle model name for frontend convenience
+async def get_maintenance_logs(db=Depends(database.get_session)):
+    if fastjson.ENABLED:
+        return await database.run(db, _get_maintenance_rows)
+    return await database.run(db, _get_maintenance_logs)
+
+def _get_maintenance_rows(db: Session):
+    rows = db.execute(MAINTENANCE_ROWS.select().order_by(models.MaintenanceLog.id)).all()
+    return fastjson.FastJSONResponse(MAINTENANCE_ROWS.dicts(rows))
+
+def _get_maintenance_logs(db: Session):
+    logs = queries.maintenance_logs_with_vehicle(db)
+    # Attach vehicle model name for frontend convenience (already joined in)
     for log in logs:
-        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == log.vehicle_id).first()
-        log.vehicle_name = vehicle.model if vehicle else "Unknown"
+        log.vehicle_name = log.vehicle.model if log.vehicle else "Unknown"
     return logs
 
 @router.post("/", response_model=schemas.MaintenanceResponse, status_code=status.HTTP_201_CREATED)
-def create_service_log(log_data: schemas.MaintenanceCreate, db: Session = Depends(database.get_db)):
+async def create_service_log(
+    log_data: schemas.MaintenanceCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    return await idempotency.idempotent(request, idempotency_key, schemas.MaintenanceResponse,
+                                        status.HTTP_201_CREATED, db, _create_service_log, log_data)
+
+def _create_service_log(db: Session, log_data: schemas.MaintenanceCreate):
     # 1. Verify the vehicle exists
     vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == log_data.vehicleId).first()
     if not vehicle:
@@ -35,11 +60,19 @@ def create_service_log(log_data: schemas.MaintenanceCreate, db: Session = Depend
     )
     
     # 3. AUTO-HIDE RULE: Update vehicle status to "In Shop"
+    counters.record_vehicle_status_change(db, vehicle.status, "In Shop")
     vehicle.status = "In Shop"
 
+    # 4. Add the cost to the vehicle's monthly rollup in the same transaction
+    rollups.record_maintenance(db, vehicle.id, log_data.date, log_data.cost)
+
     db.add(new_log)
     db.commit()
     db.refresh(new_log)
+    availability.index.remove_vehicles([log_data.vehicleId])
+    cache.versions.bump("maintenance_logs", "vehicles")
+    events.publish("maintenance.created", {"id": new_log.id, "vehicleId": new_log.vehicle_id, "cost": new_log.cost})
+    events.publish("vehicle.status", {"id": new_log.vehicle_id, "status": "In Shop"})
     
     new_log.vehicle_name = vehicle.model
     return new_log
\ No newline at end of file
@@ -0,0 +1,19 @@
+# app/routers/monitoring.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .. import metrics
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Monitoring"]
+)
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    """Route latency histograms and SQL counters in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/slow-queries")
+async def get_slow_queries():
+    """The latest statements slower than FLEETFLOW_SLOW_QUERY_MS, newest first (SQL text only)."""
+    return metrics.slow_queries()
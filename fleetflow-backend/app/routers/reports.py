@@ -0,0 +1,47 @@
+# app/routers/reports.py
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import Literal, Optional
+from .. import reports
+from ..database import SessionLocal
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["Analytics & Reports"]
+)
+
+@router.get("/export/{report}")
+def export_report(
+    report: Literal["expenses", "maintenance", "financial"],
+    format: Literal["csv", "xlsx"] = "csv",
+    start: Optional[date] = Query(None, description="First day to include"),
+    end: Optional[date] = Query(None, description="Last day to include"),
+    vehicle_id: Optional[int] = None,
+    driver_id: Optional[int] = Query(None, description="Expenses report only"),
+):
+    """Download a full report as CSV (or XLSX), streamed straight from the database."""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if driver_id is not None and not reports.REPORTS[report][2]:
+        raise HTTPException(status_code=400, detail=f"The {report} report cannot be filtered by driver")
+    if format == "xlsx" and reports.openpyxl is None:
+        raise HTTPException(status_code=501, detail="XLSX export needs openpyxl installed on the server")
+
+    filters = reports.Filters(start, end, vehicle_id, driver_id)
+    write = reports.write_xlsx if format == "xlsx" else reports.write_csv
+
+    def generate():
+        # Own session: the response keeps reading after this handler has returned
+        db = SessionLocal()
+        try:
+            yield from write(db, report, filters)
+        finally:
+            db.close()
+
+    filename = f"fleetflow-{report}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        generate(),
+        media_type=reports.XLSX_MEDIA_TYPE if format == "xlsx" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,26 @@
+# app/routers/search.py
+from fastapi import APIRouter, Depends, Query, Request
+from typing import Optional
+from .. import schemas, database, cache, search
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+@router.get("/", response_model=schemas.SearchResponse)
+async def search_fleet(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Words to find; the last may be partial"),
+    kind: Optional[str] = Query(None, pattern="^(vehicle|driver|trip)$", description="Only this kind of hit"),
+    limit: int = Query(10, ge=1, le=100, description="Hits per kind"),
+    offset: int = Query(0, ge=0, le=10000),
+    db=Depends(database.get_session),
+):
+    """Vehicles by plate or model, drivers by name or licence, trips by origin or destination."""
+    kinds = (kind,) if kind else search.KINDS
+    tables = tuple(search.INDEXES[k].table for k in kinds)
+    return await cache.cached_response(
+        request, tables, schemas.SearchResponse,
+        lambda: database.run(db, search.search, q, kinds, limit, offset)
+    )
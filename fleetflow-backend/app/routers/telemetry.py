@@ -0,0 +1,39 @@
+# app/routers/telemetry.py
+from fastapi import APIRouter, HTTPException, status
+from datetime import datetime, timezone
+from .. import schemas, telemetry
+
+router = APIRouter(
+    prefix="/telemetry",
+    tags=["Telemetry"]
+)
+
+@router.post("/pings", response_model=schemas.TelemetryAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_pings(batch: schemas.TelemetryBatch):
+    """Queue a batch of vehicle pings; they are written to the database in the background.
+
+    Answers 429 (with Retry-After) when the ingest buffer is full; resend the same batch later.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    pings = [
+        (p.vehicleId, _as_utc(p.recordedAt) if p.recordedAt else now, p.odometer, p.fuelLevel, p.latitude, p.longitude)
+        for p in batch.pings
+    ]
+    if not telemetry.buffer.offer(pings):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Telemetry buffer is full, retry later.",
+            headers={"Retry-After": str(telemetry.RETRY_AFTER_S)},
+        )
+    return {"accepted": len(pings), "buffered": telemetry.buffer.buffered}
+
+@router.get("/stats")
+async def get_ingest_stats():
+    """Counters of the ingest buffer in this process."""
+    return dict(telemetry.buffer.stats, buffered=telemetry.buffer.buffered, maxBuffered=telemetry.buffer.max_buffered)
+
+def _as_utc(value: datetime) -> datetime:
+    # Stored as naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
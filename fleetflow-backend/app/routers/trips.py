@@ -1,31 +1,85 @@
 # app/routers/trips.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from sqlalchemy import bindparam, func, insert, update
 from sqlalchemy.orm import Session
-from datetime import date
-from .. import models, schemas, database
-from typing import List
+from sqlalchemy.exc import OperationalError
+from datetime import date, datetime, timezone
+import asyncio
+import random
+from collections import defaultdict
+from functools import partial
+from .. import models, schemas, database, counters, pagination, queries, assignment, availability, cache, events, fastjson, scoring, fuel, rollups, idempotency
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/trips",
     tags=["Trip Dispatcher"]
 )
 
+# Columns for the fast list path (app/fastjson.py)
+TRIP_ROWS = fastjson.RowShape(schemas.TripResponse, models.Trip)
+
+# Bounded retry when SQLite reports the write lock as busy during a dispatch
+MAX_DISPATCH_ATTEMPTS = 5
+DISPATCH_RETRY_BACKOFF_S = 0.005
+
+# Ids per "UPDATE ... WHERE id IN (...)" when a batch dispatch claims its resources
+CLAIM_CHUNK_SIZE = 500
+
+@router.get("/", response_model=List[schemas.TripResponse])
+async def get_trips(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    accept: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    """Full trip history, one keyset page at a time (or streamed as NDJSON)."""
+    if pagination.wants_ndjson(accept):
+        if fastjson.ENABLED:
+            return pagination.stream_ndjson_rows(TRIP_ROWS, after)
+        return pagination.stream_ndjson(
+            lambda session: session.query(models.Trip), models.Trip.id, schemas.TripResponse, after
+        )
+    if fastjson.ENABLED:
+        return await database.run(db, pagination.keyset_json, TRIP_ROWS, limit, after)
+    return await database.run(
+        db, lambda session: pagination.keyset_page(
+            session.query(models.Trip), models.Trip.id, limit, after, response
+        )
+    )
+
 @router.get("/available-resources", response_model=schemas.AvailableResourcesResponse)
-def get_available_resources(db: Session = Depends(database.get_db)):
-    """Fetches data for the Dispatcher form dropdowns, strictly enforcing business rules."""
-    today = date.today()
-    
-    # Only fetch vehicles that are strictly "Available"
-    available_vehicles = db.query(models.Vehicle).filter(models.Vehicle.status == "Available").all()
-    
-    # SAFETY LOCK RULE: Only fetch drivers who are "On Duty" AND license is not expired
-    available_drivers = db.query(models.Driver).filter(
-        models.Driver.status == "On Duty",
-        models.Driver.expiry_date >= today
-    ).all()
+async def get_available_resources(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    driver_sort: str = Query("expiry", pattern="^(expiry|score)$", description="score: best rated driver first"),
+    min_driver_score: Optional[float] = None,
+    db=Depends(database.get_session),
+):
+    """Fetches data for the Dispatcher form dropdowns, strictly enforcing business rules.
+
+    limit/after page through the active trips table; the dropdown lists are always complete
+    (apart from drivers below min_driver_score).
+    """
+    return await database.run(
+        db, _get_available_resources, response, limit, after, driver_sort == "score", min_driver_score
+    )
+
+def _get_available_resources(db: Session, response: Response, limit: Optional[int], after: Optional[int],
+                             drivers_by_score: bool = False, min_driver_score: Optional[float] = None):
+    # Only vehicles that are strictly "Available", and (SAFETY LOCK RULE) only drivers
+    # who are "On Duty" AND whose license is not expired, served from the in-memory index
+    available_vehicles, available_drivers = availability.index.snapshot(
+        db, by_score=drivers_by_score, min_score=min_driver_score
+    )
     
-    # Fetch active trips to display in the table
-    active_trips = db.query(models.Trip).all()
+    # Fetch active trips (not the whole history) to display in the table
+    active_trips = pagination.keyset_page(
+        db.query(models.Trip).filter(models.Trip.status.in_(queries.ACTIVE_TRIP_STATUSES)),
+        models.Trip.id, limit, after, response
+    )
     
     return {
         "vehicles": available_vehicles,
@@ -33,24 +87,134 @@ def get_available_resources(db: Session = Depends(database.get_db)):
         "trips": active_trips
     }
 
+@router.get("/estimate", response_model=schemas.FuelEstimateResponse)
+async def estimate_fuel_cost(
+    origin: str = Query(..., min_length=1),
+    destination: str = Query(..., min_length=1),
+    vehicle_type: Optional[str] = None,
+    vehicle_id: Optional[int] = Query(None, description="Use this vehicle's type"),
+    db=Depends(database.get_session),
+):
+    """Fuel cost of a trip, estimated from the expenses of past trips on the same route."""
+    request = schemas.FuelEstimateRequest(origin=origin, destination=destination, vehicleType=vehicle_type,
+                                          vehicleId=vehicle_id)
+    (estimate,) = await database.run(db, _estimate_fuel_costs, [request])
+    if estimate is None:
+        raise HTTPException(status_code=404, detail="No expense history to estimate this route from")
+    return estimate
+
+@router.post("/estimate/bulk", response_model=schemas.BulkFuelEstimateResponse)
+async def estimate_fuel_costs(batch: schemas.BulkFuelEstimateRequest, db=Depends(database.get_session)):
+    """Estimates for many trips at once, in request order (null where the route has no history)."""
+    return {"estimates": await database.run(db, _estimate_fuel_costs, batch.items)}
+
+def _estimate_fuel_costs(db: Session, items: List[schemas.FuelEstimateRequest]):
+    vehicle_ids = {item.vehicleId for item in items if item.vehicleId is not None}
+    types = {}
+    if vehicle_ids:
+        types = dict(db.query(models.Vehicle.id, models.Vehicle.type).filter(models.Vehicle.id.in_(vehicle_ids)))
+    keys = [(item.origin, item.destination, types.get(item.vehicleId, item.vehicleType)) for item in items]
+    return [
+        None if e is None else {"origin": o, "destination": d, "vehicle_type": t, "distance_km": e.distance_km,
+                                "cost_per_km": e.cost_per_km, "estimated_fuel_cost": e.fuel_cost,
+                                "samples": e.samples, "basis": e.basis}
+        for (o, d, t), e in zip(keys, fuel.matrix.estimate_many(db, keys))
+    ]
+
+@router.post("/re-estimate", response_model=schemas.ReestimateResponse)
+async def reestimate_open_trips(db=Depends(database.get_session)):
+    """Recompute the fuel estimate of every active trip from the current expense history."""
+    return await database.run(db, _reestimate_open_trips)
+
+def _reestimate_open_trips(db: Session):
+    result = fuel.reestimate_open_trips(db)
+    db.commit()
+    if result["updated"]:
+        cache.versions.bump("trips")
+    return result
+
 @router.post("/dispatch", response_model=schemas.TripResponse, status_code=status.HTTP_201_CREATED)
-def dispatch_trip(trip: schemas.TripCreate, db: Session = Depends(database.get_db)):
-    # 1. Fetch the selected vehicle and driver
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == trip.vehicleId).first()
-    driver = db.query(models.Driver).filter(models.Driver.id == trip.driverId).first()
+async def dispatch_trip(
+    trip: schemas.TripCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    return await idempotency.idempotent(request, idempotency_key, schemas.TripResponse, status.HTTP_201_CREATED,
+                                        db, _dispatch_trip, trip, retry=_with_dispatch_retry)
+
+class _ClaimLost(Exception):
+    """A concurrent dispatcher claimed a resource this transaction had picked."""
+
+class _Contended(Exception):
+    """An attempt lost to another writer and was rolled back; it can be tried again."""
+
+def _attempt(db: Session, fn, *args):
+    # SQLite can still report "database is locked" when many dispatchers commit at
+    # once; the claim is all-or-nothing, so it is safe to roll back and try again.
+    # Any other OperationalError (a missing column, disk I/O) is not contention.
+    try:
+        return fn(db, *args)
+    except (OperationalError, _ClaimLost) as exc:
+        db.rollback()
+        if isinstance(exc, OperationalError) and not database.is_busy(exc):
+            raise
+        raise _Contended() from exc
+
+async def _with_dispatch_retry(run, fn, *args):
+    """await run(fn, *args) (database.run bound to a session) until fn stops losing to contention.
 
-    if not vehicle or vehicle.status != "Available":
+    Each attempt is its own run, and the backoff between them is awaited: in
+    async mode the attempts run on the event loop, which keeps serving other
+    requests while this one waits.
+    """
+    for attempt in range(MAX_DISPATCH_ATTEMPTS):
+        try:
+            return await run(_attempt, fn, *args)
+        except _Contended:
+            if attempt == MAX_DISPATCH_ATTEMPTS - 1:
+                raise HTTPException(status_code=503, detail="Dispatch is busy, please try again.")
+            await asyncio.sleep(DISPATCH_RETRY_BACKOFF_S * (2 ** attempt) * random.random())
+
+def _dispatch_trip(db: Session, trip: schemas.TripCreate):
+    if trip.estimatedFuelCost is None:
+        # Estimated before the claim, to keep the write transaction short
+        vehicle_type = db.query(models.Vehicle.type).filter(models.Vehicle.id == trip.vehicleId).scalar()
+        estimate = fuel.matrix.estimate(db, trip.origin, trip.destination, vehicle_type)
+        trip = trip.model_copy(update={"estimatedFuelCost": estimate.fuel_cost if estimate else None})
+    return _claim_and_create_trip(db, trip)
+
+def _claim_and_create_trip(db: Session, trip: schemas.TripCreate):
+    # 1. Claim the vehicle with a compare-and-set: the UPDATE only matches while the
+    #    truck is still "Available" (and big enough), so two dispatchers can never both
+    #    win it. No lock is held beyond this transaction.
+    vehicle_claimed = db.query(models.Vehicle).filter(
+        models.Vehicle.id == trip.vehicleId,
+        models.Vehicle.status == "Available",
+        models.Vehicle.capacity_kg >= trip.cargoWeight
+    ).update({"status": "On Trip"}, synchronize_session=False)
+
+    if not vehicle_claimed:
+        db.rollback()
+        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == trip.vehicleId).first()
+        # VALIDATION RULE: Cargo Weight vs Max Capacity
+        if vehicle and vehicle.status == "Available" and trip.cargoWeight > vehicle.capacity_kg:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Too heavy! The selected {vehicle.type} has a maximum capacity of {vehicle.capacity_kg} kg."
+            )
         raise HTTPException(status_code=400, detail="Vehicle is invalid or not available.")
-    
-    if not driver or driver.status != "On Duty" or driver.expiry_date < date.today():
-        raise HTTPException(status_code=400, detail="Driver is invalid, off duty, or license is expired.")
 
-    # 2. VALIDATION RULE: Cargo Weight vs Max Capacity
-    if trip.cargoWeight > vehicle.capacity_kg:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Too heavy! The selected {vehicle.type} has a maximum capacity of {vehicle.capacity_kg} kg."
-        )
+    # 2. Claim the driver the same way (SAFETY LOCK RULE: On Duty with a valid license)
+    driver_claimed = db.query(models.Driver).filter(
+        models.Driver.id == trip.driverId,
+        models.Driver.status == "On Duty",
+        models.Driver.expiry_date >= date.today()
+    ).update({"status": "On Trip"}, synchronize_session=False)
+
+    if not driver_claimed:
+        db.rollback()  # releases the vehicle claimed above
+        raise HTTPException(status_code=400, detail="Driver is invalid, off duty, or license is expired.")
 
     # 3. Create the Trip
     new_trip = models.Trip(
@@ -63,13 +227,273 @@ def dispatch_trip(trip: schemas.TripCreate, db: Session = Depends(database.get_d
         status="Dispatched"
     )
     
-    # 4. Status Updates: Mark both Vehicle and Driver as "On Trip"
-    vehicle.status = "On Trip"
-    driver.status = "On Trip"
+    # 4. Both Vehicle and Driver are now "On Trip"; keep the fleet counters in step
+    counters.record_vehicle_status_change(db, "Available", "On Trip")
+    counters.record_trip_status_change(db, None, new_trip.status)
 
     # Save all changes to the database in one atomic transaction
     db.add(new_trip)
     db.commit()
     db.refresh(new_trip)
+    availability.index.remove_vehicles([trip.vehicleId])
+    availability.index.remove_drivers([trip.driverId])
+    cache.versions.bump("trips", "vehicles", "drivers")
+    events.publish("trip.dispatched", schemas.TripResponse.model_validate(new_trip).model_dump())
     
-    return new_trip
\ No newline at end of file
+    return new_trip
+
+@router.put("/{trip_id}/complete", response_model=schemas.TripResponse)
+async def complete_trip(trip_id: int, closing: Optional[schemas.TripClose] = None, db=Depends(database.get_session)):
+    """Close an active trip as delivered: the vehicle and driver become available again.
+
+    The optional body advances the vehicle's odometer by the distance driven and,
+    with a fuel cost, records the trip's expense log in the same transaction.
+    """
+    return await _close_trip(db, trip_id, "Completed", closing)
+
+@router.put("/{trip_id}/cancel", response_model=schemas.TripResponse)
+async def cancel_trip(trip_id: int, closing: Optional[schemas.TripClose] = None, db=Depends(database.get_session)):
+    """Close an active trip as cancelled: the vehicle and driver become available again."""
+    return await _close_trip(db, trip_id, "Cancelled", closing)
+
+@router.post("/close/batch", response_model=schemas.BatchCloseResponse)
+async def close_trips(batch: schemas.BatchCloseRequest, db=Depends(database.get_session)):
+    """Complete or cancel many trips in one transaction (e.g. at the end of a shift).
+
+    Trips that are unknown, already closed or listed twice are returned in
+    "rejected" with the reason; the others are all closed together.
+    """
+    return await _close_batch(db, batch)
+
+async def _close_trip(db, trip_id: int, outcome: str, closing: Optional[schemas.TripClose] = None):
+    item = schemas.TripCloseItem(tripId=trip_id, outcome=outcome, **(closing.model_dump() if closing else {}))
+    closed, rejected, expenses = await _with_dispatch_retry(partial(database.run, db), _close_and_commit, [item])
+    if rejected:
+        reason = rejected[0]["reason"]
+        raise HTTPException(status_code=404 if reason == "Trip not found" else 400, detail=reason)
+    return await database.run(db, _after_close_trip, trip_id, outcome, closed, expenses)
+
+def _after_close_trip(db: Session, trip_id: int, outcome: str, closed, expenses):
+    trip = db.get(models.Trip, trip_id)
+    vehicle = db.get(models.Vehicle, trip.vehicle_id)
+    driver = db.get(models.Driver, trip.driver_id)
+    if vehicle:
+        availability.index.vehicle_changed(vehicle)
+    if driver:
+        availability.index.driver_changed(driver)
+    _after_close(expenses)
+    events.publish("trip.completed" if outcome == "Completed" else "trip.cancelled", closed[0])
+    return trip
+
+async def _close_batch(db, batch: schemas.BatchCloseRequest):
+    closed, rejected, expenses = await _with_dispatch_retry(partial(database.run, db), _close_and_commit, batch.trips)
+    if closed:
+        availability.index.invalidate()
+        _after_close(expenses)
+        events.publish("trips.closed", {"trips": closed})
+    return {"trips": closed, "rejected": rejected}
+
+def _close_and_commit(db: Session, items: List[schemas.TripCloseItem]):
+    result = _close_trips(db, items)
+    if result[0]:
+        db.commit()
+    else:
+        db.rollback()
+    return result
+
+def _after_close(expenses):
+    cache.versions.bump("trips", "vehicles", "drivers", *(("expense_logs",) if expenses else ()))
+    for entry in expenses:
+        fuel.matrix.expense_logged(*entry)
+
+def _close_trips(db: Session, items: List[schemas.TripCloseItem]):
+    """Close the trips in `items` with set-based updates; the caller commits.
+
+    Returns (closed trips as TripResponse dicts, rejected {index, reason},
+    fuel.matrix.expense_logged arguments for the expense logs written).
+    """
+    t = models.Trip
+    trips = {}
+    for chunk in _chunks(list({item.tripId for item in items})):
+        for row in db.query(t.id, t.vehicle_id, t.driver_id, t.cargo_weight, t.origin, t.destination,
+                            t.status).filter(t.id.in_(chunk)):
+            trips[row.id] = row
+    accepted, rejected, seen = [], [], set()
+    for index, item in enumerate(items):
+        trip = trips.get(item.tripId)
+        if trip is None:
+            reason = "Trip not found"
+        elif item.tripId in seen:
+            reason = "Trip is listed more than once"
+        elif trip.status not in queries.ACTIVE_TRIP_STATUSES:
+            reason = f"Trip is already {trip.status}."
+        else:
+            seen.add(item.tripId)
+            accepted.append((item, trip))
+            continue
+        rejected.append({"index": index, "reason": reason})
+    if not accepted:
+        return [], rejected, []
+
+    # 1. Compare-and-set per (current status, outcome), so a trip can only be closed once
+    #    even by concurrent requests; a lost race rolls the whole batch back and retries
+    closed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    groups = defaultdict(list)
+    for item, trip in accepted:
+        groups[(trip.status, item.outcome)].append(trip.id)
+    for (old_status, outcome), trip_ids in groups.items():
+        for chunk in _chunks(trip_ids):
+            closed = db.query(t).filter(t.id.in_(chunk), t.status == old_status).update(
+                {"status": outcome, "closed_at": closed_at}, synchronize_session=False
+            )
+            if closed != len(chunk):
+                raise _ClaimLost()
+        counters.record_trip_status_change(db, old_status, outcome, count=len(trip_ids))
+
+    # 2. Release the vehicles and drivers, unless something else has taken them off the road meanwhile
+    released = 0
+    for chunk in _chunks(list({trip.vehicle_id for _, trip in accepted})):
+        released += db.query(models.Vehicle).filter(
+            models.Vehicle.id.in_(chunk), models.Vehicle.status == "On Trip"
+        ).update({"status": "Available"}, synchronize_session=False)
+    for chunk in _chunks(list({trip.driver_id for _, trip in accepted})):
+        db.query(models.Driver).filter(
+            models.Driver.id.in_(chunk), models.Driver.status == "On Trip"
+        ).update({"status": "On Duty"}, synchronize_session=False)
+    counters.record_vehicle_status_change(db, "On Trip", "Available", count=released)
+    scoring.record_trip_outcomes(db, [(trip.driver_id, item.outcome) for item, trip in accepted])
+
+    # 3. Advance the odometers by the distance driven, one row per vehicle
+    distances = defaultdict(int)
+    for item, trip in accepted:
+        if item.distance:
+            distances[trip.vehicle_id] += item.distance
+    if distances:
+        v = models.Vehicle.__table__.c
+        db.execute(
+            update(models.Vehicle.__table__).where(v.id == bindparam("b_id"))
+            .values(odometer=v.odometer + bindparam("b_km")),
+            [{"b_id": vehicle_id, "b_km": km} for vehicle_id, km in distances.items()],
+        )
+
+    # 4. Expense logs for the trips closed with a fuel cost, and their rollups
+    logged = [(item, trip) for item, trip in accepted if item.fuelCost is not None]
+    expenses = []
+    if logged:
+        trip_ids = [trip.id for _, trip in logged]
+        with_expenses, with_samples, names, types = set(), set(), {}, {}
+        for chunk in _chunks(trip_ids):
+            for trip_id, sampled in db.query(models.ExpenseLog.trip_id, func.max(fuel.SAMPLE_ROWS)).filter(
+                    models.ExpenseLog.trip_id.in_(chunk)).group_by(models.ExpenseLog.trip_id):
+                with_expenses.add(trip_id)
+                if sampled:
+                    with_samples.add(trip_id)
+        for chunk in _chunks(list({trip.driver_id for _, trip in logged})):
+            names.update(db.query(models.Driver.id, models.Driver.name).filter(models.Driver.id.in_(chunk)))
+        for chunk in _chunks(list({trip.vehicle_id for _, trip in logged})):
+            types.update(db.query(models.Vehicle.id, models.Vehicle.type).filter(models.Vehicle.id.in_(chunk)))
+        today = date.today()
+        rows = [{"trip_id": trip.id, "driver_name": item.driverName or names.get(trip.driver_id) or "Unknown",
+                 "distance_km": item.distance, "fuel_cost": item.fuelCost, "misc_expense": item.miscExpense,
+                 "status": "Done", "date": item.date or today} for item, trip in logged]
+        db.execute(insert(models.ExpenseLog), rows)
+        rollups.record_expenses(db, [
+            (trip.vehicle_id, row["date"], item.fuelCost, item.miscExpense, row["distance_km"],
+             trip.id not in with_expenses) for (item, trip), row in zip(logged, rows)
+        ])
+        expenses = [(trip.origin, trip.destination, types.get(trip.vehicle_id), row["distance_km"], item.fuelCost,
+                     trip.id not in with_samples) for (item, trip), row in zip(logged, rows)]
+
+    closed = [{"id": trip.id, "vehicle_id": trip.vehicle_id, "driver_id": trip.driver_id,
+               "cargo_weight": trip.cargo_weight, "origin": trip.origin, "destination": trip.destination,
+               "status": item.outcome} for item, trip in accepted]
+    return closed, rejected, expenses
+
+@router.post("/dispatch/batch", response_model=schemas.BatchDispatchResponse, status_code=status.HTTP_201_CREATED)
+async def dispatch_batch(batch: schemas.BatchDispatchRequest, db=Depends(database.get_session)):
+    """Assign many cargo loads to available vehicles and drivers in one transaction.
+
+    Each load gets the smallest available vehicle that can carry it; loads that
+    cannot be placed are returned in "unassigned" with the reason.
+    """
+    return await _dispatch_batch(db, batch)
+
+async def _dispatch_batch(db, batch: schemas.BatchDispatchRequest):
+    return await _with_dispatch_retry(partial(database.run, db), _assign_and_create_trips, batch)
+
+def _assign_and_create_trips(db: Session, batch: schemas.BatchDispatchRequest):
+    # 1. Load the candidates once: available vehicles and eligible drivers
+    vehicles = db.query(models.Vehicle.id, models.Vehicle.capacity_kg, models.Vehicle.type).filter(
+        models.Vehicle.status == "Available"
+    ).all()
+    vehicle_types = {vehicle_id: vehicle_type for vehicle_id, _, vehicle_type in vehicles}
+    driver_ids = [driver_id for (driver_id,) in db.query(models.Driver.id).filter(
+        models.Driver.status == "On Duty",
+        models.Driver.expiry_date >= date.today()
+    ).order_by(models.Driver.id).all()]
+
+    # 2. Best-fit assignment in memory
+    assigned, unassigned = assignment.best_fit_assign(
+        [cargo.cargoWeight for cargo in batch.requests], [(v.id, v.capacity_kg) for v in vehicles], driver_ids
+    )
+
+    # Fuel estimates for the assigned vehicles where none was given, before anything is claimed
+    missing = [a for a in assigned if batch.requests[a.request_index].estimatedFuelCost is None]
+    estimates = dict(zip((a.request_index for a in missing), fuel.matrix.estimate_many(db, [
+        (batch.requests[a.request_index].origin, batch.requests[a.request_index].destination,
+         vehicle_types.get(a.vehicle_id)) for a in missing
+    ])))
+
+    # 3. Claim everything with set-based compare-and-set updates; if another
+    #    dispatcher got in first the counts won't match and the batch is retried
+    for chunk in _chunks([a.vehicle_id for a in assigned]):
+        claimed = db.query(models.Vehicle).filter(
+            models.Vehicle.id.in_(chunk), models.Vehicle.status == "Available"
+        ).update({"status": "On Trip"}, synchronize_session=False)
+        if claimed != len(chunk):
+            raise _ClaimLost()
+    for chunk in _chunks([a.driver_id for a in assigned]):
+        claimed = db.query(models.Driver).filter(
+            models.Driver.id.in_(chunk),
+            models.Driver.status == "On Duty",
+            models.Driver.expiry_date >= date.today()
+        ).update({"status": "On Trip"}, synchronize_session=False)
+        if claimed != len(chunk):
+            raise _ClaimLost()
+
+    # 4. Create the trips
+    new_trips = []
+    for a in assigned:
+        cargo = batch.requests[a.request_index]
+        estimate = estimates.get(a.request_index)
+        new_trips.append(models.Trip(
+            vehicle_id=a.vehicle_id,
+            driver_id=a.driver_id,
+            cargo_weight=cargo.cargoWeight,
+            origin=cargo.origin,
+            destination=cargo.destination,
+            estimated_fuel_cost=cargo.estimatedFuelCost if estimate is None else estimate.fuel_cost,
+            status="Dispatched"
+        ))
+    db.add_all(new_trips)
+    counters.record_vehicle_status_change(db, "Available", "On Trip", count=len(new_trips))
+    counters.record_trip_status_change(db, None, "Dispatched", count=len(new_trips))
+    db.flush()
+
+    # Build the response before commit expires the rows (avoids a refresh per trip)
+    result = {
+        "trips": [schemas.TripResponse.model_validate(t) for t in new_trips],
+        "unassigned": [{"index": u.request_index, "reason": u.reason} for u in unassigned]
+    }
+    db.commit()
+    availability.index.remove_vehicles([a.vehicle_id for a in assigned])
+    availability.index.remove_drivers([a.driver_id for a in assigned])
+    cache.versions.bump("trips", "vehicles", "drivers")
+    if result["trips"]:
+        # One event for the whole batch; vehicles/drivers on a trip are implied by it
+        events.publish("trips.dispatched", {"trips": [t.model_dump() for t in result["trips"]]})
+    return result
+
+def _chunks(ids: List[int], size: int = CLAIM_CHUNK_SIZE):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
@@ -1,20 +1,44 @@
 # app/routers/vehicles.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response, File, UploadFile
 from sqlalchemy.orm import Session
-from .. import models, schemas, database
-from typing import List
+from .. import models, schemas, database, counters, pagination, availability, cache, events, bulk, fastjson
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/vehicles",
     tags=["Vehicle Registry"]
 )
 
+# Columns for the fast list path (app/fastjson.py)
+VEHICLE_ROWS = fastjson.RowShape(schemas.VehicleResponse, models.Vehicle)
+
 @router.get("/", response_model=List[schemas.VehicleResponse])
-def get_vehicles(db: Session = Depends(database.get_db)):
-    return db.query(models.Vehicle).all()
+async def get_vehicles(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    accept: Optional[str] = Header(None),
+    db=Depends(database.get_session),
+):
+    if pagination.wants_ndjson(accept):
+        if fastjson.ENABLED:
+            return pagination.stream_ndjson_rows(VEHICLE_ROWS, after)
+        return pagination.stream_ndjson(
+            lambda session: session.query(models.Vehicle), models.Vehicle.id, schemas.VehicleResponse, after
+        )
+    if fastjson.ENABLED:
+        return await database.run(db, pagination.keyset_json, VEHICLE_ROWS, limit, after)
+    return await database.run(
+        db, lambda session: pagination.keyset_page(
+            session.query(models.Vehicle), models.Vehicle.id, limit, after, response
+        )
+    )
 
 @router.post("/", response_model=schemas.VehicleResponse, status_code=status.HTTP_201_CREATED)
-def create_vehicle(vehicle: schemas.VehicleCreate, db: Session = Depends(database.get_db)):
+async def create_vehicle(vehicle: schemas.VehicleCreate, db=Depends(database.get_session)):
+    return await database.run(db, _create_vehicle, vehicle)
+
+def _create_vehicle(db: Session, vehicle: schemas.VehicleCreate):
     # Convert tons from frontend to kg for strict math validation later
     capacity_in_kg = vehicle.maxPayload * 1000 
     
@@ -27,16 +51,45 @@ def create_vehicle(vehicle: schemas.VehicleCreate, db: Session = Depends(databas
         status="Available"
     )
     db.add(new_vehicle)
+    counters.record_vehicle_added(db, new_vehicle.status)
     db.commit()
     db.refresh(new_vehicle)
+    availability.index.vehicle_changed(new_vehicle)
+    cache.versions.bump("vehicles")
+    events.publish("vehicle.created", schemas.VehicleResponse.model_validate(new_vehicle).model_dump())
     return new_vehicle
 
 @router.put("/{vehicle_id}/retire")
-def retire_vehicle(vehicle_id: int, db: Session = Depends(database.get_db)):
+async def retire_vehicle(vehicle_id: int, db=Depends(database.get_session)):
+    return await database.run(db, _retire_vehicle, vehicle_id)
+
+def _retire_vehicle(db: Session, vehicle_id: int):
     vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
+    counters.record_vehicle_status_change(db, vehicle.status, "Out of Service")
     vehicle.status = "Out of Service"
     db.commit()
-    return {"message": "Vehicle marked as Out of Service"}
\ No newline at end of file
+    availability.index.remove_vehicles([vehicle_id])
+    cache.versions.bump("vehicles")
+    events.publish("vehicle.status", {"id": vehicle_id, "status": "Out of Service"})
+    return {"message": "Vehicle marked as Out of Service"}
+
+@router.post("/bulk", response_model=schemas.ImportReport)
+async def bulk_create_vehicles(batch: schemas.BulkImportRequest, db=Depends(database.get_session)):
+    """Create many vehicles in chunked, set-based inserts; invalid rows are reported, not fatal."""
+    return await database.run(db, _import_vehicles, bulk.json_rows(batch.rows))
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_vehicles_csv(file: UploadFile = File(...), db=Depends(database.get_session)):
+    """Same as /bulk for an uploaded CSV whose header uses the JSON field names."""
+    return await database.run(db, _import_vehicles, bulk.csv_rows(file.file))
+
+def _import_vehicles(db: Session, rows):
+    report = bulk.import_rows(db, "vehicles", rows)
+    if report["inserted"]:
+        availability.index.invalidate()
+        cache.versions.bump("vehicles")
+        events.publish("vehicles.imported", {"count": report["inserted"]})
+    return report
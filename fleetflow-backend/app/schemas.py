@@ -1,7 +1,8 @@
 # app/schemas.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+import datetime
 from datetime import date
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Literal
 
 # --- USER SCHEMAS ---
 class UserCreate(BaseModel):
@@ -16,6 +17,20 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LoginResponse(BaseModel):
+    message: str
+    user: Dict[str, Any]
+    access_token: str
+    refresh_token: str
+    token_type: str
+    expires_in: int # Seconds until the access token expires
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None # Revoked along with the access token when given
+
 # --- VEHICLE SCHEMAS ---
 class VehicleCreate(BaseModel):
     licensePlate: str
@@ -53,6 +68,23 @@ class DriverResponse(BaseModel):
     safety_score: float
     complaints: int
     status: str
+    score: float
+    class Config:
+        from_attributes = True
+
+class IncidentCreate(BaseModel):
+    kind: str # complaint, violation or accident
+    tripId: Optional[int] = None
+    note: Optional[str] = None
+
+class IncidentResponse(BaseModel):
+    id: int
+    driver_id: int
+    trip_id: Optional[int] = None
+    kind: str
+    points: float
+    note: Optional[str] = None
+    created_at: datetime.datetime
     class Config:
         from_attributes = True
 
@@ -63,7 +95,7 @@ class TripCreate(BaseModel):
     cargoWeight: int
     origin: str
     destination: str
-    estimatedFuelCost: float
+    estimatedFuelCost: Optional[float] = None # Estimated from the route's expense history (app/fuel.py) if left out
 
 class TripResponse(BaseModel):
     id: int
@@ -76,6 +108,79 @@ class TripResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CargoRequest(BaseModel):
+    cargoWeight: int
+    origin: str
+    destination: str
+    estimatedFuelCost: Optional[float] = None # Estimated for the assigned vehicle if left out
+
+class FuelEstimateRequest(BaseModel):
+    origin: str
+    destination: str
+    vehicleType: Optional[str] = None
+    vehicleId: Optional[int] = None # Takes the type from this vehicle instead
+
+class FuelEstimateResponse(BaseModel):
+    origin: str
+    destination: str
+    vehicle_type: Optional[str] = None
+    distance_km: float # Mean distance of past trips on the route
+    cost_per_km: float
+    estimated_fuel_cost: float
+    samples: int # Past trips behind distance_km
+    basis: str # route, vehicle type or fleet: which history cost_per_km came from
+
+class BulkFuelEstimateRequest(BaseModel):
+    items: List[FuelEstimateRequest] = Field(max_length=10000)
+
+class BulkFuelEstimateResponse(BaseModel):
+    estimates: List[Optional[FuelEstimateResponse]] # In request order; null without route history
+
+class ReestimateResponse(BaseModel):
+    open_trips: int
+    updated: int # Estimates that changed
+    unestimated: int # Open trips on routes without history, left as they were
+
+class BatchDispatchRequest(BaseModel):
+    requests: List[CargoRequest]
+
+class UnassignedCargo(BaseModel):
+    index: int
+    reason: str
+
+class BatchDispatchResponse(BaseModel):
+    trips: List[TripResponse]
+    unassigned: List[UnassignedCargo]
+
+class TripClose(BaseModel):
+    distance: Optional[int] = Field(None, ge=0) # km driven, added to the vehicle's odometer
+    fuelCost: Optional[float] = None # Also records an expense log for the trip when given
+    miscExpense: float = 0.0
+    driverName: Optional[str] = None # For the expense log; defaults to the trip's driver
+    date: Optional[datetime.date] = None # Of the expense log; defaults to today
+
+    @model_validator(mode="after")
+    def _expense_needs_distance(self):
+        # Like ExpenseCreate: an expense log always says how far the trip went
+        if self.fuelCost is not None and self.distance is None:
+            raise ValueError("distance is required when fuelCost is given")
+        return self
+
+class TripCloseItem(TripClose):
+    tripId: int
+    outcome: Literal["Completed", "Cancelled"] = "Completed"
+
+class BatchCloseRequest(BaseModel):
+    trips: List[TripCloseItem] = Field(max_length=10000)
+
+class RejectedTrip(BaseModel):
+    index: int # Position in "trips"
+    reason: str
+
+class BatchCloseResponse(BaseModel):
+    trips: List[TripResponse]
+    rejected: List[RejectedTrip]
+
 class AvailableResourcesResponse(BaseModel):
     vehicles: List[VehicleResponse]
     drivers: List[DriverResponse]
@@ -106,6 +211,7 @@ class ExpenseCreate(BaseModel):
     fuelCost: float
     miscExpense: float
     driverName: Optional[str] = None
+    date: Optional[datetime.date] = None # Defaults to today
 
 class ExpenseResponse(BaseModel):
     id: int
@@ -115,9 +221,40 @@ class ExpenseResponse(BaseModel):
     fuel_cost: float
     misc_expense: float
     status: str
+    date: Optional[datetime.date] = None
     class Config:
         from_attributes = True
 
+# --- BULK IMPORT SCHEMAS ---
+class BulkImportRequest(BaseModel):
+    rows: List[Dict[str, Any]] # Same fields as the single-row create schema
+
+class ImportRowError(BaseModel):
+    row: int # Index in "rows", or the line number in an uploaded CSV
+    error: str
+
+class ImportReport(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError] # The first bulk.MAX_REPORTED_ERRORS failures
+
+# --- TELEMETRY SCHEMAS ---
+class TelemetryPingIn(BaseModel):
+    vehicleId: int
+    recordedAt: Optional[datetime.datetime] = None # Defaults to the time it was received (UTC)
+    odometer: Optional[int] = None
+    fuelLevel: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+class TelemetryBatch(BaseModel):
+    pings: List[TelemetryPingIn] = Field(max_length=5000)
+
+class TelemetryAccepted(BaseModel):
+    accepted: int
+    buffered: int
+
 # --- NEW SCHEMAS FOR CHAPTER 6 ---
 class DashboardStatsResponse(BaseModel):
     activeFleet: int
@@ -135,4 +272,16 @@ class AnalyticsResponse(BaseModel):
     kpis: Dict[str, str]
     fuelEfficiencyTrend: List[Dict[str, Any]]
     costliestVehicles: List[Dict[str, Any]]
-    financialSummary: List[Dict[str, Any]]
\ No newline at end of file
+    financialSummary: List[Dict[str, Any]]
+
+class SearchHit(BaseModel):
+    kind: str # vehicle, driver or trip
+    id: int
+    title: str # plate, driver name or "origin → destination"
+    detail: Optional[str] = None
+    status: str
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    next_offset: Optional[int] = None # pass as ?offset= for the next page
@@ -0,0 +1,219 @@
+# app/scoring.py
+# Driver performance scores, kept up to date from trip outcomes and incidents.
+#
+# Every driver row carries running aggregates: trips_completed, trips_cancelled,
+# incident_points and complaints. Closing a trip or recording an incident adds
+# to them with one "UPDATE drivers SET x = x + :delta, ..." in the caller's
+# transaction (the same way app/counters.py keeps the fleet KPIs). The same
+# statement recomputes the derived columns from the new aggregates, so the
+# trip history is never re-read:
+#
+#   completion_rate = 100 * (completed + PRIOR_TRIPS) / (closed + PRIOR_TRIPS)
+#   safety_score    = max(0, 100 - 100 * incident_points / (closed + PRIOR_TRIPS))
+#   score           = COMPLETION_WEIGHT * completion_rate + (1 - COMPLETION_WEIGHT) * safety_score
+#
+# PRIOR_TRIPS counts as that many clean, completed trips every driver starts
+# with. A new driver therefore scores 100, and one bad trip does not sink a
+# short record. score is indexed, so lists can sort and filter on it.
+#
+# recompute() rebuilds every aggregate and score from the trips (archived
+# ones included) and driver_incidents tables in one pass, for backfills and
+# after a formula change. It uses NumPy (bincount over the whole trip table)
+# when available, and grouped queries otherwise:
+#     python -m app.scoring
+import math
+import os
+from collections import defaultdict
+from sqlalchemy import Integer, bindparam, case, func, update
+from sqlalchemy.orm import Session
+from . import archive, models
+
+try:
+    import numpy as np
+except ImportError:  # recompute() falls back to grouped queries
+    np = None
+
+PRIOR_TRIPS = float(os.getenv("FLEETFLOW_SCORE_PRIOR_TRIPS", "20"))
+COMPLETION_WEIGHT = float(os.getenv("FLEETFLOW_SCORE_COMPLETION_WEIGHT", "0.5"))
+# Safety points per incident kind; a complaint also counts towards Driver.complaints
+INCIDENT_POINTS = {"complaint": 1.0, "violation": 2.0, "accident": 5.0}
+RECOMPUTE_BATCH_SIZE = 100000
+
+_COMPLETED = models.TRIP_STATUSES.index("Completed") + 1
+_CANCELLED = models.TRIP_STATUSES.index("Cancelled") + 1
+
+
+def _round1(value):
+    # Half up, like SQL round() on these (never negative) values
+    return math.floor(value * 10 + 0.5) / 10
+
+
+def derive(completed, cancelled, points, maximum=max, round1=_round1):
+    """(completion_rate, safety_score, score) from the aggregates.
+
+    Written once for plain numbers, NumPy arrays and SQL expressions: pass the
+    matching elementwise `maximum(x, floor)` and `round1(x)`.
+    """
+    base = completed + cancelled + PRIOR_TRIPS
+    completion = 100.0 * (completed + PRIOR_TRIPS) / base
+    safety = maximum(100.0 - 100.0 * points / base, 0.0)
+    score = COMPLETION_WEIGHT * completion + (1 - COMPLETION_WEIGHT) * safety
+    return round1(completion), round1(safety), round1(score)
+
+
+def _sql_maximum(value, floor):
+    return case((value < floor, floor), else_=value)
+
+
+def _sql_round1(value):
+    return func.round(value * 10) / 10.0
+
+
+# --- incremental updates (call before the caller commits) ---
+def _apply(db: Session, deltas: dict):
+    """deltas: {driver_id: [completed, cancelled, incident points, complaints]} to add."""
+    if not deltas:
+        return
+    c = models.Driver.__table__.c
+    completed = c.trips_completed + bindparam("b_completed", type_=Integer)
+    cancelled = c.trips_cancelled + bindparam("b_cancelled", type_=Integer)
+    points = c.incident_points + bindparam("b_points")
+    completion, safety, score = derive(completed, cancelled, points, _sql_maximum, _sql_round1)
+    db.execute(
+        update(models.Driver.__table__).where(c.id == bindparam("b_id")).values(
+            trips_completed=completed, trips_cancelled=cancelled, incident_points=points,
+            complaints=func.coalesce(c.complaints, 0) + bindparam("b_complaints", type_=Integer),
+            completion_rate=completion, safety_score=safety, score=score,
+        ),
+        [{"b_id": driver_id, "b_completed": d[0], "b_cancelled": d[1], "b_points": float(d[2]),
+          "b_complaints": d[3]} for driver_id, d in deltas.items()],
+    )
+
+
+def record_trip_outcomes(db: Session, outcomes):
+    """Count closed trips: outcomes is an iterable of (driver_id, "Completed" | "Cancelled")."""
+    deltas = defaultdict(lambda: [0, 0, 0.0, 0])
+    for driver_id, status in outcomes:
+        if driver_id is not None:
+            deltas[driver_id][0 if status == "Completed" else 1] += 1
+    _apply(db, deltas)
+
+
+def record_incident(db: Session, incident: models.DriverIncident):
+    _apply(db, {incident.driver_id: [0, 0, incident.points, int(incident.kind == "complaint")]})
+
+
+# --- batch recompute ---
+def _fetch_arrays(db: Session, sql: str, dtype):
+    """Yield the result of `sql` as 2-D arrays of up to RECOMPUTE_BATCH_SIZE rows.
+
+    Read through a plain DBAPI cursor: its tuples convert to an array in bulk,
+    instead of building a SQLAlchemy Row per trip.
+    """
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(RECOMPUTE_BATCH_SIZE)
+            if not rows:
+                return
+            yield np.array(rows, dtype=dtype)
+    finally:
+        cursor.close()
+
+
+def _aggregate_numpy(db: Session, size: int):
+    completed = np.zeros(size, dtype=np.int64)
+    cancelled = np.zeros(size, dtype=np.int64)
+    for batch in _fetch_arrays(db, "SELECT driver_id, status FROM trips WHERE driver_id IS NOT NULL", np.int64):
+        batch = batch[batch[:, 0] < size]
+        ids, codes = batch[:, 0], batch[:, 1]
+        completed += np.bincount(ids[codes == _COMPLETED], minlength=size)
+        cancelled += np.bincount(ids[codes == _CANCELLED], minlength=size)
+    for segment in archive.arrays(db, "trips", ["driver_id", "status"]):
+        ids = np.frombuffer(segment["driver_id"], dtype=np.int64)
+        codes = np.frombuffer(segment["status"], dtype=np.int8)
+        keep = (ids >= 0) & (ids < size)
+        completed += np.bincount(ids[keep & (codes == _COMPLETED)], minlength=size)
+        cancelled += np.bincount(ids[keep & (codes == _CANCELLED)], minlength=size)
+
+    points = np.zeros(size)
+    complaints = np.zeros(size)
+    for batch in _fetch_arrays(db, "SELECT driver_id, points, CASE WHEN kind = 'complaint' THEN 1 ELSE 0 END "
+                                   "FROM driver_incidents", np.float64):
+        batch = batch[batch[:, 0] < size]
+        ids = batch[:, 0].astype(np.int64)
+        points += np.bincount(ids, weights=batch[:, 1], minlength=size)
+        complaints += np.bincount(ids, weights=batch[:, 2], minlength=size)
+
+    rates = derive(completed, cancelled, points, np.maximum, lambda x: np.floor(x * 10 + 0.5) / 10)
+    return [a.tolist() for a in (completed, cancelled, points, complaints.astype(np.int64), *rates)]
+
+
+def _aggregate_sql(db: Session, size: int):
+    columns = [[0] * size, [0] * size, [0.0] * size, [0] * size]
+    trips = (
+        db.query(models.Trip.driver_id, models.Trip.status, func.count(models.Trip.id))
+        .filter(models.Trip.status.in_(("Completed", "Cancelled")), models.Trip.driver_id < size)
+        .group_by(models.Trip.driver_id, models.Trip.status)
+    )
+    for driver_id, status, n in trips:
+        columns[0 if status == "Completed" else 1][driver_id] += n
+    for driver_id, status in archive.rows(db, "trips", ["driver_id", "status"], ordered=False):
+        if driver_id is not None and 0 <= driver_id < size and status in ("Completed", "Cancelled"):
+            columns[0 if status == "Completed" else 1][driver_id] += 1
+    incidents = (
+        db.query(models.DriverIncident.driver_id, func.sum(models.DriverIncident.points),
+                 func.sum(case((models.DriverIncident.kind == "complaint", 1), else_=0)))
+        .filter(models.DriverIncident.driver_id < size)
+        .group_by(models.DriverIncident.driver_id)
+    )
+    for driver_id, points, complaints in incidents:
+        columns[2][driver_id] = points
+        columns[3][driver_id] = complaints
+    rates = [derive(*values) for values in zip(*columns[:3])]
+    return columns + [list(column) for column in zip(*rates)]
+
+
+def recompute(db: Session) -> int:
+    """Rebuild every driver's aggregates and scores from the history. The caller commits.
+
+    Increments committed by other writers while this runs are overwritten, so
+    run it when no trips are being closed (SQLite in WAL mode refuses the write
+    instead if one was).
+    """
+    driver_ids = [driver_id for (driver_id,) in db.query(models.Driver.id)]
+    if not driver_ids:
+        return 0
+    size = max(driver_ids) + 1
+    aggregate = _aggregate_numpy if np is not None else _aggregate_sql
+    completed, cancelled, points, complaints, completion, safety, score = aggregate(db, size)
+
+    c = models.Driver.__table__.c
+    db.execute(
+        update(models.Driver.__table__).where(c.id == bindparam("b_id")).values(
+            trips_completed=bindparam("b_completed"), trips_cancelled=bindparam("b_cancelled"),
+            incident_points=bindparam("b_points"), complaints=bindparam("b_complaints"),
+            completion_rate=bindparam("b_completion"), safety_score=bindparam("b_safety"),
+            score=bindparam("b_score"),
+        ),
+        [{"b_id": i, "b_completed": completed[i], "b_cancelled": cancelled[i], "b_points": points[i],
+          "b_complaints": complaints[i], "b_completion": completion[i], "b_safety": safety[i],
+          "b_score": score[i]} for i in driver_ids],
+    )
+    return len(driver_ids)
+
+
+if __name__ == "__main__":
+    import time
+    from .database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        updated = recompute(db)
+        db.commit()
+    from . import cache
+    cache.versions.bump("drivers")
+    print(f"Recomputed {updated} driver scores in {time.perf_counter() - started:.2f}s "
+          f"({'NumPy' if np is not None else 'grouped queries'}).")
@@ -0,0 +1,339 @@
+# app/search.py
+# Full-text search over vehicles, drivers and trip routes (SQLite FTS5).
+#
+# Each searchable table has a contentless FTS5 table next to it. Triggers on
+# the source table keep it in sync: an insert indexes the row, a delete removes
+# it, and an update of an indexed column does both. So every write path (the
+# routers, the bulk importer, raw SQL) keeps the index current without knowing
+# about it. The FTS tables store only the index; hits are joined back to the
+# source rows by id.
+#
+#   vehicles_fts  plate, model, compact plate      trigram tokenizer
+#   drivers_fts   name, license, compact license   trigram tokenizer
+#   trips_fts     origin, destination              unicode61, prefix indexes
+#
+# Plates and licence numbers are searched by any part ("1234" finds
+# GJ-0001234), so those tables use the trigram tokenizer: every word of the
+# query of 3+ characters must appear somewhere in the row. The "compact"
+# columns hold the value without separators, so "gj0001" finds it too. Shorter
+# words filter the hits with LIKE, and a query with only short words scans the
+# (small) source table. Hits are ranked by bm25, the plate and name counting
+# most. bm25 costs a little per matching row, so only the newest RANK_WINDOW
+# matches are ranked; a broader query has to be narrowed to reach older rows.
+#
+# Trip routes are city names, so each query word is matched as a word prefix
+# ("ahm sur" finds Ahmedabad -> Surat). Most trips share a handful of cities
+# and would rank the same, so trips come newest first, which FTS5 reads
+# straight off the index without visiting every match. Prefixes of up to 3
+# characters have their own prefix index. A longer word is spelled out as the
+# whole words it can complete, looked up in trip_places (every origin and
+# destination seen, kept by the same triggers), because FTS5 would otherwise
+# merge the posting lists of every trip that matches it.
+#
+# The index is created by migration v4, with the source rows already in the
+# tables. Where FTS5 is missing (or on a server database) search falls back to
+# LIKE scans. To rebuild the index from the tables:
+#     python -m app.search
+import re
+import unicodedata
+from sqlalchemy import column, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+from . import models
+from .database import is_sqlite
+
+KINDS = ("vehicle", "driver", "trip")
+TRIGRAM = 3           # shortest query word the trigram index can match
+RANK_WINDOW = 1000    # newest matches of a vehicle/driver query that are ranked
+ROUTE_PREFIXES = 3    # longest prefix with its own index in trips_fts
+MAX_EXPANSION = 32    # whole words a long route prefix may be spelled out as
+
+
+def _compact(expr: str) -> str:
+    # The value without the usual separators, lower-cased
+    for separator in ("-", " ", ".", "/"):
+        expr = f"replace({expr}, '{separator}', '')"
+    return f"lower({expr})"
+
+
+class _Index:
+    """One searchable table: the FTS5 table, its columns and how to fill them from a source row."""
+
+    def __init__(self, kind, model, name, columns, tokenize, weights, source):
+        self.kind = kind
+        self.model = model
+        self.table = model.__tablename__
+        self.name = name
+        self.columns = columns        # FTS column -> SQL expression over the row "{r}"
+        self.tokenize = tokenize
+        self.weights = weights        # bm25 weight per FTS column
+        self.source = source          # model columns the LIKE paths search
+
+    def fts(self):
+        return table(self.name, column("rowid"))
+
+    def match(self, expression: str):
+        return text(f"{self.name} MATCH :match").bindparams(match=expression)
+
+    def values(self, row: str) -> str:
+        return ", ".join(expr.format(r=row) for expr in self.columns.values())
+
+    def index_row(self, row: str):
+        return [f"INSERT INTO {self.name}(rowid, {', '.join(self.columns)}) VALUES ({row}.id, {self.values(row)});"]
+
+    def unindex_row(self, row: str):
+        return [f"INSERT INTO {self.name}({self.name}, rowid, {', '.join(self.columns)}) "
+                f"VALUES ('delete', {row}.id, {self.values(row)});"]
+
+    def ddl(self):
+        insert, delete = " ".join(self.index_row("new")), " ".join(self.unindex_row("old"))
+        watched = ", ".join(c.name for c in self.source)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5({', '.join(self.columns)}, "
+            f"content='', {self.tokenize})",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ai AFTER INSERT ON {self.table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ad AFTER DELETE ON {self.table} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_au AFTER UPDATE OF {watched} ON {self.table} "
+            f"BEGIN {delete} {insert} END",
+        ]
+
+    def fill(self):
+        return [f"INSERT INTO {self.name}(rowid, {', '.join(self.columns)}) "
+                f"SELECT id, {self.values(self.table)} FROM {self.table}"]
+
+    def clear(self):
+        return [f"INSERT INTO {self.name}({self.name}) VALUES ('delete-all')"]
+
+    def drop(self):
+        return [f"DROP TRIGGER IF EXISTS {self.name}_{event}" for event in ("ai", "ad", "au")] + [
+            f"DROP TABLE IF EXISTS {self.name}"]
+
+
+class _RouteIndex(_Index):
+    """The trips index, plus trip_places: the distinct origins and destinations."""
+
+    def index_row(self, row: str):
+        return super().index_row(row) + [
+            f"INSERT OR IGNORE INTO trip_places(name) VALUES ({row}.origin), ({row}.destination);"]
+
+    def ddl(self):
+        return ["CREATE TABLE IF NOT EXISTS trip_places (name TEXT PRIMARY KEY) WITHOUT ROWID"] + super().ddl()
+
+    def fill(self):
+        return super().fill() + [
+            "INSERT OR IGNORE INTO trip_places(name) SELECT origin FROM trips UNION SELECT destination FROM trips"]
+
+    def clear(self):
+        # Places are never removed as trips go; a stale one only spells out a word that matches nothing
+        return super().clear() + ["DELETE FROM trip_places"]
+
+    def drop(self):
+        return super().drop() + ["DROP TABLE IF EXISTS trip_places"]
+
+
+VEHICLES = _Index(
+    "vehicle", models.Vehicle, "vehicles_fts",
+    {"plate": "{r}.plate", "model": "{r}.model", "compact": _compact("{r}.plate")},
+    "tokenize='trigram'", (10.0, 1.0, 10.0), (models.Vehicle.plate, models.Vehicle.model),
+)
+DRIVERS = _Index(
+    "driver", models.Driver, "drivers_fts",
+    {"name": "{r}.name", "license_number": "{r}.license_number", "compact": _compact("{r}.license_number")},
+    "tokenize='trigram'", (10.0, 5.0, 5.0), (models.Driver.name, models.Driver.license_number),
+)
+TRIPS = _RouteIndex(
+    "trip", models.Trip, "trips_fts",
+    {"origin": "{r}.origin", "destination": "{r}.destination"},
+    f"tokenize='unicode61 remove_diacritics 2', prefix='{' '.join(str(n) for n in range(1, ROUTE_PREFIXES + 1))}'",
+    (1.0, 1.0), (models.Trip.origin, models.Trip.destination),
+)
+INDEXES = {index.kind: index for index in (VEHICLES, DRIVERS, TRIPS)}
+
+
+# --- maintenance ---
+def install(conn) -> bool:
+    """Create the FTS tables and triggers, filling tables that are new. False if SQLite lacks FTS5."""
+    for index in INDEXES.values():
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index.name,)
+        ).scalar()
+        try:
+            for statement in index.ddl():
+                conn.exec_driver_sql(statement)
+        except Exception as exc:
+            if "fts5" in str(exc):
+                return False  # built without FTS5: search uses the LIKE fallback
+            raise
+        if not exists:
+            for statement in index.fill():
+                conn.exec_driver_sql(statement)
+    return True
+
+
+def drop(conn):
+    """Remove the index and its triggers.
+
+    Each row written by its own statement pays for a trigger that flushes to
+    the FTS tables (tens of microseconds); a bulk load of millions of rows is
+    faster without the index, installing it once afterwards.
+    """
+    for index in INDEXES.values():
+        for statement in index.drop():
+            conn.exec_driver_sql(statement)
+
+
+def rebuild(conn):
+    """Re-index every source row from scratch."""
+    install(conn)
+    for index in INDEXES.values():
+        for statement in index.clear() + index.fill():
+            conn.exec_driver_sql(statement)
+
+
+_available = {}
+
+
+def available(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.url not in _available:
+        _available[bind.url] = is_sqlite(bind.url) and db.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN "
+                 "('vehicles_fts', 'drivers_fts', 'trips_fts')")
+        ).scalar() == len(INDEXES)
+    return _available[bind.url]
+
+
+# --- queries ---
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _route_words(value: str):
+    # Roughly how unicode61 with remove_diacritics splits text: lower-cased runs of letters and digits
+    value = unicodedata.normalize("NFKD", value.lower())
+    return re.findall(r"[^\W_]+", "".join(ch for ch in value if not unicodedata.combining(ch)))
+
+
+def _hit_columns(index: _Index):
+    """(id, title, detail, status) for a hit."""
+    m = index.model
+    if index is VEHICLES:
+        return m.id, m.plate, m.model, m.status
+    if index is DRIVERS:
+        return m.id, m.name, m.license_number, m.status
+    return m.id, m.origin, m.destination, m.status
+
+
+def _like_query(index: _Index, words, sqlite: bool):
+    """Every word somewhere in the row; newest first. The fallback, and the path for short words."""
+    statement = select(*_hit_columns(index))
+    for word in words:
+        pattern = f"%{_escape_like(word)}%"
+        # SQLite's LIKE already ignores ASCII case; ilike() would add lower() on every row
+        statement = statement.where(or_(*(
+            c.like(pattern, escape="\\") if sqlite else c.ilike(pattern, escape="\\") for c in index.source
+        )))
+    return statement.order_by(index.model.id.desc())
+
+
+def _trigram_query(index: _Index, words):
+    long_words = [w for w in words if len(w) >= TRIGRAM]
+    if not long_words:
+        return _like_query(index, words, sqlite=True)
+    terms = []
+    for word in long_words:
+        compact = re.sub(r"[\W_]+", "", word)
+        if compact != word and len(compact) >= TRIGRAM:
+            terms.append(f"({_quote(word)} OR {_quote(compact)})")
+        else:
+            terms.append(_quote(word))
+
+    fts, weights = index.fts(), ", ".join(str(w) for w in index.weights)
+    candidates = (
+        select(fts.c.rowid.label("id"), literal_column(f"bm25({index.name}, {weights})").label("rank"))
+        .where(index.match(" AND ".join(terms)))
+        .order_by(fts.c.rowid.desc())
+        .limit(RANK_WINDOW)
+        .subquery()
+    )
+    return (
+        _like_query(index, [w for w in words if len(w) < TRIGRAM], sqlite=True)
+        .join(candidates, candidates.c.id == index.model.id)
+        .order_by(None)
+        .order_by(candidates.c.rank, index.model.id.desc())
+    )
+
+
+def _route_term(db: Session, word: str) -> str:
+    if len(word) > ROUTE_PREFIXES:
+        names = db.execute(
+            text("SELECT name FROM trip_places WHERE name LIKE :pattern ESCAPE '\\'")
+            .bindparams(pattern=f"%{_escape_like(word)}%")
+        ).scalars()
+        completions = {w for name in names for w in _route_words(name) if w.startswith(word)}
+        if len(completions) == 1:
+            return _quote(completions.pop())
+        if 1 < len(completions) <= MAX_EXPANSION:
+            return "(" + " OR ".join(_quote(w) for w in sorted(completions)) + ")"
+    return _quote(word) + "*"
+
+
+def _route_query(db: Session, index: _Index, words):
+    fts = index.fts()
+    return (
+        select(*_hit_columns(index))
+        .select_from(fts)
+        .join(index.model, index.model.id == fts.c.rowid)
+        .where(index.match(" AND ".join(_route_term(db, w) for w in words)))
+        # rowid order is the FTS table's own; ordering by the joined id would sort every match
+        .order_by(fts.c.rowid.desc())
+    )
+
+
+def _hit(kind: str, row) -> dict:
+    id_, title, detail, status = row
+    if kind == "trip":
+        title, detail = f"{title} → {detail}", f"Trip #{id_}"
+    return {"kind": kind, "id": id_, "title": title, "detail": detail, "status": status}
+
+
+def search(db: Session, q: str, kinds=KINDS, limit: int = 10, offset: int = 0) -> dict:
+    """Up to `limit` hits of each kind, skipping the first `offset` of each.
+
+    next_offset is set when some kind may have more hits.
+    """
+    words = q.lower().split()
+    results, more = [], False
+    if words:
+        fts = available(db)
+        for kind in kinds:
+            index = INDEXES[kind]
+            if not fts:
+                statement = _like_query(index, words, is_sqlite(db.get_bind().url))
+            elif index is TRIPS:
+                route_words = _route_words(q)
+                if not route_words:
+                    continue
+                statement = _route_query(db, index, route_words)
+            else:
+                statement = _trigram_query(index, words)
+            rows = db.execute(statement.limit(limit).offset(offset)).all()
+            more = more or len(rows) == limit
+            results.extend(_hit(kind, row) for row in rows)
+    return {"query": q, "results": results, "next_offset": offset + limit if more else None}
+
+
+if __name__ == "__main__":
+    import time
+    from .database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    if not is_sqlite(engine.url):
+        raise SystemExit("The search index is SQLite FTS5; other databases use the LIKE fallback.")
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rebuild(conn)
+    print(f"Rebuilt the search index in {time.perf_counter() - started:.2f}s.")
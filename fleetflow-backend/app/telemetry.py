@@ -0,0 +1,169 @@
+# app/telemetry.py
+# Write-behind buffer for vehicle telemetry (odometer / fuel / location pings).
+#
+# POST /telemetry/pings only appends the batch to an in-process buffer and
+# returns 202. A background task flushes the buffer every
+# FLEETFLOW_TELEMETRY_FLUSH_INTERVAL_S seconds, or as soon as FLUSH_BATCH pings
+# are waiting, in one transaction per FLUSH_BATCH pings:
+#   1. one executemany INSERT into the append-only telemetry_pings table;
+#   2. one executemany UPDATE moving each vehicle's odometer to its latest
+#      reading in the batch (never backwards, so late pings cannot rewind it).
+# After the commit the "vehicles" cache version is bumped and the odometers
+# are carried into the availability index, as the routers do after a write.
+#
+# The buffer holds at most FLEETFLOW_TELEMETRY_MAX_BUFFERED pings, counting
+# the batch being written. When a new batch does not fit, it is refused and
+# the endpoint answers 429 with Retry-After. Memory stays bounded, and senders
+# slow down to the speed the database can absorb.
+#
+# The buffer is per process and lives in memory: pings accepted but not yet
+# flushed are lost if the process is killed (a clean shutdown flushes them).
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from . import availability, cache, models
+from .database import SessionLocal
+
+MAX_BUFFERED = int(os.getenv("FLEETFLOW_TELEMETRY_MAX_BUFFERED", "200000"))
+FLUSH_BATCH = int(os.getenv("FLEETFLOW_TELEMETRY_FLUSH_BATCH", "10000"))
+FLUSH_INTERVAL_S = float(os.getenv("FLEETFLOW_TELEMETRY_FLUSH_INTERVAL_S", "0.5"))
+RETRY_AFTER_S = 1
+
+# Order of the fields in a buffered ping tuple
+PING_FIELDS = ("vehicle_id", "recorded_at", "odometer", "fuel_level", "latitude", "longitude")
+
+
+def write_pings(db: Session, pings):
+    """Insert `pings` and advance the odometers, in the caller's transaction.
+
+    Pings for unknown vehicles are skipped. Returns (number of pings written,
+    {vehicle id: latest odometer reading in the batch}).
+    """
+    vehicle_ids = {p[0] for p in pings}
+    known = {v for (v,) in db.query(models.Vehicle.id).filter(models.Vehicle.id.in_(vehicle_ids))}
+    rows = [dict(zip(PING_FIELDS, p)) for p in pings if p[0] in known]
+    if not rows:
+        return 0, {}
+    db.execute(insert(models.TelemetryPing), rows)
+
+    # Latest odometer reading per vehicle in this batch
+    latest = {}
+    for row in rows:
+        if row["odometer"] is None:
+            continue
+        current = latest.get(row["vehicle_id"])
+        if current is None or row["recorded_at"] >= current[0]:
+            latest[row["vehicle_id"]] = (row["recorded_at"], row["odometer"])
+    if latest:
+        vehicles = models.Vehicle.__table__
+        db.execute(
+            update(vehicles)
+            .where(vehicles.c.id == bindparam("b_id"),
+                   or_(vehicles.c.odometer.is_(None), vehicles.c.odometer < bindparam("b_odometer")))
+            .values(odometer=bindparam("b_odometer")),
+            [{"b_id": vehicle_id, "b_odometer": odometer} for vehicle_id, (_, odometer) in latest.items()],
+        )
+    return len(rows), {vehicle_id: odometer for vehicle_id, (_, odometer) in latest.items()}
+
+
+class TelemetryBuffer:
+    def __init__(self, max_buffered: int = MAX_BUFFERED, flush_batch: int = FLUSH_BATCH,
+                 flush_interval_s: float = FLUSH_INTERVAL_S):
+        self.max_buffered = max_buffered
+        self.flush_batch = flush_batch
+        self.flush_interval_s = flush_interval_s
+        self.buffered = 0           # pings queued or being written
+        self._batches = deque()     # lists of ping tuples, oldest first
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._task = None
+        self.stats = {"accepted": 0, "rejected": 0, "written": 0, "skipped": 0, "flushes": 0,
+                      "lastFlushMs": 0.0, "lastError": None}
+
+    # --- ingest side ---
+    def offer(self, pings: list) -> bool:
+        """Queue a batch of ping tuples; False (nothing queued) if it does not fit."""
+        with self._lock:
+            if self.buffered + len(pings) > self.max_buffered:
+                self.stats["rejected"] += len(pings)
+                return False
+            self._batches.append(pings)
+            self.buffered += len(pings)
+            self.stats["accepted"] += len(pings)
+            full = self.buffered >= self.flush_batch
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    # --- flush side ---
+    def _take(self):
+        taken = []
+        with self._lock:
+            while self._batches and len(taken) < self.flush_batch:
+                taken.extend(self._batches.popleft())
+        return taken
+
+    def _write(self, pings):
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            written, odometers = write_pings(db, pings)
+            db.commit()
+        if odometers:
+            availability.index.odometers_changed(odometers)
+            cache.versions.bump("vehicles")
+        self.stats["written"] += written
+        self.stats["skipped"] += len(pings) - written
+        self.stats["flushes"] += 1
+        self.stats["lastFlushMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def flush(self):
+        """Write everything queued so far."""
+        while True:
+            pings = self._take()
+            if not pings:
+                return
+            try:
+                await run_in_threadpool(self._write, pings)
+            except OperationalError as exc:
+                # Database busy: put the pings back in front and let the next tick retry
+                with self._lock:
+                    self._batches.appendleft(pings)
+                self.stats["lastError"] = str(exc.orig)
+                return
+            except Exception as exc:
+                self.stats["lastError"] = repr(exc)
+                self.stats["skipped"] += len(pings)
+            with self._lock:
+                self.buffered -= len(pings)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+buffer = TelemetryBuffer()
@@ -0,0 +1,234 @@
+# app/tokens.py
+# Signed access / refresh tokens for /auth: standard HS256 JWTs, built with
+# hmac/hashlib so auth keeps depending on bcrypt alone.
+#
+# /auth/login checks the password once and hands out a short-lived access token
+# plus a long-lived refresh token. Every other request is then authenticated
+# from the token alone:
+#   * decoded, verified claims are kept in an LRU keyed by the token string, so
+#     a token seen before costs a dict lookup plus the expiry/revocation checks;
+#   * logout and refresh rotation revoke tokens by id (jti). The revocations are
+#     stored in revoked_tokens and held in memory per process. Each request
+#     compares the "revoked_tokens" write version (app/cache.py, shared between
+#     workers) with the one it last loaded, and reloads the set only when
+#     another process has revoked something.
+#
+# The signing key comes from FLEETFLOW_TOKEN_SECRET. Without it, a random key is
+# generated once and stored next to the SQLite file (fleetflow.db-secret), so
+# every worker and restart uses the same one.
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.engine import make_url
+from starlette.concurrency import run_in_threadpool
+from . import cache, models
+from .database import SQLALCHEMY_DATABASE_URL, SessionLocal, is_sqlite
+
+ACCESS_TTL_S = int(os.getenv("FLEETFLOW_ACCESS_TOKEN_TTL_S", "900"))
+REFRESH_TTL_S = int(os.getenv("FLEETFLOW_REFRESH_TOKEN_TTL_S", str(14 * 24 * 3600)))
+CLAIMS_CACHE_SIZE = int(os.getenv("FLEETFLOW_TOKEN_CACHE_SIZE", "10000"))
+# Tolerated clock difference between workers when checking exp
+LEEWAY_S = 5
+
+
+def _load_secret() -> bytes:
+    secret = os.getenv("FLEETFLOW_TOKEN_SECRET")
+    if secret:
+        return secret.encode()
+    path = os.getenv("FLEETFLOW_TOKEN_SECRET_PATH")
+    if not path:
+        database = make_url(SQLALCHEMY_DATABASE_URL).database if is_sqlite(SQLALCHEMY_DATABASE_URL) else None
+        if database and database != ":memory:":
+            path = os.path.abspath(database) + "-secret"
+        else:
+            path = os.path.join(tempfile.gettempdir(), "fleetflow-token-secret")
+    try:
+        # O_EXCL: when several workers start at once, exactly one writes the key
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    for _ in range(50):
+        with open(path) as f:
+            key = f.read().strip()
+        if key:
+            return key.encode()
+        time.sleep(0.01)  # the creating worker has not written it yet
+    raise RuntimeError(f"Token secret file {path} is empty")
+
+
+SECRET = _load_secret()
+_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _unb64(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64(hmac.new(SECRET, signing_input, hashlib.sha256).digest())
+
+
+def encode(claims: dict) -> str:
+    signing_input = _HEADER + b"." + _b64(json.dumps(claims, separators=(",", ":")).encode())
+    return (signing_input + b"." + _sign(signing_input)).decode()
+
+
+def _verify(token: str) -> dict:
+    try:
+        signing_input, signature = token.encode().rsplit(b".", 1)
+        header, payload = signing_input.split(b".")
+    except ValueError:
+        raise InvalidToken("Malformed token")
+    if header != _HEADER or not hmac.compare_digest(signature, _sign(signing_input)):
+        raise InvalidToken("Bad signature")
+    try:
+        return json.loads(_unb64(payload))
+    except ValueError:
+        raise InvalidToken("Malformed token")
+
+
+def issue_pair(user: models.User) -> dict:
+    now = int(time.time())
+    base = {"sub": str(user.id), "name": user.username, "role": user.role, "iat": now}
+    access = dict(base, typ="access", exp=now + ACCESS_TTL_S, jti=uuid.uuid4().hex)
+    refresh = dict(base, typ="refresh", exp=now + REFRESH_TTL_S, jti=uuid.uuid4().hex)
+    return {
+        "access_token": encode(access),
+        "refresh_token": encode(refresh),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TTL_S,
+    }
+
+
+class ClaimsCache:
+    """LRU of token -> verified claims."""
+
+    def __init__(self, size: int = CLAIMS_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            claims = self._entries.get(token)
+            if claims is not None:
+                self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict):
+        with self._lock:
+            self._entries[token] = claims
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+class RevocationList:
+    """Revoked token ids, mirrored from the revoked_tokens table."""
+
+    def __init__(self):
+        self._revoked = set()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return cache.versions.read(("revoked_tokens",)) != self._version
+
+    def reload(self, db):
+        version = cache.versions.read(("revoked_tokens",))
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        jtis = {jti for (jti,) in db.query(models.RevokedToken.jti).filter(models.RevokedToken.expires_at > now)}
+        with self._lock:
+            self._revoked = jtis
+            self._version = version
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def revoke(self, db, claims_list):
+        """Store the revocations. The caller commits, then bumps the "revoked_tokens" version so every worker reloads."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.query(models.RevokedToken).filter(models.RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        for claims in claims_list:
+            if db.get(models.RevokedToken, claims["jti"]) is None:
+                db.add(models.RevokedToken(
+                    jti=claims["jti"],
+                    expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None),
+                ))
+            with self._lock:
+                self._revoked.add(claims["jti"])
+
+
+claims_cache = ClaimsCache()
+revoked = RevocationList()
+
+
+def _load_revocations():
+    with SessionLocal() as db:
+        revoked.reload(db)
+
+
+async def decode(token: str, expected_type: str = "access") -> dict:
+    """Verified, unexpired, unrevoked claims of `token`; raises InvalidToken otherwise."""
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = _verify(token)
+        claims_cache.put(token, claims)
+    if claims.get("typ") != expected_type:
+        raise InvalidToken("Wrong token type")
+    if claims.get("exp", 0) + LEEWAY_S < time.time():
+        raise InvalidToken("Token expired")
+    if revoked.is_stale():
+        await run_in_threadpool(_load_revocations)
+    if claims.get("jti") in revoked:
+        raise InvalidToken("Token revoked")
+    return claims
+
+
+# --- dependency ---
+bearer = HTTPBearer(auto_error=False)
+
+
+async def _require(token: Optional[str]) -> dict:
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return await decode(token)
+    except InvalidToken as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc),
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+async def require_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> dict:
+    """Claims of the access token in "Authorization: Bearer ..."; 401 if missing or invalid."""
+    return await _require(credentials.credentials if credentials is not None else None)
+
+
+async def require_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+    access_token: Optional[str] = Query(None, description="For EventSource, which cannot send headers"),
+) -> dict:
+    """require_user that also takes the access token as ?access_token= (for the SSE stream)."""
+    return await _require(credentials.credentials if credentials is not None else access_token)
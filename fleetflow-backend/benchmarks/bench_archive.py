@@ -0,0 +1,172 @@
+# benchmarks/bench_archive.py
+# Hot database size and query latency before and after archiving (app/archive.py).
+#
+# Seeds a scratch database with --years of chronological history (trips closed
+# in id order, each with --expenses-per-trip expense logs dated the day it
+# closed), then runs the same reads before and after
+#     archive.archive(db, archive.cutoff(--horizon-days)) + VACUUM
+# and checks that every read returns the same result from both layouts. The
+# "(SQL)" reads only query the hot tables, so they are limited to rows newer
+# than the archive cutoff, which stay hot.
+#
+#     python benchmarks/bench_archive.py [--trips 600000] [--years 6] [--horizon-days 365]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+parser = argparse.ArgumentParser(description="Hot DB size and query latency before/after archiving.")
+parser.add_argument("--trips", type=int, default=600000)
+parser.add_argument("--expenses-per-trip", type=int, default=2)
+parser.add_argument("--vehicles", type=int, default=2000)
+parser.add_argument("--drivers", type=int, default=4000)
+parser.add_argument("--years", type=int, default=6)
+parser.add_argument("--horizon-days", type=int, default=365)
+parser.add_argument("--rounds", type=int, default=3)
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix="fleetflow-bench-archive-")
+os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+os.environ["FLEETFLOW_METRICS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from app import archive, migrations, models, reports, rollups, scoring, search  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+models.Base.metadata.create_all(bind=engine)
+migrations.upgrade(engine)
+rng = random.Random(7)
+today = date.today()
+days = args.years * 365
+CITIES = ["Ahmedabad", "Surat", "Vadodara", "Rajkot", "Mumbai", "Pune", "Delhi", "Jaipur"]
+
+started = time.perf_counter()
+with engine.begin() as conn:
+    search.drop(conn)
+with SessionLocal() as db:
+    db.execute(insert(models.Vehicle), [
+        {"plate": f"AR-{i:05d}", "model": "Bench", "type": "Truck", "capacity_kg": 10000, "odometer": 0,
+         "status": "Available"} for i in range(args.vehicles)])
+    db.execute(insert(models.Driver), [
+        {"name": f"Driver {i}", "license_number": f"AR-{i:06d}", "expiry_date": date(2099, 1, 1),
+         "status": "On Duty"} for i in range(args.drivers)])
+    for first in range(0, args.trips, 50000):
+        trips, expenses = [], []
+        for i in range(first, min(first + 50000, args.trips)):
+            day = today - timedelta(days=(args.trips - i) * days // args.trips)
+            closed_at = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+            origin, destination = rng.sample(CITIES, 2)
+            driver_id = rng.randrange(args.drivers) + 1
+            trips.append({"id": i + 1, "vehicle_id": rng.randrange(args.vehicles) + 1, "driver_id": driver_id,
+                          "cargo_weight": rng.randrange(100, 20000), "origin": origin, "destination": destination,
+                          "estimated_fuel_cost": round(rng.uniform(50, 900), 2),
+                          "status": rng.choices(("Completed", "Cancelled"), weights=(92, 8))[0],
+                          "closed_at": closed_at})
+            expenses += [{"trip_id": i + 1, "driver_name": f"Driver {driver_id - 1}",
+                          "distance_km": rng.randrange(20, 1500), "fuel_cost": round(rng.uniform(20, 800), 2),
+                          "misc_expense": round(rng.uniform(0, 120), 2), "status": "Done", "date": day}
+                         for _ in range(args.expenses_per_trip)]
+        db.execute(insert(models.Trip), trips)
+        db.execute(insert(models.ExpenseLog), expenses)
+        db.commit()
+    rollups.backfill(db)
+    scoring.recompute(db)
+    db.commit()
+with engine.begin() as conn:
+    search.install(conn)
+print(f"Seeded {args.trips} trips, {args.trips * args.expenses_per_trip} expense logs over {args.years} years "
+      f"in {time.perf_counter() - started:.0f}s ({workdir})\n")
+
+busiest_vehicle = 1
+hot_from = archive.cutoff(args.horizon_days)
+old_month = today.replace(day=1) - timedelta(days=3 * 365)
+QUERIES = [
+    ("export, last 30 days", lambda db: _export(db, reports.Filters(start=today - timedelta(days=30)))),
+    ("export, one month 3 years ago",
+     lambda db: _export(db, reports.Filters(start=old_month, end=old_month + timedelta(days=30)))),
+    ("export, one vehicle, all time", lambda db: _export(db, reports.Filters(vehicle_id=busiest_vehicle))),
+    ("export, one driver, last year",
+     lambda db: _export(db, reports.Filters(start=today - timedelta(days=365), driver_id=1))),
+    ("fuel spend, last 90 days (SQL)", lambda db: round(db.execute(
+        select(func.sum(models.ExpenseLog.fuel_cost))
+        .where(models.ExpenseLog.date >= max(today - timedelta(days=90), hot_from.date()))).scalar() or 0, 2)),
+    ("newest 50 trips of a vehicle (SQL)", lambda db: db.execute(
+        select(models.Trip.id).where(models.Trip.vehicle_id == busiest_vehicle, models.Trip.closed_at >= hot_from)
+        .order_by(models.Trip.id.desc()).limit(50)).scalars().all()),
+    ("rollup backfill", lambda db: _rollups(db)),
+    ("score recompute", lambda db: _scores(db)),
+]
+
+
+def _export(db, filters):
+    count, total = 0, 0.0
+    for row in reports.rows(db, "expenses", filters):
+        count += 1
+        total += row[7]
+    return count, round(total, 2)
+
+
+def _rollups(db):
+    rollups.backfill(db)
+    result = db.execute(select(models.MonthlyVehicleRollup.month, models.MonthlyVehicleRollup.vehicle_id,
+                               func.round(models.MonthlyVehicleRollup.fuel_cost, 2),
+                               models.MonthlyVehicleRollup.trip_count)
+                        .order_by(models.MonthlyVehicleRollup.month, models.MonthlyVehicleRollup.vehicle_id)).all()
+    db.rollback()
+    return hash(tuple(result))
+
+
+def _scores(db):
+    scoring.recompute(db)
+    result = db.execute(select(models.Driver.trips_completed, models.Driver.trips_cancelled, models.Driver.score)
+                        .order_by(models.Driver.id)).all()
+    db.rollback()
+    return hash(tuple(result))
+
+
+def vacuum():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(engine.url.database)
+
+
+def measure():
+    timings, results = {}, {}
+    with SessionLocal() as db:
+        for label, run in QUERIES:
+            best = None
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                results[label] = run(db)
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = best
+    return timings, results
+
+
+size_before = vacuum()
+before, expected = measure()
+
+started = time.perf_counter()
+with SessionLocal() as db:
+    moved = archive.archive(db, hot_from)
+archived_in = time.perf_counter() - started
+size_after = vacuum()
+after, results = measure()
+
+for label, _ in QUERIES:
+    assert results[label] == expected[label], f"{label}: {results[label]} after archiving, {expected[label]} before"
+
+print(f"Archived {moved['trips']} trips + {moved['expense_logs']} expense logs into {moved['segments']} segments "
+      f"in {archived_in:.1f}s\n")
+print(f"{'':<38} {'before':>10} {'after':>10}")
+print(f"{'hot database (MB, vacuumed)':<38} {size_before / 1e6:>10.1f} {size_after / 1e6:>10.1f}")
+print(f"{'archive segments (MB)':<38} {0:>10.1f} {moved['bytes'] / 1e6:>10.1f}")
+for label, _ in QUERIES:
+    print(f"{label + ' (ms)':<38} {before[label]:>10.1f} {after[label]:>10.1f}")
+print(f"\nBest of {args.rounds}; every read returned the same result before and after archiving.")
@@ -0,0 +1,75 @@
+# benchmarks/bench_batch_dispatch.py
+# Scaling of the batch dispatch path: best-fit assignment on its own, then the
+# whole /trips/dispatch/batch transaction against a fresh database each run.
+#
+#     python benchmarks/bench_batch_dispatch.py [--vehicles 5000] [--requests 1000 2500 5000 10000]
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ["FLEETFLOW_DATABASE_URL"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="fleetflow-batch-"), "bench.db"
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import assignment, counters, models, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.routers import trips  # noqa: E402
+
+
+def reset_fleet(vehicles: int, drivers: int, rng: random.Random):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    expiry = date.today() + timedelta(days=365)
+    with SessionLocal() as db:
+        db.add_all(models.Vehicle(plate=f"BATCH-{i}", model="Batch", type="Truck",
+                                  capacity_kg=rng.choice([1000, 2000, 5000, 10000, 20000]),
+                                  odometer=0, status="Available") for i in range(vehicles))
+        db.add_all(models.Driver(name=f"Driver {i}", license_number=f"BATCH-{i}",
+                                 expiry_date=expiry, status="On Duty") for i in range(drivers))
+        db.flush()
+        counters.get_counters(db)
+        db.commit()
+
+
+def cargo(n: int, rng: random.Random):
+    return [rng.randint(100, 20000) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch dispatch scaling benchmark.")
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--requests", type=int, nargs="+", default=[1000, 2500, 5000, 10000])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'requests':>8} {'vehicles':>8} {'assign ms':>10} {'txn ms':>9} {'assigned':>9} {'unassigned':>10}")
+    for n in args.requests:
+        weights = cargo(n, rng)
+        fleet = [(i, rng.choice([1000, 2000, 5000, 10000, 20000])) for i in range(args.vehicles)]
+        started = time.perf_counter()
+        assignment.best_fit_assign(weights, fleet, list(range(args.vehicles)))
+        assign_ms = (time.perf_counter() - started) * 1000
+
+        reset_fleet(args.vehicles, args.vehicles, rng)
+        batch = schemas.BatchDispatchRequest(requests=[
+            schemas.CargoRequest(cargoWeight=w, origin="Depot", destination="Site", estimatedFuelCost=10.0)
+            for w in weights
+        ])
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            result = asyncio.run(trips._dispatch_batch(db, batch))
+            txn_ms = (time.perf_counter() - started) * 1000
+
+        print(f"{n:>8} {args.vehicles:>8} {assign_ms:>10.1f} {txn_ms:>9.1f} "
+              f"{len(result['trips']):>9} {len(result['unassigned']):>10}")
+
+
+if __name__ == "__main__":
+    main()
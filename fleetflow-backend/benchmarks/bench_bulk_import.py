@@ -0,0 +1,125 @@
+# benchmarks/bench_bulk_import.py
+# Rows per minute for the CSV import endpoints (vehicles, drivers, expenses).
+#
+# Starts uvicorn on a scratch database and uploads generated CSV files of
+# --rows lines each, with a few invalid rows mixed in to exercise the error
+# report. Trips for the expense rows are inserted directly beforehand.
+#
+#     python benchmarks/bench_bulk_import.py [--rows 50000] [--target 50000]
+#
+# Exits 1 if any resource imports slower than --target rows per minute or the
+# reported counts are wrong. Needs uvicorn, httpx and python-multipart installed.
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BAD_EVERY = 1000  # one invalid row per this many
+
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def csv_file(header, make_row, rows: int) -> bytes:
+    out = io.StringIO()
+    out.write(",".join(header) + "\n")
+    for i in range(rows):
+        out.write(",".join(map(str, make_row(i))) + "\n")
+    return out.getvalue().encode()
+
+
+def vehicle_row(i):
+    return (f"BULK-{i}", "Bench", "Truck", "x" if i % BAD_EVERY == 1 else 10, 0)
+
+
+def driver_row(i):
+    return (f"Driver {i}", f"LIC-{i}", "2099-12-31" if i % BAD_EVERY != 1 else "not-a-date")
+
+
+def expense_row(i):
+    return (10 ** 9 if i % BAD_EVERY == 1 else i + 1, 120, 55.5, 4.0, "", "2026-01-15")
+
+
+def seed_trips(rows: int):
+    # Imported after the app points at the scratch database (FLEETFLOW_DATABASE_URL)
+    sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy import insert
+    from app import models
+    from app.database import SessionLocal
+
+    with SessionLocal() as db:
+        vehicle_ids = [v for (v,) in db.query(models.Vehicle.id).order_by(models.Vehicle.id)]
+        driver_ids = [d for (d,) in db.query(models.Driver.id).order_by(models.Driver.id)]
+        db.execute(insert(models.Trip), [{
+            "vehicle_id": vehicle_ids[i % len(vehicle_ids)], "driver_id": driver_ids[i % len(driver_ids)],
+            "cargo_weight": 100, "origin": "A", "destination": "B", "estimated_fuel_cost": 50.0,
+            "status": "Completed",
+        } for i in range(rows)])
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV import throughput for vehicles, drivers and expenses.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--target", type=float, default=50000.0, help="minimum rows per minute")
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fleetflow-bench-import-")
+    os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+    proc = start_server(workdir, args.port)
+    expected_bad = len([i for i in range(args.rows) if i % BAD_EVERY == 1])
+    uploads = [
+        ("/vehicles/import", ("licensePlate", "model", "type", "maxPayload", "initialOdometer"), vehicle_row),
+        ("/drivers/import", ("name", "license_number", "expiry_date"), driver_row),
+        ("/expenses/import", ("tripId", "distance", "fuelCost", "miscExpense", "driverName", "date"), expense_row),
+    ]
+    failed = False
+    try:
+        print(f"{'endpoint':<18} {'rows':>7} {'inserted':>9} {'failed':>7} {'seconds':>8} {'rows/min':>10}")
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=600) as client:
+            for path, header, make_row in uploads:
+                if path == "/expenses/import":
+                    seed_trips(args.rows)
+                body = csv_file(header, make_row, args.rows)
+                started = time.perf_counter()
+                r = client.post(path, files={"file": ("import.csv", body, "text/csv")})
+                elapsed = time.perf_counter() - started
+                r.raise_for_status()
+                report = r.json()
+                rate = args.rows / elapsed * 60
+                print(f"{path:<18} {report['received']:>7} {report['inserted']:>9} {report['failed']:>7} "
+                      f"{elapsed:>8.2f} {rate:>10.0f}")
+                if rate < args.target or report["failed"] != expected_bad \
+                        or report["inserted"] != args.rows - expected_bad:
+                    failed = True
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
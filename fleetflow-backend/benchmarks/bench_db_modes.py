@@ -0,0 +1,104 @@
+# benchmarks/bench_db_modes.py
+# Throughput of the sync and async database modes under concurrent clients.
+#
+# Starts uvicorn once per FLEETFLOW_DB_MODE against a scratch copy of the
+# database, then keeps N clients busy on the read endpoints for a fixed time.
+#
+#     python benchmarks/bench_db_modes.py [--clients 50 200 1000] [--seconds 10]
+#
+# Needs uvicorn, httpx and aiosqlite installed.
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["/dashboard/stats", "/dashboard/active-trips", "/vehicles/", "/trips/available-resources"]
+
+
+def start_server(mode: str, workdir: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, FLEETFLOW_DB_MODE=mode)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"uvicorn ({mode}) did not start")
+
+
+async def drive(base_url: str, clients: int, seconds: float) -> dict:
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    stop_at = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(n: int):
+            nonlocal errors
+            i = n
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    r = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    errors += 1
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync vs async database mode throughput.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "fleetflow.db"),
+                        help="database file to copy into the scratch directory")
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for mode in ("sync", "async"):
+        workdir = tempfile.mkdtemp(prefix=f"fleetflow-bench-{mode}-")
+        shutil.copy(args.db, os.path.join(workdir, "fleetflow.db"))
+        proc = start_server(mode, workdir, args.port)
+        try:
+            for clients in args.clients:
+                r = asyncio.run(drive(f"http://127.0.0.1:{args.port}", clients, args.seconds))
+                print(f"{mode:<6} {clients:>7} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>7}")
+        finally:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_driver_scoring.py
+# Cost of keeping driver scores current (app/scoring.py).
+#
+# Seeds a scratch database with --drivers drivers, --trips closed trips and
+# --incidents incidents, then times:
+#   incremental  one trip closed / one incident recorded: the single
+#                "UPDATE drivers SET x = x + :delta" plus its commit
+#   batch        record_trip_outcomes for 1000 trips closed in one transaction
+#   recompute    every score rebuilt from the full history, NumPy vs grouped queries
+# and checks that the recomputed scores match the ones kept incrementally.
+#
+#     python benchmarks/bench_driver_scoring.py [--drivers 20000] [--trips 1000000] [--incidents 20000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+parser = argparse.ArgumentParser(description="Incremental driver scoring vs full recompute.")
+parser.add_argument("--drivers", type=int, default=20000)
+parser.add_argument("--trips", type=int, default=1000000)
+parser.add_argument("--incidents", type=int, default=20000)
+parser.add_argument("--updates", type=int, default=2000, help="single-event updates to time")
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix="fleetflow-bench-scoring-")
+os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select  # noqa: E402
+from app import models, scoring  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+models.Base.metadata.create_all(bind=engine)
+rng = random.Random(11)
+kinds = list(scoring.INCIDENT_POINTS)
+
+with SessionLocal() as db:
+    db.execute(insert(models.Vehicle), [
+        {"plate": "SCORE-1", "model": "Bench", "type": "Truck", "capacity_kg": 10000, "odometer": 0,
+         "status": "Available"}])
+    db.execute(insert(models.Driver), [
+        {"name": f"Driver {i}", "license_number": f"SCORE-{i}", "expiry_date": date(2099, 1, 1),
+         "status": "On Duty"} for i in range(args.drivers)])
+    for start in range(0, args.trips, 100000):
+        db.execute(insert(models.Trip), [
+            {"vehicle_id": 1, "driver_id": rng.randrange(args.drivers) + 1, "cargo_weight": 100, "origin": "A",
+             "destination": "B", "estimated_fuel_cost": 10.0,
+             "status": "Completed" if rng.random() < 0.9 else "Cancelled"}
+            for _ in range(start, min(start + 100000, args.trips))])
+    db.execute(insert(models.DriverIncident), [
+        {"driver_id": rng.randrange(args.drivers) + 1, "kind": kind, "points": scoring.INCIDENT_POINTS[kind],
+         "created_at": datetime(2024, 1, 1)} for kind in (rng.choice(kinds) for _ in range(args.incidents))])
+    scoring.recompute(db)
+    db.commit()
+
+
+def scores(db):
+    return db.execute(select(models.Driver.id, models.Driver.trips_completed, models.Driver.trips_cancelled,
+                             models.Driver.incident_points, models.Driver.complaints, models.Driver.score)
+                      .order_by(models.Driver.id)).all()
+
+
+print(f"{args.drivers} drivers, {args.trips} closed trips, {args.incidents} incidents\n")
+print(f"{'operation':<34} {'ms':>9}")
+
+# Single events, each in its own transaction like the endpoints
+with SessionLocal() as db:
+    started = time.perf_counter()
+    for _ in range(args.updates):
+        driver_id = rng.randrange(args.drivers) + 1
+        status = "Completed" if rng.random() < 0.9 else "Cancelled"
+        db.add(models.Trip(vehicle_id=1, driver_id=driver_id, cargo_weight=100, origin="A", destination="B",
+                           estimated_fuel_cost=10.0, status=status))
+        scoring.record_trip_outcomes(db, [(driver_id, status)])
+        db.commit()
+    per_close = (time.perf_counter() - started) / args.updates * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.updates):
+        kind = rng.choice(kinds)
+        incident = models.DriverIncident(driver_id=rng.randrange(args.drivers) + 1, kind=kind,
+                                         points=scoring.INCIDENT_POINTS[kind], created_at=datetime(2024, 1, 1))
+        db.add(incident)
+        scoring.record_incident(db, incident)
+        db.commit()
+    per_incident = (time.perf_counter() - started) / args.updates * 1000
+
+    outcomes = [(rng.randrange(args.drivers) + 1, "Completed" if rng.random() < 0.9 else "Cancelled")
+                for _ in range(1000)]
+    db.execute(insert(models.Trip), [
+        {"vehicle_id": 1, "driver_id": driver_id, "cargo_weight": 100, "origin": "A", "destination": "B",
+         "estimated_fuel_cost": 10.0, "status": status} for driver_id, status in outcomes])
+    started = time.perf_counter()
+    scoring.record_trip_outcomes(db, outcomes)
+    db.commit()
+    batch = (time.perf_counter() - started) * 1000
+    incremental = scores(db)
+
+print(f"{'trip closed (insert + update)':<34} {per_close:>9.2f}")
+print(f"{'incident recorded (insert + update)':<34} {per_incident:>9.2f}")
+print(f"{'1000 trips closed in one batch':<34} {batch:>9.1f}")
+
+numpy = scoring.np
+for label, module in (("recompute, NumPy", numpy), ("recompute, grouped queries", None)):
+    if label.endswith("NumPy") and numpy is None:
+        print(f"{label:<34} {'(NumPy not installed)':>9}")
+        continue
+    scoring.np = module
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        scoring.recompute(db)
+        db.commit()
+        elapsed = (time.perf_counter() - started) * 1000
+        assert scores(db) == incremental, "recomputed scores differ from the incremental ones"
+    print(f"{label:<34} {elapsed:>9.0f}")
+scoring.np = numpy
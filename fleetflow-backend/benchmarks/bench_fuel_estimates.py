@@ -0,0 +1,100 @@
+# benchmarks/bench_fuel_estimates.py
+# Fuel cost estimates (app/fuel.py): the in-memory matrix vs asking the database.
+#
+#     python benchmarks/generate_data.py --db /tmp/fleet.db --trips 200000 --expenses 1000000
+#     python benchmarks/bench_fuel_estimates.py --db /tmp/fleet.db [--open-trips 100000]
+#
+# Times the matrix build, one estimate (memoized and after an expense changed
+# the matrix), 10k estimates in one call, and the same estimate as a grouped
+# query per request. Then marks --open-trips trips as dispatched and
+# re-estimates them all twice (the second time nothing changes), with NumPy
+# and with the plain loop; that part runs in
+# a transaction that is rolled back, so the file is not modified.
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="Fuel estimate latency, in-memory matrix vs SQL.")
+parser.add_argument("--db", required=True, help="SQLite file made by generate_data.py (it is not modified)")
+parser.add_argument("--open-trips", type=int, default=100000)
+parser.add_argument("--rounds", type=int, default=2000)
+args = parser.parse_args()
+
+os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+os.environ["FLEETFLOW_METRICS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, update  # noqa: E402
+from app import fuel, models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+
+rng = random.Random(3)
+
+
+def per_call_us(fn, rounds=args.rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings)
+
+
+def sql_estimate(db, origin, destination, vehicle_type):
+    # What a per-request estimate would cost without the matrix (route distance and cell rate only)
+    e, t, v = models.ExpenseLog, models.Trip, models.Vehicle
+    return db.execute(
+        select(func.count(func.distinct(e.trip_id)), func.sum(e.distance_km), func.sum(e.fuel_cost))
+        .select_from(e).join(t, t.id == e.trip_id).join(v, v.id == t.vehicle_id)
+        .where(t.origin == origin, t.destination == destination, v.type == vehicle_type, fuel.SAMPLE_ROWS)
+    ).one()
+
+
+with SessionLocal() as db:
+    expenses = db.execute(select(func.count()).select_from(models.ExpenseLog)).scalar()
+    keys = [tuple(row) for row in db.execute(
+        select(models.Trip.origin, models.Trip.destination, models.Vehicle.type)
+        .join(models.Vehicle, models.Vehicle.id == models.Trip.vehicle_id).distinct())]
+    print(f"{expenses} expense logs, {len(keys)} (origin, destination, vehicle type) keys ({args.db})\n")
+    print(f"{'operation':<38} {'time':>12}")
+
+    started = time.perf_counter()
+    fuel.matrix.rebuild(db)
+    print(f"{'matrix build':<38} {(time.perf_counter() - started) * 1000:>9.0f} ms")
+
+    key = keys[0]
+    fuel.matrix.estimate(db, *key)
+    print(f"{'one estimate, memoized':<38} {per_call_us(lambda: fuel.matrix.estimate(db, *key)):>9.2f} us")
+
+    def after_expense():
+        fuel.matrix.expense_logged(*rng.choice(keys), 100, 60.0, True)
+        fuel.matrix.estimate(db, *key)
+    print(f"{'expense logged + one estimate':<38} {per_call_us(after_expense):>9.2f} us")
+
+    batch = [rng.choice(keys) for _ in range(10000)]
+    fuel.matrix.expense_logged(*key, 0, 0.0, False)  # start from an empty memo
+    print(f"{'10k estimates in one call':<38} "
+          f"{per_call_us(lambda: fuel.matrix.estimate_many(db, batch), rounds=5) / 1000:>9.2f} ms")
+    print(f"{'one estimate as a SQL query':<38} "
+          f"{per_call_us(lambda: sql_estimate(db, *rng.choice(keys)), rounds=20) / 1000:>9.2f} ms")
+
+    trip_ids = db.execute(select(models.Trip.id).order_by(models.Trip.id.desc()).limit(args.open_trips)).scalars().all()
+    for first in range(0, len(trip_ids), 50000):
+        db.execute(update(models.Trip).where(models.Trip.id.in_(trip_ids[first:first + 50000]))
+                   .values(status="Dispatched"), execution_options={"synchronize_session": False})
+    for label, module in (("NumPy", fuel.np), ("loop", None)):
+        if label == "NumPy" and module is None:
+            continue
+        fuel.np = module
+        savepoint = db.begin_nested()
+        for run in ("", ", again"):
+            started = time.perf_counter()
+            result = fuel.reestimate_open_trips(db)
+            elapsed = (time.perf_counter() - started) * 1000
+            name = f"re-estimate {result['open_trips']} trips, {label}{run}"
+            print(f"{name:<38} {elapsed:>9.0f} ms  ({result['updated']} changed)")
+        savepoint.rollback()
+    db.rollback()
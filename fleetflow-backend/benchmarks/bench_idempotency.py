@@ -0,0 +1,162 @@
+# benchmarks/bench_idempotency.py
+# Retry storm against the Idempotency-Key endpoints (app/idempotency.py).
+#
+# --keys clients each send one dispatch, then one expense for the trip they got,
+# every request fired --retries times at once with the same Idempotency-Key (a
+# client retrying on timeouts before the first attempt answered). Then every
+# request is retried once more after the fact, one at a time. Checks that each key created
+# exactly one trip and one expense log, that every copy of a request got the
+# same response, and that the late retries ran no SQL at all. The same expense
+# storm without keys shows what the retries would have written otherwise.
+# Exits non-zero if anything ran twice.
+#
+#     python benchmarks/bench_idempotency.py [--keys 200] [--retries 20]
+#
+# Drives the app in-process through httpx's ASGI transport (one event loop, as
+# under uvicorn).
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ["FLEETFLOW_DATABASE_URL"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="fleetflow-idempotency-"), "bench.db"
+)
+os.environ["FLEETFLOW_METRICS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from sqlalchemy import event, func, insert, select  # noqa: E402
+from app import counters, idempotency, models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def seed(n: int):
+    expiry = date.today() + timedelta(days=365)
+    with SessionLocal() as db:
+        db.execute(insert(models.Vehicle), [
+            {"plate": f"RETRY-{i}", "model": "Retry", "type": "Truck", "capacity_kg": 5000, "odometer": 0,
+             "status": "Available"} for i in range(n)])
+        db.execute(insert(models.Driver), [
+            {"name": f"Driver {i}", "license_number": f"RETRY-{i}", "expiry_date": expiry, "status": "On Duty"}
+            for i in range(n)])
+        counters.reconcile(db)
+        db.commit()
+
+
+def count(model) -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(model)).scalar()
+
+
+class Statements:
+    """Counts SQL statements sent to the database while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _seen(self, *_):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._seen)
+        return self
+
+    def __exit__(self, *_):
+        event.remove(engine, "before_cursor_execute", self._seen)
+
+
+async def storm(client, requests, retries: int, concurrent: bool = True) -> dict:
+    """Send every (key, path, body) `retries` times (all at once, or one after
+    another); latencies are split into requests that ran and replays."""
+    responses, first, replayed = {}, [], []
+
+    async def send(key, path, body):
+        started = time.perf_counter()
+        headers = {"Idempotency-Key": key} if key else {}
+        r = await client.post(path, json=body, headers=headers)
+        elapsed = (time.perf_counter() - started) * 1000
+        (replayed if r.headers.get("Idempotent-Replayed") else first).append(elapsed)
+        responses.setdefault(key, []).append((r.status_code, r.content))
+
+    started = time.perf_counter()
+    sends = [send(*request) for request in requests for _ in range(retries)]
+    if concurrent:
+        await asyncio.gather(*sends)
+    else:
+        for one in sends:
+            await one
+    return {"responses": responses, "first": first, "replayed": replayed,
+            "elapsed_ms": (time.perf_counter() - started) * 1000}
+
+
+def check_identical(result: dict, retries: int):
+    for key, copies in result["responses"].items():
+        assert len(copies) == retries, key
+        assert len(set(copies)) == 1, f"{key}: copies of one request got different responses: {set(copies)}"
+        assert copies[0][0] == 201, f"{key}: {copies[0]}"
+
+
+def row(label: str, result: dict, statements: int):
+    first, replayed = result["first"], result["replayed"]
+    p50 = lambda values: f"{statistics.median(values):.2f}" if values else "-"  # noqa: E731
+    print(f"{label:<30} {len(first) + len(replayed):>8} {len(first):>6} {p50(first):>10} {p50(replayed):>11} "
+          f"{statements:>11} {result['elapsed_ms']:>9.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Duplicate-request storm against Idempotency-Key endpoints.")
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=20)
+    args = parser.parse_args()
+    seed(args.keys)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{args.keys} keys x {args.retries} concurrent copies\n")
+        print(f"{'storm':<30} {'requests':>8} {'ran':>6} {'ran p50 ms':>10} {'replay p50':>11} "
+              f"{'statements':>11} {'total ms':>9}")
+
+        dispatches = [(f"dispatch-{i}", "/trips/dispatch",
+                       {"vehicleId": i + 1, "driverId": i + 1, "cargoWeight": 100, "origin": "Depot",
+                        "destination": "Site", "estimatedFuelCost": 10.0}) for i in range(args.keys)]
+        with Statements() as sql:
+            result = await storm(client, dispatches, args.retries)
+        check_identical(result, args.retries)
+        assert count(models.Trip) == args.keys, f"{count(models.Trip)} trips for {args.keys} keys"
+        row("POST /trips/dispatch", result, sql.count)
+
+        trip_ids = {key: json.loads(copies[0][1])["id"] for key, copies in result["responses"].items()}
+        expenses = [(f"expense-{i}", "/expenses/",
+                     {"tripId": trip_ids[f"dispatch-{i}"], "distance": 120, "fuelCost": 60.0, "miscExpense": 5.0})
+                    for i in range(args.keys)]
+        with Statements() as sql:
+            result = await storm(client, expenses, args.retries)
+        check_identical(result, args.retries)
+        assert count(models.ExpenseLog) == args.keys, f"{count(models.ExpenseLog)} expense logs for {args.keys} keys"
+        row("POST /expenses/", result, sql.count)
+
+        with Statements() as sql:
+            result = await storm(client, dispatches + expenses, 1, concurrent=False)
+        assert not result["first"] and sql.count == 0, f"late retries ran {sql.count} statements"
+        row("late retries, one at a time", result, sql.count)
+
+        before = count(models.ExpenseLog)
+        with Statements() as sql:
+            result = await storm(client, [(None, path, body) for _, path, body in expenses], args.retries)
+        duplicates = count(models.ExpenseLog) - before
+        row("POST /expenses/ without keys", result, sql.count)
+
+    print(f"\nWith keys: one trip and one expense log per key, every copy answered identically, "
+          f"{len(idempotency.store)} keys held.")
+    print(f"Without keys the same storm logged {duplicates} expenses for {args.keys} intended.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
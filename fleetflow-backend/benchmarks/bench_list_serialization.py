@@ -0,0 +1,151 @@
+# benchmarks/bench_list_serialization.py
+# Serialization cost of the list endpoints, per 10k rows: response_model path
+# vs the fast path (app/fastjson.py).
+#
+# For each list endpoint the rows are split into the two halves of a request:
+#   fetch      ORM objects (query.all())       vs  column tuples (select(...))
+#   serialize  validate through the from_attributes schema, dump, json.dumps
+#              (the steps FastAPI takes for response_model=List[...])
+#                                              vs  dicts + orjson (and + stdlib json)
+# and then timed end to end: the whole table read page by page
+# (?limit=1000) through the app in-process, with FLEETFLOW_FAST_JSON off and on.
+#
+#     python benchmarks/bench_list_serialization.py [--rows 10000] [--rounds 5]
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_ms(fn, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-10k-row serialization cost of the list endpoints.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fleetflow-bench-lists-")
+    os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+    os.environ["FLEETFLOW_METRICS"] = "0"
+    sys.path.insert(0, BACKEND_DIR)
+
+    import httpx
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert
+    from app import fastjson, models
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.routers import drivers, expenses, trips, vehicles
+
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    n = args.rows
+    with SessionLocal() as db:
+        db.execute(insert(models.Vehicle), [
+            {"plate": f"GJ-{i:07d}", "model": f"Truck M{i % 7}", "type": "Truck", "capacity_kg": 10000,
+             "odometer": rng.randrange(300000), "status": "Available"} for i in range(n)])
+        db.execute(insert(models.Driver), [
+            {"name": f"Driver {i}", "license_number": f"DL-{i:08d}",
+             "expiry_date": date.today() + timedelta(days=rng.randrange(1500)),
+             "completion_rate": round(rng.uniform(70, 100), 1), "safety_score": round(rng.uniform(60, 100), 1),
+             "complaints": rng.randrange(5), "status": "On Duty"} for i in range(n)])
+        db.execute(insert(models.Trip), [
+            {"vehicle_id": i + 1, "driver_id": i + 1, "cargo_weight": rng.randrange(100, 9000),
+             "origin": "Ahmedabad", "destination": "Surat", "estimated_fuel_cost": 120.0, "status": "Completed"}
+            for i in range(n)])
+        db.execute(insert(models.ExpenseLog), [
+            {"trip_id": i + 1, "driver_name": f"Driver {i}", "distance_km": rng.randrange(20, 1500),
+             "fuel_cost": round(rng.uniform(20, 800), 2), "misc_expense": round(rng.uniform(0, 120), 2),
+             "status": "Done", "date": date.today() - timedelta(days=rng.randrange(700))} for i in range(n)])
+        db.commit()
+
+    lists = [
+        ("/vehicles/", models.Vehicle, vehicles.VEHICLE_ROWS, vehicles.schemas.VehicleResponse),
+        ("/drivers/", models.Driver, drivers.DRIVER_ROWS, drivers.schemas.DriverResponse),
+        ("/trips/", models.Trip, trips.TRIP_ROWS, trips.schemas.TripResponse),
+        ("/expenses/", models.ExpenseLog, expenses.EXPENSE_ROWS, expenses.schemas.ExpenseResponse),
+    ]
+    per_10k = 10000 / n
+
+    print(f"ms per 10k rows (best of {args.rounds}, {n} rows per table, orjson "
+          f"{'installed' if fastjson.orjson is not None else 'MISSING - fast path uses stdlib json'})\n")
+    print(f"{'endpoint':<12} {'fetch ORM':>10} {'tuples':>8} {'schema+json':>12} {'dicts+orjson':>13} "
+          f"{'dicts+json':>11} {'speedup':>8}")
+    for path, model, shape, schema in lists:
+        adapter = TypeAdapter(List[schema])
+
+        def fetch_orm():
+            with SessionLocal() as db:
+                return db.query(model).order_by(model.id).all()
+
+        def fetch_tuples():
+            with SessionLocal() as db:
+                return db.execute(shape.select().order_by(shape.id_column)).all()
+
+        objects, rows = fetch_orm(), fetch_tuples()
+
+        def schema_path():
+            content = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                              separators=(",", ":")).encode("utf-8")
+
+        def stdlib_fallback():
+            return json.dumps(shape.dicts(rows), default=fastjson._default, ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+
+        assert json.loads(schema_path()) == json.loads(fastjson.dumps(shape.dicts(rows)))
+        t_orm = best_ms(fetch_orm, args.rounds) * per_10k
+        t_tuples = best_ms(fetch_tuples, args.rounds) * per_10k
+        t_schema = best_ms(schema_path, args.rounds) * per_10k
+        t_fast = best_ms(lambda: fastjson.dumps(shape.dicts(rows)), args.rounds) * per_10k
+        t_stdlib = best_ms(stdlib_fallback, args.rounds) * per_10k
+        print(f"{path:<12} {t_orm:>10.1f} {t_tuples:>8.1f} {t_schema:>12.1f} {t_fast:>13.1f} {t_stdlib:>11.1f} "
+              f"{(t_orm + t_schema) / (t_tuples + t_fast):>7.1f}x")
+
+    async def read_all(client, path: str) -> int:
+        after, total = None, 0
+        while True:
+            params = {"limit": 1000} if after is None else {"limit": 1000, "after": after}
+            r = await client.get(path, params=params)
+            total += len(r.json())
+            after = r.headers.get("x-next-cursor")
+            if after is None:
+                return total
+
+    async def end_to_end():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"\n{'endpoint':<12} {'response_model':>15} {'fast path':>10}   (whole table in pages of 1000, ms per 10k rows)")
+            for path, *_ in lists:
+                timings = {}
+                for enabled in (False, True):
+                    fastjson.ENABLED = enabled
+                    best = float("inf")
+                    for _ in range(args.rounds):
+                        started = time.perf_counter()
+                        assert await read_all(client, path) == n
+                        best = min(best, time.perf_counter() - started)
+                    timings[enabled] = best * 1000 * per_10k
+                print(f"{path:<12} {timings[False]:>15.1f} {timings[True]:>10.1f}")
+
+    asyncio.run(end_to_end())
+
+
+if __name__ == "__main__":
+    main()
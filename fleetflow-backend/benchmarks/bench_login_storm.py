@@ -0,0 +1,135 @@
+# benchmarks/bench_login_storm.py
+# A burst of logins must not starve the rest of the API.
+#
+# Starts uvicorn, then measures two probes, token-authenticated GET /auth/me
+# and GET /vehicles/ (a threadpool-bound list endpoint):
+#   1. on their own (baseline);
+#   2. while --storm clients hammer POST /auth/login as fast as they can.
+# bcrypt runs on its own bounded pool (FLEETFLOW_BCRYPT_WORKERS) and sheds
+# load past FLEETFLOW_BCRYPT_MAX_PENDING with 503. The probes should keep
+# their latency, apart from competing for CPU.
+#
+#     python benchmarks/bench_login_storm.py [--storm 200] [--seconds 10]
+#
+# Needs uvicorn and httpx installed.
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, FLEETFLOW_DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float("nan")
+
+
+async def run(base_url: str, token: str, storm: int, probes: int, seconds: float) -> dict:
+    stop_at = time.perf_counter() + seconds
+    probe_latency = {"/auth/me": [], "/vehicles/": []}
+    probe_errors = 0
+    logins = {"ok": [], "shed": 0, "retry_after": [], "other": 0}
+    limits = httpx.Limits(max_connections=storm + probes + 10)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def probe(path: str):
+            nonlocal probe_errors
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    r = await client.get(path, headers=headers)
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    probe_errors += 1
+                    continue
+                probe_latency[path].append(time.perf_counter() - started)
+
+        async def login():
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    r = await client.post("/auth/login", json={"username": "storm", "password": "storm-password"})
+                except httpx.HTTPError:
+                    logins["other"] += 1
+                    continue
+                if r.status_code == 200:
+                    logins["ok"].append(time.perf_counter() - started)
+                elif r.status_code == 503:
+                    logins["shed"] += 1
+                    logins["retry_after"].append(float(r.headers.get("Retry-After", "1")))
+                    await asyncio.sleep(logins["retry_after"][-1])
+                else:
+                    logins["other"] += 1
+
+        paths = [p for _ in range(probes // 2 or 1) for p in probe_latency]
+        started = time.perf_counter()
+        await asyncio.gather(*(probe(p) for p in paths), *(login() for _ in range(storm)))
+        elapsed = time.perf_counter() - started
+    return {"probes": probe_latency, "probe_errors": probe_errors, "logins": logins, "elapsed": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API latency during a login storm.")
+    parser.add_argument("--storm", type=int, default=200, help="concurrent login clients")
+    parser.add_argument("--probes", type=int, default=4, help="concurrent probe clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8772)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fleetflow-bench-login-")
+    proc = start_server(workdir, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        httpx.post(f"{base_url}/auth/register", json={"username": "storm", "password": "storm-password"},
+                   timeout=30).raise_for_status()
+        token = httpx.post(f"{base_url}/auth/login", json={"username": "storm", "password": "storm-password"},
+                           timeout=30).json()["access_token"]
+        baseline = asyncio.run(run(base_url, token, 0, args.probes, args.seconds))
+        storm = asyncio.run(run(base_url, token, args.storm, args.probes, args.seconds))
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'probe':<12} {'baseline p50':>13} {'p95':>8} {'storm p50':>10} {'p95':>8}   (ms)")
+    for path in baseline["probes"]:
+        b, s = baseline["probes"][path], storm["probes"][path]
+        print(f"{path:<12} {pct(b, .5):>13.1f} {pct(b, .95):>8.1f} {pct(s, .5):>10.1f} {pct(s, .95):>8.1f}")
+    ok, retry_after = storm["logins"]["ok"], storm["logins"]["retry_after"]
+    print(f"\nlogins: {len(ok)} ok ({len(ok) / storm['elapsed']:.1f}/s, p50 {pct(ok, .5):.0f} ms, "
+          f"p95 {pct(ok, .95):.0f} ms), {storm['logins']['other']} other errors")
+    if retry_after:
+        print(f"        {storm['logins']['shed']} shed with 503, Retry-After {min(retry_after):.0f}-{max(retry_after):.0f}s")
+    me = storm["probes"]["/auth/me"]
+    print(f"token checks during the storm: {len(me) / args.seconds:.0f}/s, "
+          f"probe errors: {baseline['probe_errors']} baseline, {storm['probe_errors']} storm")
+
+
+if __name__ == "__main__":
+    main()
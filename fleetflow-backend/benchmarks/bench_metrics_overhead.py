@@ -0,0 +1,120 @@
+# benchmarks/bench_metrics_overhead.py
+# Cost of the metrics middleware and SQL hooks on the cheapest endpoints.
+#
+# Runs the app in-process (ASGI calls, no sockets, so client noise does not
+# drown the difference) once with FLEETFLOW_METRICS=0 and once with =1, each
+# in a fresh interpreter, and reports microseconds per request on "/" (no
+# database) and /dashboard/stats (one counter-row read).
+#
+#     python benchmarks/bench_metrics_overhead.py [--requests 5000] [--rounds 3]
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["/", "/dashboard/stats"]
+
+
+def child(requests: int):
+    """Time `requests` ASGI calls per endpoint; prints {path: microseconds per request}."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.main import app
+
+    async def call(path: str):
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+                 "server": ("bench", 80)}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await app(scope, receive, send)
+
+    async def run():
+        timings = {}
+        for path in ENDPOINTS:
+            for _ in range(200):  # warm up
+                await call(path)
+            started = time.perf_counter()
+            for _ in range(requests):
+                await call(path)
+            timings[path] = (time.perf_counter() - started) / requests * 1e6
+        return timings
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request cost with and without the metrics instrumentation.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.requests)
+
+    workdir = tempfile.mkdtemp(prefix="fleetflow-bench-metrics-")
+    results = {(enabled, path): [] for enabled in ("0", "1") for path in ENDPOINTS}
+    for _ in range(args.rounds):
+        for enabled in ("0", "1"):
+            env = dict(os.environ, FLEETFLOW_METRICS=enabled,
+                       FLEETFLOW_DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}")
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--requests",
+                                  str(args.requests)], env=env, cwd=workdir, capture_output=True, text=True,
+                                 check=True).stdout
+            for path, us in json.loads(out.strip().splitlines()[-1]).items():
+                results[(enabled, path)].append(us)
+
+    # Best of the rounds: the least disturbed run of each configuration
+    print(f"{'endpoint':<18} {'off us/req':>11} {'on us/req':>10} {'overhead':>9}")
+    for path in ENDPOINTS:
+        off = min(results[("0", path)])
+        on = min(results[("1", path)])
+        print(f"{path:<18} {off:>11.1f} {on:>10.1f} {(on - off) / off * 100:>8.1f}%")
+
+    # The instrumentation on its own, without the rest of the request around it
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+    from app import metrics
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def isolated(asgi_app, n: int) -> float:
+        scope = {"type": "http", "method": "GET", "path": "/"}
+
+        async def send(message):
+            pass
+
+        started = time.perf_counter()
+        for _ in range(n):
+            await asgi_app(scope, None, send)
+        return (time.perf_counter() - started) / n * 1e6
+
+    n = 100000
+    bare = min(asyncio.run(isolated(noop_app, n)) for _ in range(3))
+    wrapped = min(asyncio.run(isolated(metrics.MetricsMiddleware(noop_app), n)) for _ in range(3))
+
+    class Conn:
+        info = {}
+
+    started = time.perf_counter()
+    for _ in range(n):
+        metrics.before_cursor_execute(Conn, None, "SELECT 1", (), None, False)
+        metrics.after_cursor_execute(Conn, None, "SELECT 1", (), None, False)
+    hooks = (time.perf_counter() - started) / n * 1e6
+    print(f"middleware: {wrapped - bare:.1f} us/request, SQL hooks: {hooks:.1f} us/statement")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_report_export.py
+# Peak Python memory and throughput of the CSV report export at growing sizes.
+#
+# Seeds a scratch database with --rows expense logs (plus the trips, vehicles and
+# drivers they join to), then drains reports.write_csv for the first 10%, 50%
+# and 100% of the rows (by date range) under tracemalloc.
+#
+#     python benchmarks/bench_report_export.py [--rows 200000]
+#
+# Peak memory should stay roughly flat as the report grows.
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+parser = argparse.ArgumentParser(description="Memory and speed of the streaming CSV export.")
+parser.add_argument("--rows", type=int, default=200000)
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix="fleetflow-bench-export-")
+os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from app import models, reports  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+VEHICLES = 500
+FIRST_DAY = date(2020, 1, 1)
+models.Base.metadata.create_all(bind=engine)
+
+with SessionLocal() as db:
+    db.execute(insert(models.Vehicle), [
+        {"plate": f"EXP-{i}", "model": "Bench", "type": "Truck", "capacity_kg": 10000, "odometer": 0,
+         "status": "Available"} for i in range(VEHICLES)])
+    db.execute(insert(models.Driver), [
+        {"name": f"Driver {i}", "license_number": f"EXP-{i}", "expiry_date": date(2099, 1, 1),
+         "status": "On Duty"} for i in range(VEHICLES)])
+    db.execute(insert(models.Trip), [
+        {"vehicle_id": i % VEHICLES + 1, "driver_id": i % VEHICLES + 1, "cargo_weight": 100, "origin": "A",
+         "destination": "B", "estimated_fuel_cost": 10.0, "status": "Completed"} for i in range(args.rows)])
+    # Dates rise with the id, so a date range selects a prefix of the table
+    db.execute(insert(models.ExpenseLog), [
+        {"trip_id": i + 1, "driver_name": f"Driver {i % VEHICLES}", "distance_km": 100, "fuel_cost": 40.0,
+         "misc_expense": 2.5, "status": "Done", "date": FIRST_DAY + timedelta(days=i * 3650 // args.rows)}
+        for i in range(args.rows)])
+    db.commit()
+
+print(f"{'rows':>8} {'MB out':>8} {'seconds':>8} {'rows/s':>9} {'peak MB':>8}")
+for share in (0.1, 0.5, 1.0):
+    end = FIRST_DAY + timedelta(days=int(3650 * share) - 1)
+    filters = reports.Filters(end=end)
+    tracemalloc.start()
+    started = time.perf_counter()
+    written = lines = 0
+    with SessionLocal() as db:
+        for chunk in reports.write_csv(db, "expenses", filters):
+            written += len(chunk)
+            lines += chunk.count("\n")
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{lines - 1:>8} {written / 1e6:>8.1f} {elapsed:>8.2f} {(lines - 1) / elapsed:>9.0f} {peak / 1e6:>8.2f}")
@@ -0,0 +1,81 @@
+# benchmarks/bench_search.py
+# Latency of /search queries (app/search.py), FTS5 index vs the LIKE fallback.
+#
+#     python benchmarks/generate_data.py --db /tmp/fleet.db --trips 1000000 --expenses 0
+#     python benchmarks/bench_search.py --db /tmp/fleet.db [--rounds 20]
+#
+# Types a few plates, licence numbers, driver names and routes one character
+# at a time, the way a typeahead box sends them, and runs each query through
+# search.search() in-process (no HTTP, no response cache). Prints the median
+# and worst query time per target for both paths.
+import argparse
+import os
+import statistics
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="Typeahead search latency, FTS5 vs LIKE.")
+parser.add_argument("--db", required=True, help="SQLite file made by generate_data.py (it is not modified)")
+parser.add_argument("--rounds", type=int, default=20)
+args = parser.parse_args()
+
+os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+os.environ["FLEETFLOW_METRICS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select  # noqa: E402
+from app import models, search  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+with SessionLocal() as db:
+    if not search.available(db):
+        sys.exit("No search index in this file; run `python -m app.migrations` on it first.")
+    counts = {name: db.execute(select(func.count()).select_from(model)).scalar()
+              for name, model in (("vehicles", models.Vehicle), ("drivers", models.Driver), ("trips", models.Trip))}
+    plate = db.execute(select(models.Vehicle.plate).order_by(models.Vehicle.id.desc()).limit(1)).scalar() or "GJ-1"
+    driver = db.execute(select(models.Driver.name, models.Driver.license_number)
+                        .order_by(models.Driver.id.desc()).limit(1)).first() or ("Driver", "DL-1")
+    route = db.execute(select(models.Trip.origin, models.Trip.destination)
+                       .order_by(models.Trip.id.desc()).limit(1)).first() or ("Ahmedabad", "Surat")
+
+TARGETS = [
+    ("plate suffix", plate[-4:]),
+    ("plate", plate),
+    ("licence", driver[1]),
+    ("driver name", driver[0]),
+    ("origin", route[0]),
+    ("route", f"{route[0][:3]} {route[1]}"),
+    ("no match", "qxzv"),
+]
+
+
+def typed(text: str):
+    """Every prefix of text, skipping ones that end in a space."""
+    return [text[:n] for n in range(1, len(text) + 1) if not text[:n].endswith(" ")]
+
+
+def time_queries(queries) -> list:
+    timings = []
+    with SessionLocal() as db:
+        for q in queries:
+            search.search(db, q)
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                search.search(db, q)
+                timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+print(f"{counts['vehicles']} vehicles, {counts['drivers']} drivers, {counts['trips']} trips "
+      f"({engine.url.database})\n")
+print(f"{'target':<14} {'typed':<24} {'FTS5 p50':>9} {'max':>8} {'LIKE p50':>9} {'max':>8}")
+for label, text in TARGETS:
+    queries = typed(text)
+    row = []
+    for fts in (True, False):
+        search._available[engine.url] = fts
+        timings = time_queries(queries)
+        row += [statistics.median(timings), max(timings)]
+    search._available.clear()
+    print(f"{label:<14} {text[:24]:<24} {row[0]:>9.2f} {row[1]:>8.2f} {row[2]:>9.2f} {row[3]:>8.2f}")
+print("\nms per query; every prefix of each target, all three kinds searched.")
@@ -0,0 +1,109 @@
+# benchmarks/bench_sqlite_profiles.py
+# Mixed read/write load against the "default" and "tuned" (WAL) SQLite profiles.
+#
+# Writer threads run dispatch-shaped transactions (claim a vehicle, insert a
+# trip) while reader threads fetch the latest trips page (a fixed-size read,
+# so its cost does not grow as the writers add rows). With the
+# default rollback journal every commit locks readers out; in WAL mode readers
+# keep reading the last committed snapshot.
+#
+#     python benchmarks/bench_sqlite_profiles.py [--readers 8] [--writers 2] [--seconds 10]
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app import models  # noqa: E402
+from app.database import build_engine  # noqa: E402
+
+STALL_MS = 50
+PAGE = 20
+
+
+def seed(Session, vehicles: int):
+    with Session() as db:
+        db.add_all(models.Vehicle(plate=f"BENCH-{i}", model="Bench", type="Truck",
+                                  capacity_kg=5000, odometer=0, status="Available")
+                   for i in range(vehicles))
+        db.add_all(models.Driver(name=f"Driver {i}", license_number=f"LIC-{i}",
+                                 status="On Duty") for i in range(vehicles))
+        db.commit()
+
+
+def run_profile(profile: str, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="fleetflow-sqlite-"), "bench.db")
+    engine = build_engine(f"sqlite:///{path}", sqlite_profile=profile)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session, args.vehicles)
+
+    stop = threading.Event()
+    read_latencies, writes = [], [0]
+    lock = threading.Lock()
+
+    def writer(n: int):
+        i = n
+        while not stop.is_set():
+            with Session() as db:
+                vehicle_id = i % args.vehicles + 1
+                db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).update({"status": "On Trip"})
+                db.add(models.Trip(vehicle_id=vehicle_id, driver_id=vehicle_id, cargo_weight=100,
+                                   origin="A", destination="B", estimated_fuel_cost=1.0, status="Dispatched"))
+                db.commit()
+            with lock:
+                writes[0] += 1
+            i += args.writers
+
+    def reader():
+        while not stop.is_set():
+            started = time.perf_counter()
+            with Session() as db:
+                db.query(models.Trip).order_by(models.Trip.id.desc()).limit(PAGE).all()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                read_latencies.append(elapsed)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    read_latencies.sort()
+    pct = lambda p: read_latencies[min(len(read_latencies) - 1, int(p * len(read_latencies)))]
+    return {
+        "reads_per_s": len(read_latencies) / args.seconds,
+        "writes_per_s": writes[0] / args.seconds,
+        "read_p50_ms": pct(0.50),
+        "read_p99_ms": pct(0.99),
+        "read_max_ms": read_latencies[-1],
+        "stalled_reads": sum(1 for ms in read_latencies if ms > STALL_MS),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reader latency under dispatch writes, per SQLite profile.")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--vehicles", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':<8} {'reads/s':>9} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {f'>{STALL_MS}ms':>8}")
+    for profile in ("default", "tuned"):
+        r = run_profile(profile, args)
+        print(f"{profile:<8} {r['reads_per_s']:>9.1f} {r['writes_per_s']:>9.1f} {r['read_p50_ms']:>8.2f} "
+              f"{r['read_p99_ms']:>8.2f} {r['read_max_ms']:>8.2f} {r['stalled_reads']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_sse_subscribers.py
+# Many idle /events/stream subscribers on one server: memory per connection and
+# fan-out of a published event.
+#
+# Starts uvicorn on a scratch database, opens N SSE connections (plain sockets,
+# so the client side stays cheap), samples the server's RSS, publishes a few
+# changes through the API and checks that every subscriber received all of them.
+#
+#     python benchmarks/bench_sse_subscribers.py [--subscribers 1000 5000] [--max-kb-per-conn 64]
+#
+# Exits 1 if a subscriber misses an event or memory per connection exceeds the limit.
+# Linux only (reads /proc for the RSS). Needs uvicorn and httpx installed.
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def start_server(workdir: str, port: int, max_subscribers: int) -> subprocess.Popen:
+    env = dict(os.environ, FLEETFLOW_EVENTS_MAX_SUBSCRIBERS=str(max_subscribers))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning", "--backlog", "8192"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+class Subscriber:
+    def __init__(self):
+        self.events = []
+        self.writer = None
+
+    async def connect(self, port: int):
+        reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(b"GET /events/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+        await self.writer.drain()
+        self._reader = reader
+        await reader.readuntil(b"event: hello")  # headers plus the greeting
+
+    async def read_events(self, count: int):
+        while len(self.events) < count:
+            line = await self._reader.readline()
+            if not line:
+                return
+            if line.startswith(b"event: "):
+                self.events.append(line[7:].strip().decode())
+
+
+async def run(port: int, subscribers: int, proc_pid: int) -> dict:
+    baseline = rss_kb(proc_pid)
+    subs = [Subscriber() for _ in range(subscribers)]
+    for i in range(0, subscribers, 200):  # connect in waves to stay under the accept backlog
+        await asyncio.gather(*(s.connect(port) for s in subs[i:i + 200]))
+    await asyncio.sleep(1.0)
+    connected = rss_kb(proc_pid)
+
+    # Publish through the real write paths
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        r = await client.post("/vehicles/", json={
+            "licensePlate": "SSE-1", "model": "Bench", "type": "Van", "maxPayload": 1, "initialOdometer": 0})
+        vehicle_id = r.json()["id"]
+        published_at = time.perf_counter()
+        await client.put(f"/vehicles/{vehicle_id}/retire")
+        await client.post("/drivers/", json={
+            "name": "SSE Driver", "license_number": "SSE-1", "expiry_date": "2099-01-01"})
+
+    await asyncio.wait_for(asyncio.gather(*(s.read_events(3) for s in subs)), timeout=60)
+    fanout = time.perf_counter() - published_at
+    complete = sum(1 for s in subs if s.events[:3] == ["vehicle.created", "vehicle.status", "driver.created"])
+
+    after = rss_kb(proc_pid)
+    for s in subs:
+        s.writer.close()
+    return {
+        "baseline_kb": baseline,
+        "connected_kb": connected,
+        "after_events_kb": after,
+        "kb_per_conn": (connected - baseline) / subscribers,
+        "complete": complete,
+        "fanout_s": fanout,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idle SSE subscribers: memory per connection and fan-out.")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--max-kb-per-conn", type=float, default=64.0)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    # Client and server each need one descriptor per connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = max(args.subscribers) * 2 + 1024
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    failed = False
+    print(f"{'subs':>6} {'base MB':>8} {'conn MB':>8} {'KB/conn':>8} {'after MB':>9} {'complete':>9} {'fan-out s':>10}")
+    for subscribers in args.subscribers:
+        workdir = tempfile.mkdtemp(prefix="fleetflow-bench-sse-")
+        os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}"
+        proc = start_server(workdir, args.port, subscribers + 10)
+        try:
+            r = asyncio.run(run(args.port, subscribers, proc.pid))
+        finally:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"{subscribers:>6} {r['baseline_kb'] / 1024:>8.1f} {r['connected_kb'] / 1024:>8.1f} "
+              f"{r['kb_per_conn']:>8.1f} {r['after_events_kb'] / 1024:>9.1f} {r['complete']:>9} {r['fanout_s']:>10.2f}")
+        if r["complete"] != subscribers or r["kb_per_conn"] > args.max_kb_per_conn:
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# benchmarks/bench_telemetry.py
+# Sustained telemetry ingestion and backpressure of the write-behind buffer.
+#
+# Phase 1 ("sustained"): --clients senders post batches of --batch pings to
+# /telemetry/pings for --seconds. The harness reports accepted pings/s and
+# the server's peak RSS, then waits for the buffer to drain and checks that
+# every accepted ping reached telemetry_pings.
+#
+# Phase 2 ("backpressure"): the same load against a server with a small buffer
+# and a slow flush. The harness checks that it answers 429 instead of
+# growing, and that the buffer never exceeds its limit.
+#
+#     python benchmarks/bench_telemetry.py [--seconds 10] [--target 10000]
+#
+# Exits 1 if phase 1 stays under --target pings/s or a check fails.
+# Linux only (reads /proc for the RSS). Needs uvicorn and httpx installed.
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VEHICLES = 1000
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def start_server(workdir: str, port: int, extra_env: dict) -> subprocess.Popen:
+    env = dict(os.environ, FLEETFLOW_DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}", **extra_env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def batch_body(client_no: int, size: int) -> bytes:
+    return json.dumps({"pings": [
+        {"vehicleId": (client_no * size + i) % VEHICLES + 1, "odometer": 1000 + i,
+         "fuelLevel": 55.0, "latitude": 23.02, "longitude": 72.57}
+        for i in range(size)
+    ]}).encode()
+
+
+async def drive(base_url: str, clients: int, batch: int, seconds: float, pid: int) -> dict:
+    accepted = throttled = 0
+    peak_rss = rss_mb(pid)
+    stop_at = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30,
+                                 headers={"Content-Type": "application/json"}) as client:
+        async def sender(n: int):
+            nonlocal accepted, throttled
+            body = batch_body(n, batch)
+            while time.perf_counter() < stop_at:
+                r = await client.post("/telemetry/pings", content=body)
+                if r.status_code == 202:
+                    accepted += batch
+                elif r.status_code == 429:
+                    throttled += 1
+                    await asyncio.sleep(float(r.headers.get("Retry-After", "1")) / 10)
+                else:
+                    r.raise_for_status()
+
+        async def sample_rss():
+            nonlocal peak_rss
+            while time.perf_counter() < stop_at:
+                peak_rss = max(peak_rss, rss_mb(pid))
+                await asyncio.sleep(0.2)
+
+        started = time.perf_counter()
+        await asyncio.gather(sample_rss(), *(sender(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+        stats = (await client.get("/telemetry/stats")).json()
+    return {"accepted": accepted, "throttled": throttled, "rate": accepted / elapsed,
+            "peak_rss_mb": peak_rss, "stats": stats}
+
+
+def seed_vehicles(port: int):
+    rows = [{"licensePlate": f"TEL-{i}", "model": "Bench", "type": "Truck", "maxPayload": 10,
+             "initialOdometer": 0} for i in range(VEHICLES)]
+    httpx.post(f"http://127.0.0.1:{port}/vehicles/bulk", json={"rows": rows}, timeout=60).raise_for_status()
+
+
+def run_phase(name: str, args, extra_env: dict) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"fleetflow-bench-telemetry-{name}-")
+    proc = start_server(workdir, args.port, extra_env)
+    try:
+        seed_vehicles(args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+        r = asyncio.run(drive(base_url, args.clients, args.batch, args.seconds, proc.pid))
+        deadline = time.time() + 60
+        while time.time() < deadline and httpx.get(f"{base_url}/telemetry/stats").json()["buffered"]:
+            time.sleep(0.2)
+        with sqlite3.connect(os.path.join(workdir, "fleetflow.db")) as conn:
+            r["stored"] = conn.execute("SELECT COUNT(*) FROM telemetry_pings").fetchone()[0]
+        return r
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry ingestion throughput and backpressure.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=500, help="pings per request")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--target", type=float, default=10000.0, help="minimum pings/s in phase 1")
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'phase':<13} {'pings/s':>9} {'accepted':>9} {'stored':>9} {'429s':>6} {'peak RSS MB':>12} {'flushes':>8}")
+    phases = [
+        ("sustained", {}),
+        ("backpressure", {"FLEETFLOW_TELEMETRY_MAX_BUFFERED": "20000",
+                          "FLEETFLOW_TELEMETRY_FLUSH_BATCH": "100000",
+                          "FLEETFLOW_TELEMETRY_FLUSH_INTERVAL_S": "2"}),
+    ]
+    for name, extra_env in phases:
+        r = run_phase(name, args, extra_env)
+        print(f"{name:<13} {r['rate']:>9.0f} {r['accepted']:>9} {r['stored']:>9} {r['throttled']:>6} "
+              f"{r['peak_rss_mb']:>12.1f} {r['stats']['flushes']:>8}")
+        if r["stored"] != r["accepted"]:
+            print(f"  {name}: {r['accepted'] - r['stored']} accepted pings were not stored")
+            failed = True
+        if name == "sustained" and r["rate"] < args.target:
+            failed = True
+        if name == "backpressure" and not r["throttled"]:
+            print("  backpressure: the server never pushed back")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
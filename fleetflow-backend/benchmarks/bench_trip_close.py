@@ -0,0 +1,98 @@
+# benchmarks/bench_trip_close.py
+# End-of-shift cleanup: closing --trips active trips at once through
+# /trips/close/batch (one transaction of set-based updates) vs one
+# /trips/{id}/complete per trip. Both paths advance the odometers and record an
+# expense log per trip, against a fresh database each run. The single-trip path
+# is timed over --singles trips and scaled up.
+#
+#     python benchmarks/bench_trip_close.py [--trips 10000] [--singles 1000]
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ["FLEETFLOW_DATABASE_URL"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="fleetflow-close-"), "bench.db"
+)
+os.environ["FLEETFLOW_METRICS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from app import counters, models, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.routers import trips  # noqa: E402
+
+
+def reset_fleet(n: int, rng: random.Random) -> list:
+    """n vehicles and drivers, each on one dispatched trip; returns the trip ids."""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    expiry = date.today() + timedelta(days=365)
+    with SessionLocal() as db:
+        db.execute(insert(models.Vehicle), [
+            {"plate": f"CLOSE-{i}", "model": "Close", "type": rng.choice(["Van", "Truck"]), "capacity_kg": 10000,
+             "odometer": 1000, "status": "On Trip"} for i in range(n)])
+        db.execute(insert(models.Driver), [
+            {"name": f"Driver {i}", "license_number": f"CLOSE-{i}", "expiry_date": expiry, "status": "On Trip"}
+            for i in range(n)])
+        db.execute(insert(models.Trip), [
+            {"vehicle_id": i + 1, "driver_id": i + 1, "cargo_weight": 500, "origin": "Depot",
+             "destination": rng.choice(["North", "South", "East"]), "estimated_fuel_cost": 10.0,
+             "status": "Dispatched"} for i in range(n)])
+        counters.reconcile(db)
+        db.commit()
+        return db.execute(select(models.Trip.id).order_by(models.Trip.id)).scalars().all()
+
+
+def closing(rng: random.Random) -> dict:
+    return {"distance": rng.randint(10, 500), "fuelCost": round(rng.uniform(5, 300), 2), "miscExpense": 2.0}
+
+
+def check(db, n: int):
+    """Every trip closed, every vehicle and driver released, one expense log per trip."""
+    assert db.execute(select(func.count()).where(models.Trip.status == "Completed")).scalar() == n
+    assert db.execute(select(func.count()).where(models.Vehicle.status == "Available")).scalar() == n
+    assert db.execute(select(func.count()).where(models.Driver.status == "On Duty")).scalar() == n
+    assert db.execute(select(func.count()).select_from(models.ExpenseLog)).scalar() == n
+    assert counters.reconcile(db) == {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs per-trip trip closing.")
+    parser.add_argument("--trips", type=int, default=10000)
+    parser.add_argument("--singles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    trip_ids = reset_fleet(args.trips, rng)
+    batch = schemas.BatchCloseRequest(trips=[schemas.TripCloseItem(tripId=i, **closing(rng)) for i in trip_ids])
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        result = asyncio.run(trips._close_batch(db, batch))
+        batch_ms = (time.perf_counter() - started) * 1000
+        assert len(result["trips"]) == args.trips and not result["rejected"]
+        check(db, args.trips)
+
+    trip_ids = reset_fleet(args.singles, rng)
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        for trip_id in trip_ids:
+            asyncio.run(trips._close_trip(db, trip_id, "Completed", schemas.TripClose(**closing(rng))))
+        single_ms = (time.perf_counter() - started) * 1000
+        check(db, args.singles)
+    scaled_ms = single_ms / args.singles * args.trips
+
+    print(f"{'path':<34} {'trips':>7} {'total ms':>10} {'per trip ms':>12}")
+    print(f"{'/trips/close/batch, one call':<34} {args.trips:>7} {batch_ms:>10.0f} {batch_ms / args.trips:>12.3f}")
+    print(f"{'/trips/{id}/complete per trip':<34} {args.trips:>7} {scaled_ms:>10.0f} "
+          f"{single_ms / args.singles:>12.3f}   (timed over {args.singles})")
+    print(f"\nbatch is {scaled_ms / batch_ms:.0f}x faster; results checked against the counters and tables.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/explain_queries.py
+# Print SQLite's EXPLAIN QUERY PLAN for the hot router queries.
+#
+#     python benchmarks/explain_queries.py [--db path/to/fleetflow.db]
+#
+# Without --db a scratch database is created from the current models.
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN for the router queries.")
+parser.add_argument("--db", help="existing SQLite file to inspect (it is not modified)")
+args = parser.parse_args()
+
+path = args.db or os.path.join(tempfile.mkdtemp(prefix="fleetflow-explain-"), "explain.db")
+os.environ["FLEETFLOW_DATABASE_URL"] = f"sqlite:///{path}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select  # noqa: E402
+from app import models, queries  # noqa: E402
+from app.database import engine  # noqa: E402
+
+if not args.db:
+    models.Base.metadata.create_all(bind=engine)
+
+today = date.today()
+QUERIES = {
+    "available-resources: vehicles": select(models.Vehicle).where(models.Vehicle.status == "Available"),
+    "available-resources: drivers": select(models.Driver).where(
+        models.Driver.status == "On Duty", models.Driver.expiry_date >= today),
+    "available-resources / active-trips: trips": select(models.Trip).where(
+        models.Trip.status.in_(queries.ACTIVE_TRIP_STATUSES)).order_by(models.Trip.id).limit(500),
+    "counters: vehicles by status": select(models.Vehicle.status, func.count(models.Vehicle.id)).group_by(
+        models.Vehicle.status),
+    "counters: dispatched trips": select(func.count(models.Trip.id)).where(models.Trip.status == "Dispatched"),
+    "dispatch/batch: eligible drivers": select(models.Driver.id).where(
+        models.Driver.status == "On Duty", models.Driver.expiry_date >= today).order_by(models.Driver.id),
+}
+
+with engine.connect() as conn:
+    for name, stmt in QUERIES.items():
+        compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+        params = compiled.construct_params()
+        plan = conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}", tuple(params[key] for key in compiled.positiontup)
+        ).fetchall()
+        print(f"-- {name}")
+        for row in plan:
+            print(f"   {row[-1]}")
@@ -0,0 +1,162 @@
+# benchmarks/generate_data.py
+# Fill a database with a synthetic fleet at a chosen scale.
+#
+#     python benchmarks/generate_data.py --db /tmp/fleet.db --vehicles 10000 --drivers 20000 \
+#         --trips 1000000 --expenses 5000000 [--maintenance 200000] [--incidents 20000] [--seed 42]
+#
+# The same arguments and --seed always produce the same data. Rows go in with
+# executemany in chunks, then the counter row, the monthly rollups, the driver
+# scores and the search index are rebuilt from them (the same code paths as
+# `python -m app.counters`, `python -m app.rollups`, `python -m app.scoring` and
+# `python -m app.search`).
+# Every user is created with the password "bench" (see --users).
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+parser = argparse.ArgumentParser(description="Generate a synthetic FleetFlow dataset.")
+parser.add_argument("--db", required=True, help="SQLite file to create (or a full SQLAlchemy URL)")
+parser.add_argument("--vehicles", type=int, default=10000)
+parser.add_argument("--drivers", type=int, default=20000)
+parser.add_argument("--trips", type=int, default=1000000)
+parser.add_argument("--expenses", type=int, default=5000000)
+parser.add_argument("--maintenance", type=int, default=200000)
+parser.add_argument("--incidents", type=int, default=20000)
+parser.add_argument("--users", type=int, default=100)
+parser.add_argument("--days", type=int, default=730, help="history spread over this many days back from today")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--chunk", type=int, default=50000)
+args = parser.parse_args()
+
+os.environ["FLEETFLOW_DATABASE_URL"] = args.db if "://" in args.db else f"sqlite:///{os.path.abspath(args.db)}"
+os.environ.setdefault("FLEETFLOW_METRICS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import counters, migrations, models, rollups, scoring, search  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+PASSWORD = "bench"
+VEHICLE_TYPES = [("Van", 1000), ("Truck", 10000), ("Trailer", 25000), ("Pickup", 750)]
+CITIES = ["Ahmedabad", "Surat", "Vadodara", "Rajkot", "Mumbai", "Pune", "Delhi", "Jaipur",
+          "Indore", "Bhopal", "Nagpur", "Hyderabad", "Bengaluru", "Chennai", "Kolkata", "Lucknow"]
+ISSUES = ["Oil change", "Brake pads", "Tyre replacement", "Engine check", "Battery", "Clutch", "AC service"]
+
+rng = random.Random(args.seed)
+today = date.today()
+
+
+def day_in_history() -> date:
+    return today - timedelta(days=rng.randrange(args.days))
+
+
+def chunked_insert(model, total: int, make_row):
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for first in range(0, total, args.chunk):
+            db.execute(insert(model), [make_row(i) for i in range(first, min(first + args.chunk, total))])
+            db.commit()
+    print(f"  {model.__tablename__:<18} {total:>9} rows in {time.perf_counter() - started:6.1f}s")
+
+
+def vehicle_row(i):
+    vehicle_type, capacity = VEHICLE_TYPES[i % len(VEHICLE_TYPES)]
+    return {"plate": f"GJ-{i:07d}", "model": f"{vehicle_type} M{i % 7}", "type": vehicle_type,
+            "capacity_kg": capacity, "odometer": rng.randrange(500, 300000),
+            "status": rng.choices(("Available", "In Shop", "Out of Service"), weights=(85, 10, 5))[0]}
+
+
+def driver_row(i):
+    return {"name": f"Driver {i}", "license_number": f"DL-{i:08d}",
+            "expiry_date": today + timedelta(days=rng.randrange(-60, 1500)),
+            "status": rng.choices(("On Duty", "Off Duty", "Suspended"), weights=(80, 15, 5))[0]}
+
+
+def trip_row(i):
+    origin, destination = rng.sample(CITIES, 2)
+    # Old trips are closed; only the most recent ones are still active
+    recent = i >= args.trips - max(1, args.vehicles // 10)
+    # Closed in id order, spread evenly over the history
+    closed_at = datetime.combine(today - timedelta(days=(args.trips - i) * args.days // args.trips),
+                                 datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+    return {"vehicle_id": rng.randrange(args.vehicles) + 1, "driver_id": rng.randrange(args.drivers) + 1,
+            "cargo_weight": rng.randrange(100, 20000), "origin": origin, "destination": destination,
+            "estimated_fuel_cost": round(rng.uniform(50, 900), 2),
+            "status": rng.choice(("Dispatched", "On Trip")) if recent
+            else rng.choices(("Completed", "Cancelled"), weights=(92, 8))[0],
+            "closed_at": None if recent else closed_at}
+
+
+def expense_row(i):
+    return {"trip_id": rng.randrange(args.trips) + 1, "driver_name": f"Driver {rng.randrange(args.drivers)}",
+            "distance_km": rng.randrange(20, 1500), "fuel_cost": round(rng.uniform(20, 800), 2),
+            "misc_expense": round(rng.uniform(0, 120), 2), "status": "Done", "date": day_in_history()}
+
+
+def incident_row(i):
+    kind = rng.choices(list(scoring.INCIDENT_POINTS), weights=(70, 25, 5))[0]
+    return {"driver_id": rng.randrange(args.drivers) + 1, "trip_id": rng.randrange(args.trips) + 1, "kind": kind,
+            "points": scoring.INCIDENT_POINTS[kind], "note": None,
+            "created_at": datetime.combine(day_in_history(), datetime.min.time())}
+
+
+def maintenance_row(i):
+    return {"vehicle_id": rng.randrange(args.vehicles) + 1, "issue": rng.choice(ISSUES), "date": day_in_history(),
+            "cost": round(rng.uniform(50, 5000), 2), "status": rng.choice(("Pending", "Completed"))}
+
+
+def main():
+    if args.trips and not (args.vehicles and args.drivers):
+        parser.error("trips need at least one vehicle and one driver")
+    if (args.expenses or args.incidents) and not args.trips:
+        parser.error("expenses and incidents need at least one trip")
+    models.Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        if db.query(models.Vehicle.id).first() is not None:
+            sys.exit("The database already has data; point --db at a new file.")
+
+    print(f"Generating into {engine.url} (seed {args.seed})")
+    # Index for search once at the end rather than row by row through its triggers
+    with engine.begin() as conn:
+        search.drop(conn)
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+    chunked_insert(models.User, args.users,
+                   lambda i: {"username": f"bench{i}", "hashed_password": hashed, "role": "Dispatcher"})
+    chunked_insert(models.Vehicle, args.vehicles, vehicle_row)
+    chunked_insert(models.Driver, args.drivers, driver_row)
+    chunked_insert(models.Trip, args.trips, trip_row)
+    chunked_insert(models.ExpenseLog, args.expenses, expense_row)
+    chunked_insert(models.MaintenanceLog, args.maintenance, maintenance_row)
+    chunked_insert(models.DriverIncident, args.incidents, incident_row)
+
+    # Vehicles and drivers that have an active trip are on it
+    with engine.begin() as conn:
+        active = ",".join(str(models.TRIP_STATUSES.index(s) + 1) for s in ("Dispatched", "On Trip"))
+        on_trip_vehicle = models.VEHICLE_STATUSES.index("On Trip") + 1
+        on_trip_driver = models.DRIVER_STATUSES.index("On Trip") + 1
+        conn.exec_driver_sql(f"UPDATE vehicles SET status = {on_trip_vehicle} WHERE id IN "
+                             f"(SELECT vehicle_id FROM trips WHERE status IN ({active}))")
+        conn.exec_driver_sql(f"UPDATE drivers SET status = {on_trip_driver} WHERE id IN "
+                             f"(SELECT driver_id FROM trips WHERE status IN ({active}))")
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        counters.reconcile(db)
+        written = rollups.backfill(db)
+        scored = scoring.recompute(db)
+        db.commit()
+    print(f"  counters + {written} rollup rows + {scored} driver scores in {time.perf_counter() - started:6.1f}s")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        search.install(conn)
+    print(f"  search index in {time.perf_counter() - started:6.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# benchmarks/run_benchmarks.py
+# Drive every router endpoint at a fixed concurrency and record latency
+# percentiles, throughput and SQL statements per request in a JSON file.
+#
+#     python benchmarks/generate_data.py --db /tmp/fleet.db --trips 200000 --expenses 500000
+#     python benchmarks/run_benchmarks.py --db /tmp/fleet.db [--concurrency 32] [--seconds 10] \
+#         [--scenarios dashboard-stats analytics] [--out results.json] [--compare previous.json]
+#
+# The database is copied into a scratch directory first, so write scenarios
+# (dispatch, telemetry) never change the original and every run starts from
+# the same data. Queries per request come from the server's own /metrics
+# (app/metrics.py), diffed around each scenario. --compare prints the change
+# against an earlier results file.
+#
+# Needs uvicorn and httpx installed.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = 500
+
+
+class Scenario:
+    def __init__(self, name, method, route, make_request=None, path=None):
+        self.name = name
+        self.method = method
+        self.route = route  # route template, as labelled in /metrics
+        self.make_request = make_request or (lambda state: {"url": path or route})
+
+
+def _page(route):
+    # The list endpoints return everything without ?limit; measure one page
+    return lambda state: {"url": route, "params": {"limit": PAGE_SIZE}}
+
+
+def _dispatch_request(state):
+    # Each dispatch takes its own vehicle and driver from the pool read at startup
+    if not state["vehicles"] or not state["drivers"]:
+        return None
+    vehicle_id, capacity = state["vehicles"].pop()
+    return {"url": "/trips/dispatch", "json": {
+        "vehicleId": vehicle_id, "driverId": state["drivers"].pop(), "cargoWeight": min(100, capacity),
+        "origin": "Ahmedabad", "destination": "Surat", "estimatedFuelCost": 120.0}}
+
+
+def _telemetry_request(state):
+    base = random.randrange(state["vehicle_count"] or 1)
+    return {"url": "/telemetry/pings", "json": {"pings": [
+        {"vehicleId": (base + i) % max(state["vehicle_count"], 1) + 1, "odometer": 1000 + i, "fuelLevel": 50.0}
+        for i in range(100)]}}
+
+
+def _search_request(state):
+    # Typeahead prefixes of plates, licences and cities; the random ids keep most out of the response cache
+    i = random.randrange(state["vehicle_count"] or 1)
+    return {"url": "/search/", "params": {"q": random.choice(
+        [f"{i:04d}"[-4:], f"GJ-{i:07d}"[:random.randrange(4, 11)], f"DL-{i:08d}"[:random.randrange(5, 12)],
+         random.choice(["Ahm", "Sur", "Mumbai", "Pune Del", "Beng"])])}}
+
+
+SCENARIOS = [
+    Scenario("auth-login", "POST", "/auth/login", lambda state: {"url": "/auth/login", "json": {
+        "username": f"bench{random.randrange(state['user_count'] or 1)}", "password": "bench"}}),
+    Scenario("dispatch", "POST", "/trips/dispatch", _dispatch_request),
+    Scenario("available-resources", "GET", "/trips/available-resources", _page("/trips/available-resources")),
+    Scenario("dashboard-stats", "GET", "/dashboard/stats"),
+    Scenario("dashboard-active-trips", "GET", "/dashboard/active-trips"),
+    Scenario("analytics", "GET", "/analytics/data"),
+    Scenario("vehicles-list", "GET", "/vehicles/", _page("/vehicles/")),
+    Scenario("drivers-list", "GET", "/drivers/", _page("/drivers/")),
+    Scenario("trips-list", "GET", "/trips/", _page("/trips/")),
+    Scenario("trips-list-deep", "GET", "/trips/",
+             lambda state: {"url": "/trips/", "params": {"limit": PAGE_SIZE, "after": state["deep_trip_id"]}}),
+    Scenario("expenses-list", "GET", "/expenses/", _page("/expenses/")),
+    Scenario("maintenance-list", "GET", "/maintenance/"),
+    Scenario("report-expenses-vehicle", "GET", "/reports/export/{report}",
+             lambda state: {"url": "/reports/export/expenses",
+                            "params": {"vehicle_id": random.randrange(state["vehicle_count"] or 1) + 1}}),
+    Scenario("telemetry-ingest", "POST", "/telemetry/pings", _telemetry_request),
+    Scenario("search", "GET", "/search/", _search_request),
+]
+
+METRIC_LINE = re.compile(r'^(fleetflow_http_request_db_(?:queries_sum|queries_count|seconds_total))'
+                         r'\{method="([^"]+)",route="([^"]+)"\} (\S+)$')
+
+
+def start_server(workdir: str, port: int, db_mode: str) -> subprocess.Popen:
+    env = dict(os.environ, FLEETFLOW_METRICS="1", FLEETFLOW_DB_MODE=db_mode,
+               FLEETFLOW_DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'fleetflow.db')}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def read_db_metrics(base_url: str) -> dict:
+    """{(method, route): {"queries_sum", "queries_count", "seconds_total"}} from /metrics."""
+    found = {}
+    for line in httpx.get(f"{base_url}/metrics", timeout=30).text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, method, route, value = match.groups()
+            found.setdefault((method, route), {})[name.rsplit("_db_", 1)[1]] = float(value)
+    return found
+
+
+async def drive(base_url: str, scenario: Scenario, state: dict, concurrency: int, seconds: float) -> dict:
+    latencies, errors, statuses = [], 0, {}
+    stop_at = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                request = scenario.make_request(state)
+                if request is None:
+                    return  # nothing left to use (e.g. no free vehicles to dispatch)
+                started = time.perf_counter()
+                try:
+                    r = await client.request(scenario.method, **request)
+                    await r.aread()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+                if r.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def load_state(base_url: str, db_path: str) -> dict:
+    import sqlite3
+
+    with sqlite3.connect(db_path) as conn:
+        count = lambda table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        state = {
+            "user_count": count("users"),
+            "vehicle_count": conn.execute("SELECT COALESCE(MAX(id), 0) FROM vehicles").fetchone()[0],
+            "deep_trip_id": conn.execute("SELECT COALESCE(MAX(id), 0) / 2 FROM trips").fetchone()[0],
+            "rows": {table: count(table) for table in
+                     ("vehicles", "drivers", "trips", "expense_logs", "maintenance_logs", "users")},
+        }
+    resources = httpx.get(f"{base_url}/trips/available-resources", params={"limit": 1}, timeout=120).json()
+    state["vehicles"] = [(v["id"], v["capacity_kg"]) for v in resources["vehicles"]]
+    state["drivers"] = [d["id"] for d in resources["drivers"]]
+    random.shuffle(state["vehicles"])
+    random.shuffle(state["drivers"])
+    return state
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(current: dict, previous_path: str):
+    with open(previous_path) as f:
+        previous = {s["name"]: s for s in json.load(f)["scenarios"]}
+    print(f"\nvs {previous_path}")
+    print(f"{'scenario':<26} {'p95 ms':>16} {'req/s':>18} {'queries/req':>14}")
+    for s in current["scenarios"]:
+        old = previous.get(s["name"])
+        if not old:
+            continue
+        change = lambda key: (f"{old[key]}->{s[key]}" if old.get(key) is not None and s.get(key) is not None
+                              else "n/a")
+        print(f"{s['name']:<26} {change('p95_ms'):>16} {change('throughput_rps'):>18} "
+              f"{change('queries_per_request'):>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every FleetFlow endpoint against a generated dataset.")
+    parser.add_argument("--db", required=True, help="SQLite file from generate_data.py (it is not modified)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=[s.name for s in SCENARIOS],
+                        default=[s.name for s in SCENARIOS])
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--port", type=int, default=8771)
+    parser.add_argument("--out", help="results file (default: bench-<UTC timestamp>.json in the current directory)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    out_path = args.out or f"bench-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+    workdir = tempfile.mkdtemp(prefix="fleetflow-bench-run-")
+    db_path = os.path.join(workdir, "fleetflow.db")
+    shutil.copy(args.db, db_path)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = start_server(workdir, args.port, args.db_mode)
+    results = []
+    try:
+        state = load_state(base_url, db_path)
+        print(f"{'scenario':<26} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6} {'errors':>7}")
+        for scenario in SCENARIOS:
+            if scenario.name not in args.scenarios:
+                continue
+            before = read_db_metrics(base_url).get((scenario.method, scenario.route), {})
+            r = asyncio.run(drive(base_url, scenario, state, args.concurrency, args.seconds))
+            after = read_db_metrics(base_url).get((scenario.method, scenario.route), {})
+            n = after.get("queries_count", 0) - before.get("queries_count", 0)
+            r["queries_per_request"] = round((after.get("queries_sum", 0) - before.get("queries_sum", 0)) / n, 2) \
+                if n else None
+            r["db_ms_per_request"] = round((after.get("seconds_total", 0) - before.get("seconds_total", 0))
+                                           / n * 1000, 2) if n else None
+            results.append(dict(name=scenario.name, method=scenario.method, route=scenario.route, **r))
+            fmt = lambda v: "-" if v is None else v
+            print(f"{scenario.name:<26} {r['throughput_rps']:>8} {fmt(r['p50_ms']):>8} {fmt(r['p95_ms']):>8} "
+                  f"{fmt(r['p99_ms']):>8} {fmt(r['queries_per_request']):>6} {r['errors']:>7}")
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "started_at": started_at.isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "db_mode": args.db_mode,
+        "concurrency": args.concurrency,
+        "seconds_per_scenario": args.seconds,
+        "dataset": {"source": os.path.abspath(args.db), "rows": state["rows"]},
+        "scenarios": results,
+    }
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out_path}")
+    if args.compare:
+        print_comparison(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()